@@ -0,0 +1,156 @@
+"""
+Pool of warm Chromium browsers shared across test runs.
+"""
+import logging
+import os
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from agent.profiles import ExecutionProfile, get_profile
+from metrics import ACTIVE_BROWSERS, BROWSER_LAUNCH_SECONDS
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser, BrowserContext, Playwright
+
+logger = logging.getLogger("qa_agent_browser_pool")
+
+DEFAULT_POOL_SIZE = int(os.environ.get("QA_BROWSER_POOL_SIZE", os.environ.get("QA_MAX_WORKERS", "2")))
+
+# Keyed by (profile name, headless)
+_pools: Dict[Tuple[str, bool], "BrowserPool"] = {}
+_pools_lock = threading.Lock()
+
+
+class BrowserPool:
+    """Keeps ``size`` Chromium instances running and lends them out per task.
+
+    Playwright's sync API is bound to the thread that started it, so every
+    browser lives on its own worker thread. ``run`` hands a job to the next
+    free worker, which opens a fresh ``BrowserContext`` for it and closes it
+    afterwards, so runs share the warm browser but no cookies or storage.
+    ``profile`` sets the launch options, viewport and request blocking.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, headless: bool = False,
+                 profile: Optional[ExecutionProfile] = None):
+        self.size = max(1, size)
+        self.profile = profile or get_profile()
+        self.headless = self.profile.resolve_headless(headless)
+        self._jobs: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the worker threads, each launching its browser right away."""
+        with self._lock:
+            if self._started:
+                return
+            for n in range(self.size):
+                thread = threading.Thread(target=self._worker, name=f"browser-pool-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._started = True
+        logger.info(f"Browser pool started with {self.size} {'headless' if self.headless else 'headed'} "
+                    f"browsers, profile '{self.profile.name}'")
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func(context, *args)`` on a warm browser and return its result."""
+        self.start()
+        future: Future = Future()
+        self._jobs.put((func, args, future))
+        return future.result()
+
+    def close(self) -> None:
+        """Close every browser once the queued jobs are done."""
+        with self._lock:
+            if not self._started:
+                return
+            for _ in self._threads:
+                self._jobs.put(None)
+            threads, self._threads = self._threads, []
+            self._started = False
+        for thread in threads:
+            thread.join(timeout=30)
+        logger.info("Browser pool closed")
+
+    def _launch(self, pw: "Playwright") -> "Browser":
+        with BROWSER_LAUNCH_SECONDS.labels(self.profile.name, self.headless).time():
+            browser = self.profile.launch(pw, self.headless)
+        ACTIVE_BROWSERS.labels(self.profile.name, self.headless).inc()
+        return browser
+
+    def _close_browser(self, browser: "Browser") -> None:
+        ACTIVE_BROWSERS.labels(self.profile.name, self.headless).dec()
+        try:
+            browser.close()
+        except Exception:
+            traceback.print_exc()
+
+    def _new_context(self, browser: "Browser") -> "BrowserContext":
+        return self.profile.new_context(browser)
+
+    def _worker(self) -> None:
+        # Imported here so the API can start without loading Playwright
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as pw:
+            browser: Optional["Browser"] = None
+            try:
+                browser = self._launch(pw)
+            except Exception as e:
+                # Retried on the first job so the error reaches a caller
+                logger.error(f"Error launching pooled browser: {str(e)}")
+
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                func, args, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                context = None
+                try:
+                    if browser is not None and not browser.is_connected():
+                        self._close_browser(browser)
+                        browser = None
+                    if browser is None:
+                        browser = self._launch(pw)
+                    context = self._new_context(browser)
+                    future.set_result(func(context, *args))
+                except BaseException as e:
+                    future.set_exception(e)
+                finally:
+                    if context is not None:
+                        try:
+                            context.close()
+                        except Exception as e:
+                            logger.error(f"Error closing browser context: {str(e)}")
+
+            if browser is not None:
+                self._close_browser(browser)
+
+
+def get_browser_pool(headless: bool, profile: Optional[str] = None) -> BrowserPool:
+    """Return the process-wide pool for a profile and headless mode."""
+    execution_profile = get_profile(profile)
+    key = (execution_profile.name, execution_profile.resolve_headless(headless))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = BrowserPool(headless=headless, profile=execution_profile)
+            _pools[key] = pool
+        return pool
+
+
+def close_browser_pools() -> None:
+    """Close every browser pool, e.g. on shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,256 @@
+"""
+Ways to count the app's customers, fastest first.
+
+``network`` reads the JSON the customers page fetches (fetching any further
+pages of that API directly); ``store`` reads a customer list the app keeps
+in local/session storage. Both return ``None`` when the app doesn't expose
+its data that way, in which case ``pagination`` walks the table page by
+page, sharded when asked to.
+"""
+import os
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from playwright.sync_api import BrowserContext, Page, Response
+
+from agent.sharding import scan_sharded
+from agent.waits import DEFAULT_TIMEOUT_MS, StepTimer, wait_for_text_change
+
+# "auto" tries network, then store, then pagination
+COUNT_STRATEGIES = ("auto", "network", "store", "pagination")
+DEFAULT_COUNT_STRATEGY = os.environ.get("QA_COUNT_STRATEGY", "auto").lower()
+# Only data API responses whose URL contains this are trusted to be the customer list
+CUSTOMER_API_PATTERN = os.environ.get("QA_CUSTOMER_API_PATTERN", "customer").lower()
+
+RECORD_KEYS = ("customers", "data", "items", "results", "rows", "records")
+PAGE_COUNT_KEYS = ("pages", "totalPages", "total_pages", "pageCount", "page_count", "last_page")
+PAGE_PARAMS = ("page", "p", "pageNumber", "page_number")
+
+# Largest plausible customer list kept in local/session storage
+_STORE_COUNT = """
+() => {
+    const looksLikeCustomers = list => Array.isArray(list) && list.length > 0 && list.every(
+        row => row && typeof row === "object" && ("email" in row || "name" in row));
+    let best = null;
+    for (const store of [window.localStorage, window.sessionStorage]) {
+        for (let i = 0; i < store.length; i++) {
+            let value;
+            try { value = JSON.parse(store.getItem(store.key(i))); } catch (e) { continue; }
+            const candidates = Array.isArray(value) ? [value]
+                : (value && typeof value === "object" ? Object.values(value) : []);
+            for (const list of candidates) {
+                if (looksLikeCustomers(list) && (best === null || list.length > best)) best = list.length;
+            }
+        }
+    }
+    return best;
+}
+"""
+
+
+class ResponseRecorder:
+    """Collects the JSON fetch/XHR responses a page receives while active."""
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.responses: List[Response] = []
+
+    def _on_response(self, response: Response) -> None:
+        if response.request.resource_type not in ("fetch", "xhr"):
+            return
+        if "json" in (response.headers.get("content-type") or ""):
+            self.responses.append(response)
+
+    def __enter__(self) -> "ResponseRecorder":
+        self.page.on("response", self._on_response)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.page.remove_listener("response", self._on_response)
+
+
+def extract_records(payload: Any) -> Tuple[Optional[list], Optional[int]]:
+    """Find the list of records in an API payload and its page count, if paged."""
+    if isinstance(payload, list):
+        if payload and all(isinstance(row, dict) for row in payload):
+            return payload, None
+        return None, None
+    if not isinstance(payload, dict):
+        return None, None
+    for key in RECORD_KEYS:
+        records = payload.get(key)
+        if isinstance(records, list) and all(isinstance(row, dict) for row in records):
+            pages = next((payload[k] for k in PAGE_COUNT_KEYS if isinstance(payload.get(k), int)), None)
+            return records, pages
+    return None, None
+
+
+def page_url(url: str, number: int) -> Optional[str]:
+    """Return ``url`` with its page query parameter set to ``number``, or None if it has none."""
+    parts = urlparse(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    param = next((name for name, _ in query if name in PAGE_PARAMS), None)
+    if param is None:
+        return None
+    query = [(name, str(number) if name == param else value) for name, value in query]
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def current_page(url: str) -> int:
+    for name, value in parse_qsl(urlparse(url).query):
+        if name in PAGE_PARAMS and value.isdigit():
+            return int(value)
+    return 1
+
+
+def count_from_responses(page: Page, responses: List[Response], log) -> Optional[int]:
+    """Count customers from a captured data API response, fetching its other pages directly."""
+    # The latest response is the one the table is showing
+    for response in reversed(responses):
+        if CUSTOMER_API_PATTERN not in response.url.lower():
+            continue
+        try:
+            records, pages = extract_records(response.json())
+        except Exception:
+            continue
+        if records is None:
+            continue
+
+        total = len(records)
+        if pages and pages > 1:
+            shown = current_page(response.url)
+            for number in range(1, pages + 1):
+                if number == shown:
+                    continue
+                other = page_url(response.url, number)
+                if other is None:
+                    log(f"[Data API {response.url} is paged but has no page parameter]")
+                    return None
+                try:
+                    other_response = page.request.get(other)
+                    if not other_response.ok:
+                        log(f"[Data API page {number} answered {other_response.status}, not counting from it]")
+                        return None
+                    other_records, _ = extract_records(other_response.json())
+                except Exception as e:
+                    log(f"[Could not read data API page {number}, not counting from it] - {e}")
+                    return None
+                if other_records is None:
+                    log(f"[Data API page {number} has no customer records, not counting from it]")
+                    return None
+                total += len(other_records)
+        log(f"[Counted {total} customers from {pages or 1} data API page(s) at {urlparse(response.url).path}]")
+        return total
+    return None
+
+
+def count_from_store(page: Page) -> Optional[int]:
+    """Count customers from a list the app keeps in browser storage."""
+    try:
+        return page.evaluate(_STORE_COUNT)
+    except Exception:
+        return None
+
+
+def count_sharded(context: BrowserContext, page: Page, url: str, shards: int,
+                  log: Callable[[str], None]) -> Optional[int]:
+    """Sum the rows of every page with a sharded scan.
+
+    Returns None, with ``page`` back on page 1, if the scan can't be sharded
+    or a row shows up on two pages (the table changed while it was scanned),
+    so the caller counts sequentially instead.
+    """
+    row_pages: Dict[str, int] = {}
+    duplicates: Counter = Counter()
+    total = 0
+
+    def count(number: int, shard_page: Page) -> bool:
+        nonlocal total
+        rows = shard_page.locator("table tbody tr").all_inner_texts()
+        for row in rows:
+            if row_pages.setdefault(row, number) != number:
+                duplicates[number] += 1
+        total += len(rows)
+        log(f"[Found {len(rows)} customers on page {number}, total so far: {total}]")
+        return False
+
+    if scan_sharded(context, page, url, shards, log, count) is None:
+        return None
+    if duplicates:
+        log(f"[Warning] {sum(duplicates.values())} rows on pages {', '.join(map(str, sorted(duplicates)))} "
+            f"were already counted on other pages, counting sequentially instead")
+        page.goto(f"{url}/customers")
+        page.locator("table tbody tr").first.wait_for(timeout=DEFAULT_TIMEOUT_MS)
+        return None
+    return total
+
+
+def count_by_pagination(page: Page, log: Callable[[str], None], timer: StepTimer) -> int:
+    """Sum the table rows of every page by clicking "Next" until it is disabled."""
+    rows = page.locator("table tbody tr")
+    total_counted = 0
+    while True:
+        with timer.step("count_page"):
+            row_count = rows.count()
+        total_counted += row_count
+        log(f"[Found {row_count} customers on current page, total so far: {total_counted}]")
+
+        next_span = page.locator("nav[aria-label='pagination'] span:text('Next')")
+        if next_span.count() == 0:
+            log("[Next button span not found]")
+            break
+
+        next_button = next_span.first.locator("xpath=..")
+
+        try:
+            if next_button.get_attribute("aria-disabled") == "true":
+                log("[Reached last page - next button disabled]")
+                break
+
+            with timer.step("next_page"):
+                previous = page.locator("table tbody").first.text_content()
+                next_button.click(timeout=10000)
+                wait_for_text_change(page.locator("table tbody").first, previous)
+            log("[Navigated to the next page]")
+        except Exception as click_error:
+            log(f"[Next button is not interactable, ending pagination] - {click_error}")
+            break
+    return total_counted
+
+
+def count_customers(context: BrowserContext, page: Page, url: str, log: Callable[[str], None],
+                    timer: StepTimer, responses: List[Response], strategy: str = DEFAULT_COUNT_STRATEGY,
+                    shards: int = 1) -> Tuple[Optional[int], Optional[str]]:
+    """Count the customers listed on ``page`` (page 1 of /customers).
+
+    ``responses`` are the data API responses seen while the page loaded.
+    Returns the count and the strategy that produced it, or ``(None, None)``.
+    """
+    strategy = (strategy or "auto").lower()
+    if strategy not in COUNT_STRATEGIES:
+        log(f"[Unknown count strategy '{strategy}', using auto]")
+        strategy = "auto"
+
+    for candidate in ("network", "store", "pagination"):
+        if strategy not in ("auto", candidate):
+            continue
+        total = None
+        started = time.perf_counter()
+        with timer.step(f"count_{candidate}"):
+            if candidate == "network":
+                total = count_from_responses(page, responses, log)
+            elif candidate == "store":
+                total = count_from_store(page)
+            else:
+                if shards > 1:
+                    total = count_sharded(context, page, url, shards, log)
+                if total is None:
+                    total = count_by_pagination(page, log, timer)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if total is not None:
+            log(f"[Count strategy] {candidate}: {total} customers in {elapsed_ms:.0f} ms")
+            return total, candidate
+        log(f"[Count strategy] {candidate} unavailable after {elapsed_ms:.0f} ms")
+    return None, None
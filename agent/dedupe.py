@@ -0,0 +1,73 @@
+"""
+Coalescing of identical task submissions and a short-lived result cache.
+
+Two submissions are identical when they share goal, URL, headless mode and
+the options that change how the test runs (execution mode, count strategy,
+shards and browser profile).
+A new one attaches to an identical task that is still queued or running,
+and for read-only goals it may also reuse a result finished within the
+cache TTL instead of running the browser again.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+# Seconds a finished result of a read-only goal is reused; 0 disables the cache
+CACHE_TTL_SECONDS = float(os.environ.get("QA_RESULT_CACHE_TTL_SECONDS", "60"))
+# Goals that only read the app, so a recent result is as good as a new run
+CACHEABLE_GOALS = {
+    goal.strip().lower()
+    for goal in os.environ.get("QA_CACHEABLE_GOALS", "verify total customers").split(",")
+    if goal.strip()
+}
+
+
+def dedupe_key(parameters: Dict[str, Any]) -> str:
+    """Identify submissions that would run the same test."""
+    identity = {
+        "goal": (parameters.get("goal") or "").strip().lower(),
+        "url": (parameters.get("url") or "").rstrip("/"),
+        "headless": bool(parameters.get("headless")),
+        "execution_mode": (parameters.get("execution_mode") or "").strip().lower() or None,
+        "count_strategy": (parameters.get("count_strategy") or "").strip().lower() or None,
+        "shards": parameters.get("shards") or None,
+        "profile": (parameters.get("profile") or "").strip().lower() or None,
+    }
+    return hashlib.sha1(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+def cache_ttl(parameters: Dict[str, Any]) -> Optional[float]:
+    """Return how long a finished result of this task may be reused, or None."""
+    goal = (parameters.get("goal") or "").strip().lower()
+    if CACHE_TTL_SECONDS > 0 and goal in CACHEABLE_GOALS:
+        return CACHE_TTL_SECONDS
+    return None
+
+
+class DedupeStats:
+    """Thread-safe hit/miss counters for the coalescing layer."""
+
+    OUTCOMES = ("in_flight", "cached", "queued", "forced")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {outcome: 0 for outcome in self.OUTCOMES}
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "in_flight_hits": counts["in_flight"],
+            "cache_hits": counts["cached"],
+            "misses": counts["queued"],
+            "forced": counts["forced"],
+        }
+
+
+dedupe_stats = DedupeStats()
@@ -0,0 +1,92 @@
+"""
+In-process publish/subscribe of task log entries for live streaming.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger("qa_agent_log_bus")
+
+# Batches a subscriber may fall behind before it has to catch up from the database
+MAX_PENDING_BATCHES = 1000
+
+
+class Subscription:
+    """One subscriber's queue of published batches for a single task.
+
+    Items are lists of log entries, or ``None`` once the task has finished.
+    If the subscriber falls too far behind, ``lagged`` is set and newer
+    batches are dropped; the reader is expected to reload from the database.
+    """
+
+    def __init__(self, task_id: str, loop: asyncio.AbstractEventLoop):
+        self.task_id = task_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[List[Dict[str, Any]]]]" = asyncio.Queue(maxsize=MAX_PENDING_BATCHES)
+        self.lagged = False
+
+    def _put(self, item: Optional[List[Dict[str, Any]]]) -> None:
+        # Runs on the subscriber's event loop
+        if item is None:
+            if self.queue.full():
+                self.queue.get_nowait()
+                self.lagged = True
+            self.queue.put_nowait(None)
+        elif self.queue.full():
+            self.lagged = True
+        else:
+            self.queue.put_nowait(item)
+
+
+class LogBus:
+    """Fans new log entries out to every subscriber of a task.
+
+    ``publish`` may be called from any thread; delivery happens on each
+    subscriber's event loop.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, task_id: str) -> Subscription:
+        """Subscribe the running event loop to a task's log entries."""
+        subscription = Subscription(task_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.task_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.task_id]
+
+    def publish(self, task_id: str, entries: List[Dict[str, Any]]) -> None:
+        """Deliver stored log entries to the task's subscribers."""
+        if entries:
+            self._deliver(task_id, entries)
+
+    def finish(self, task_id: str) -> None:
+        """Tell the task's subscribers that no more entries will follow."""
+        self._deliver(task_id, None)
+
+    def subscriber_count(self, task_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(task_id, ()))
+
+    def _deliver(self, task_id: str, item: Optional[List[Dict[str, Any]]]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, item)
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(subscription)
+
+
+log_bus = LogBus()
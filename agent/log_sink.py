@@ -0,0 +1,227 @@
+"""
+Buffered log sinks that batch task log lines into single database writes.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+import traceback
+import weakref
+from typing import Callable, Dict, List, Any, Optional, Set
+
+logger = logging.getLogger("qa_agent_log_sink")
+
+DEFAULT_MAX_LINES = int(os.environ.get("QA_LOG_BATCH_LINES", "50"))
+DEFAULT_MAX_DELAY_MS = int(os.environ.get("QA_LOG_FLUSH_MS", "250"))
+
+# Sinks that are still open, flushed if the interpreter exits before close()
+_open_sinks: "weakref.WeakSet[BufferedLogSink]" = weakref.WeakSet()
+
+
+class _FlushStats:
+    """Flush latency and batch size counters shared by the sinks."""
+
+    def _init_stats(self) -> None:
+        self._flush_count = 0
+        self._line_count = 0
+        self._max_batch = 0
+        self._total_flush_time = 0.0
+        self._max_flush_time = 0.0
+        self._failed_flushes = 0
+
+    def _record_flush(self, lines: int, elapsed: float) -> None:
+        self._flush_count += 1
+        self._line_count += lines
+        self._max_batch = max(self._max_batch, lines)
+        self._total_flush_time += elapsed
+        self._max_flush_time = max(self._max_flush_time, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Flush latency and batch size metrics for this sink."""
+        flushes = self._flush_count
+        return {
+            "flushes": flushes,
+            "lines": self._line_count,
+            "failed_flushes": self._failed_flushes,
+            "avg_batch_size": round(self._line_count / flushes, 2) if flushes else 0.0,
+            "max_batch_size": self._max_batch,
+            "avg_flush_ms": round(self._total_flush_time * 1000 / flushes, 3) if flushes else 0.0,
+            "max_flush_ms": round(self._max_flush_time * 1000, 3),
+        }
+
+
+class BufferedLogSink(_FlushStats):
+    """Collects log lines for one task and writes them in batches.
+
+    A batch is written as soon as ``max_lines`` lines are buffered or the oldest
+    buffered line is ``max_delay_ms`` old, whichever comes first. ``write_batch``
+    receives the task id and the list of messages and should store them in one
+    transaction.
+    """
+
+    def __init__(self, task_id: str, write_batch: Callable[[str, List[str]], None],
+                 max_lines: int = DEFAULT_MAX_LINES, max_delay_ms: int = DEFAULT_MAX_DELAY_MS):
+        self.task_id = task_id
+        self.max_lines = max(1, max_lines)
+        self.max_delay = max(0, max_delay_ms) / 1000.0
+        self._write_batch = write_batch
+        self._buffer: List[str] = []
+        self._first_buffered_at = 0.0
+        self._cond = threading.Condition()
+        # Serializes take-and-write so batches reach the database in order
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._init_stats()
+
+        self._timer = threading.Thread(target=self._run_timer, name=f"log-sink-{task_id}", daemon=True)
+        self._timer.start()
+        _open_sinks.add(self)
+
+    def __enter__(self) -> "BufferedLogSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def write(self, message: str) -> None:
+        """Buffer a log line, flushing right away if the batch is full."""
+        with self._cond:
+            if self._closed:
+                raise ValueError(f"Log sink for task {self.task_id} is closed")
+            if not self._buffer:
+                self._first_buffered_at = time.monotonic()
+                self._cond.notify()
+            self._buffer.append(message)
+            full = len(self._buffer) >= self.max_lines
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered lines in one batch."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            started = time.perf_counter()
+            try:
+                self._write_batch(self.task_id, batch)
+            except Exception as e:
+                self._failed_flushes += 1
+                logger.error(f"Error flushing {len(batch)} log lines for task {self.task_id}: {str(e)}")
+                traceback.print_exc()
+            finally:
+                self._record_flush(len(batch), time.perf_counter() - started)
+
+    def close(self) -> None:
+        """Flush the remaining lines and stop the timer thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._timer.join()
+        self.flush()
+        _open_sinks.discard(self)
+
+    def _run_timer(self) -> None:
+        """Flush the buffer once its oldest line has waited max_delay."""
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                if not self._buffer:
+                    self._cond.wait()
+                    continue
+                remaining = self._first_buffered_at + self.max_delay - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            self.flush()
+
+
+
+class AsyncLogSink(_FlushStats):
+    """Event-loop counterpart of ``BufferedLogSink`` for asyncio readers.
+
+    Batches on the same ``max_lines``/``max_delay_ms`` rules, but the delay is
+    a loop timer rather than a thread, and ``write_batch`` runs on the loop's
+    default executor, so a task holds no thread of its own. Create, write and
+    close it on the event loop.
+    """
+
+    def __init__(self, task_id: str, write_batch: Callable[[str, List[str]], None],
+                 max_lines: int = DEFAULT_MAX_LINES, max_delay_ms: int = DEFAULT_MAX_DELAY_MS):
+        self.task_id = task_id
+        self.max_lines = max(1, max_lines)
+        self.max_delay = max(0, max_delay_ms) / 1000.0
+        self._write_batch = write_batch
+        self._loop = asyncio.get_running_loop()
+        self._buffer: List[str] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Batches are taken in order and asyncio.Lock is FIFO, so they reach the database in order
+        self._flush_lock = asyncio.Lock()
+        self._flushes: Set[asyncio.Task] = set()
+        self._closed = False
+        self._init_stats()
+
+    def write(self, message: str) -> None:
+        """Buffer a log line, scheduling a flush if the batch is full."""
+        if self._closed:
+            raise ValueError(f"Log sink for task {self.task_id} is closed")
+        self._buffer.append(message)
+        if len(self._buffer) >= self.max_lines:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.max_delay, self._schedule_flush)
+
+    def _take(self) -> List[str]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._buffer = self._buffer, []
+        return batch
+
+    def _schedule_flush(self) -> None:
+        batch = self._take()
+        if batch:
+            flush = self._loop.create_task(self._write(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        """Write all buffered lines in one batch."""
+        batch = self._take()
+        if batch:
+            await self._write(batch)
+
+    async def _write(self, batch: List[str]) -> None:
+        async with self._flush_lock:
+            started = time.perf_counter()
+            try:
+                await self._loop.run_in_executor(None, self._write_batch, self.task_id, batch)
+            except Exception as e:
+                self._failed_flushes += 1
+                logger.error(f"Error flushing {len(batch)} log lines for task {self.task_id}: {str(e)}")
+                traceback.print_exc()
+            finally:
+                self._record_flush(len(batch), time.perf_counter() - started)
+
+    async def close(self) -> None:
+        """Flush the remaining lines once pending flushes are done."""
+        if self._closed:
+            return
+        self._closed = True
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+
+@atexit.register
+def _flush_open_sinks() -> None:
+    for sink in list(_open_sinks):
+        try:
+            sink.close()
+        except Exception as e:
+            logger.error(f"Error closing log sink for task {sink.task_id}: {str(e)}")
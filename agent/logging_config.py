@@ -0,0 +1,184 @@
+"""
+Non-blocking, structured logging for the API and agent.
+
+Loggers hand records to a ``QueueHandler``; a single ``QueueListener`` thread
+formats them and does the console and file I/O, so a slow disk never stalls
+the event loop or a test thread. File records are JSON lines carrying the
+task id and step when known, files rotate by size, and high-volume INFO
+loggers can be sampled before their records are even queued.
+
+Settings:
+    QA_LOG_LEVEL        root level (INFO)
+    QA_LOG_FILE         JSON log file, rotated by size (api.log for the API)
+    QA_LOG_MAX_BYTES    size at which the file rotates (10 MB)
+    QA_LOG_BACKUPS      rotated files kept (5)
+    QA_LOG_FORMAT       "text" (default) or "json" for the console
+    QA_LOG_SAMPLE       "logger=N,..." keeps 1 in N records below WARNING
+                        from that logger and its children
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+LOG_LEVEL = os.environ.get("QA_LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.environ.get("QA_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUPS = int(os.environ.get("QA_LOG_BACKUPS", "5"))
+CONSOLE_FORMAT = os.environ.get("QA_LOG_FORMAT", "text").lower()
+# Request lines are the noisiest INFO records under load
+DEFAULT_SAMPLING = "qa_agent_api.access=10"
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# The task the current thread or asyncio task is working on
+current_task_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("qa_task_id", default=None)
+
+
+@contextmanager
+def task_context(task_id: str) -> Iterator[None]:
+    """Tag every record logged inside the block with ``task_id``."""
+    token = current_task_id.set(task_id)
+    try:
+        yield
+    finally:
+        current_task_id.reset(token)
+
+
+def parse_sampling(spec: str) -> Dict[str, int]:
+    """Parse "logger=N,..." into ``{logger: N}``, ignoring malformed entries."""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.strip().partition("=")
+        if name and rate.strip().isdigit() and int(rate) > 1:
+            rates[name.strip()] = int(rate)
+    return rates
+
+
+class TaskContextFilter(logging.Filter):
+    """Fills in ``task_id`` and ``step`` so every record carries both attributes."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "task_id", None) is None:
+            record.task_id = current_task_id.get()
+        if not hasattr(record, "step"):
+            record.step = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in N records below WARNING for the configured loggers."""
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, Iterator[int]] = {}
+        self._resolved: Dict[str, int] = {}
+
+    def _rate(self, name: str) -> int:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1
+            parts = name.split(".")
+            for n in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:n])
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate == 1:
+            return True
+        counter = self._counters.setdefault(record.name, itertools.count())
+        return next(counter) % rate == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's task id and step."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "task_id": getattr(record, "task_id", None),
+            "step": getattr(record, "step", None),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_log_file: Optional[str] = None
+_lock = threading.Lock()
+
+
+def configure_logging(log_file: Optional[str] = None, level: str = LOG_LEVEL,
+                      sampling: Optional[str] = None) -> None:
+    """Route the root logger through a queue to console and, optionally, a rotating JSON file.
+
+    Safe to call more than once; a later call that names a log file adds it.
+    """
+    global _listener, _queue_handler, _log_file
+    log_file = log_file or os.environ.get("QA_LOG_FILE") or _log_file
+    with _lock:
+        if _listener is not None and log_file == _log_file:
+            return
+        _stop_listener()
+
+        console = logging.StreamHandler()
+        console.setFormatter(JsonFormatter() if CONSOLE_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+        handlers = [console]
+        if log_file:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _queue_handler.addFilter(SamplingFilter(parse_sampling(
+            sampling if sampling is not None else os.environ.get("QA_LOG_SAMPLE", DEFAULT_SAMPLING))))
+        _queue_handler.addFilter(TaskContextFilter())
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _log_file = log_file
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+@atexit.register
+def shutdown_logging() -> None:
+    """Flush queued records and close the handlers."""
+    with _lock:
+        _stop_listener()
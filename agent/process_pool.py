@@ -0,0 +1,204 @@
+"""
+Pool of long-lived worker processes that run scenarios outside the API process.
+
+Each worker imports Playwright once and keeps a warm browser between tasks,
+so a task pays neither interpreter start-up nor import cost, and a crashing
+browser or scenario only takes its worker down. Jobs and their log lines
+travel over one pipe per worker.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("qa_agent_process_pool")
+
+DEFAULT_PROCESS_WORKERS = int(os.environ.get("QA_PROCESS_WORKERS", os.environ.get("QA_MAX_WORKERS", "2")))
+# How often a waiting caller checks for cancellation and worker crashes
+POLL_SECONDS = 0.25
+
+# (goal, url, headless, options)
+Job = Tuple[str, str, bool, Optional[Dict[str, Any]]]
+JobHandler = Callable[[Job, Callable[[str], None]], int]
+
+
+class WorkerCrashed(Exception):
+    """The worker process running a job exited before finishing it."""
+
+
+# A worker's own browsers, by profile and headless mode; only used inside worker processes
+_browsers: Dict[Tuple[str, bool], Any] = {}
+
+
+def run_scenario_job(job: Job, log: Callable[[str], None]) -> int:
+    """Run a scenario on the worker's own warm browser."""
+    from agent.browser_pool import BrowserPool
+    from agent.profiles import get_profile, profile_option
+    from agent.scenarios import get_scenario
+
+    goal, url, headless, options = job
+    profile = get_profile(profile_option(options))
+    key = (profile.name, profile.resolve_headless(headless))
+    if key not in _browsers:
+        _browsers[key] = BrowserPool(size=1, headless=headless, profile=profile)
+    return _browsers[key].run(get_scenario(goal), url, log, options)
+
+
+def _worker_main(conn: Connection, handler: JobHandler) -> None:
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+
+            def log(message: str) -> None:
+                conn.send(("log", message))
+
+            try:
+                return_code = handler(job, log)
+            except Exception as e:
+                log(f"[Worker error] {str(e)}")
+                log(traceback.format_exc())
+                return_code = 1
+            conn.send(("done", return_code))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        for browser in _browsers.values():
+            browser.close()
+
+
+class _Worker:
+    def __init__(self, ctx, handler: JobHandler, number: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, handler),
+                                   name=f"qa-process-worker-{number}", daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, timeout: float = 10) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.kill()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+
+class ProcessWorkerPool:
+    """Hands jobs to ``size`` worker processes, one job per worker at a time.
+
+    ``run`` blocks the calling thread until the job finishes, forwarding
+    the worker's log lines to ``log``. A worker that crashes or whose job is
+    cancelled is replaced by a fresh one.
+    """
+
+    def __init__(self, size: int = DEFAULT_PROCESS_WORKERS, handler: JobHandler = run_scenario_job):
+        self.size = max(1, size)
+        self.handler = handler
+        # spawn keeps the API process's threads and sockets out of the workers
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._spawned = 0
+        self._started = False
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+            self._started = True
+        logger.info(f"Process pool started with {self.size} workers")
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._ctx, self.handler, self._spawned)
+        self._spawned += 1
+        self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            if self._started:
+                self._idle.put(self._spawn())
+
+    def run(self, job: Job, log: Callable[[str], None],
+            should_cancel: Optional[Callable[[], bool]] = None) -> Optional[int]:
+        """Run ``job`` on an idle worker and return its return code.
+
+        Returns None if ``should_cancel`` became true; the worker is then
+        killed. Raises ``WorkerCrashed`` if the worker died mid-job.
+        """
+        self.start()
+        worker = self._idle.get()
+        try:
+            worker.conn.send(job)
+            while True:
+                if should_cancel is not None and should_cancel():
+                    self._replace(worker)
+                    return None
+                if not worker.conn.poll(POLL_SECONDS):
+                    if not worker.process.is_alive():
+                        raise EOFError
+                    continue
+                kind, value = worker.conn.recv()
+                if kind == "log":
+                    log(value)
+                elif kind == "done":
+                    self._idle.put(worker)
+                    return value
+        except (EOFError, OSError, BrokenPipeError):
+            # The pipe can close before the process is reaped
+            worker.process.join(POLL_SECONDS)
+            exitcode = worker.process.exitcode
+            self._replace(worker)
+            raise WorkerCrashed(f"Worker process exited with code {exitcode}")
+
+    def close(self) -> None:
+        """Stop every worker, letting running jobs finish first."""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            workers, self._workers = self._workers, []
+            self._idle = queue.Queue()
+        for worker in workers:
+            worker.stop()
+        logger.info("Process pool closed")
+
+
+_pool: Optional[ProcessWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessWorkerPool:
+    """Return the process-wide worker process pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessWorkerPool()
+        return _pool
+
+
+def close_process_pool() -> None:
+    """Stop the worker processes, e.g. on shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,112 @@
+"""
+Named browser execution profiles, selectable per task.
+
+A profile decides how a browser is launched and how its contexts are set
+up: headless or not, window or fixed viewport, and which requests are
+aborted before they reach the network. ``desktop`` is the original set-up (a
+maximized window following the task's headless flag); ``lean`` is meant for
+CI: always headless, a small fixed viewport, and no images, media, fonts or
+analytics.
+"""
+import os
+import re
+from typing import Any, Dict, FrozenSet, Optional, Sequence, Tuple
+
+# Third-party trackers the scenarios never need
+ANALYTICS_HOSTS = re.compile(
+    r"(^|\.)(google-analytics\.com|googletagmanager\.com|doubleclick\.net|segment\.(io|com)|hotjar\.com"
+    r"|mixpanel\.com|amplitude\.com|facebook\.net|clarity\.ms|sentry\.io|intercom\.io|plausible\.io)$"
+)
+HOST_PATTERN = re.compile(r"^[a-z]+://([^/:?#]+)")
+
+
+class ExecutionProfile:
+    """How to launch a browser and configure its contexts."""
+
+    def __init__(self, name: str, headless: Optional[bool] = None, launch_args: Sequence[str] = (),
+                 viewport: Optional[Tuple[int, int]] = None, blocked_resources: Sequence[str] = (),
+                 block_analytics: bool = False):
+        self.name = name
+        # None follows the task's headless flag
+        self.headless = headless
+        self.launch_args = tuple(launch_args)
+        # None keeps the window size (no_viewport)
+        self.viewport = viewport
+        self.blocked_resources: FrozenSet[str] = frozenset(blocked_resources)
+        self.block_analytics = block_analytics
+
+    def resolve_headless(self, headless: bool) -> bool:
+        return self.headless if self.headless is not None else bool(headless)
+
+    @property
+    def blocks_requests(self) -> bool:
+        return bool(self.blocked_resources) or self.block_analytics
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """Whether a request of ``resource_type`` to ``url`` is aborted under this profile."""
+        if resource_type in self.blocked_resources:
+            return True
+        if self.block_analytics:
+            match = HOST_PATTERN.match(url)
+            return bool(match and ANALYTICS_HOSTS.search(match.group(1)))
+        return False
+
+    def launch(self, pw: Any, headless: bool) -> Any:
+        """Launch Chromium for this profile."""
+        return pw.chromium.launch(headless=self.resolve_headless(headless), args=list(self.launch_args))
+
+    def new_context(self, browser: Any) -> Any:
+        """Open a context with the profile's viewport and request blocking.
+
+        Blocking is installed with ``context.route`` rather than ``page.route``,
+        so tabs a scenario opens later (sharded scans) are covered too.
+        """
+        if self.viewport is None:
+            context = browser.new_context(no_viewport=True)
+        else:
+            width, height = self.viewport
+            context = browser.new_context(viewport={"width": width, "height": height})
+        if self.blocks_requests:
+            def handle(route: Any) -> None:
+                request = route.request
+                if self.should_block(request.resource_type, request.url):
+                    route.abort()
+                else:
+                    route.continue_()
+            context.route("**/*", handle)
+        return context
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "headless": "task" if self.headless is None else self.headless,
+            "viewport": f"{self.viewport[0]}x{self.viewport[1]}" if self.viewport else "window",
+            "blocked": sorted(self.blocked_resources) + (["analytics"] if self.block_analytics else []),
+        }
+
+
+PROFILES: Dict[str, ExecutionProfile] = {
+    "desktop": ExecutionProfile("desktop", launch_args=["--start-maximized"]),
+    "lean": ExecutionProfile(
+        "lean",
+        headless=True,
+        launch_args=["--disable-gpu", "--disable-extensions", "--disable-dev-shm-usage",
+                     "--disable-background-networking", "--no-first-run", "--mute-audio"],
+        viewport=(1280, 720),
+        blocked_resources=["image", "media", "font"],
+        block_analytics=True,
+    ),
+}
+DEFAULT_PROFILE = os.environ.get("QA_PROFILE", "desktop").lower()
+
+
+def get_profile(name: Optional[str] = None) -> ExecutionProfile:
+    """Return the named profile, or the default one; raises ValueError for unknown names."""
+    name = (name or DEFAULT_PROFILE).lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown execution profile '{name}', expected one of {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def profile_option(options: Optional[Dict[str, Any]]) -> str:
+    """Return the profile name a task asked for, or the default."""
+    return ((options or {}).get("profile") or DEFAULT_PROFILE).lower()
@@ -1,141 +1,267 @@
+import asyncio
 import subprocess
 import sys
-import sqlite3
 from datetime import datetime
-import json
-from typing import Optional
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Set, Union
 import time
+import threading
 import os
+import re
 import traceback
-from playwright.sync_api import sync_playwright
 import logging
+from agent.browser_pool import get_browser_pool
+from agent.log_bus import log_bus
+from agent.log_sink import AsyncLogSink, BufferedLogSink
+from agent.logging_config import configure_logging, task_context
+from agent.process_pool import WorkerCrashed, get_process_pool
+from agent.profiles import get_profile, profile_option
+from agent.scenarios import get_scenario
+from db.pool import get_pool
+from db.task_states import task_outcome
+from metrics import SUBPROCESS_SECONDS
 
 # Configure database path
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "qa_tasks.db")
 
+# "browser_pool" runs scenarios in-process on warm browsers, "process_pool" on warm browsers
+# in long-lived worker processes, and "subprocess" runs each in a fresh run_scenario.py
+EXECUTION_MODE = os.environ.get("QA_EXECUTION_MODE", "browser_pool")
+# Wall-clock limit for a subprocess-mode script; it is killed once exceeded
+TASK_TIMEOUT_SECONDS = float(os.environ.get("QA_TASK_TIMEOUT_SECONDS", "900"))
+# Return code reported for a script killed by the timeout, as coreutils timeout does
+TIMEOUT_RETURN_CODE = 124
+# Longest single output line the runner reads before splitting it
+STREAM_LIMIT = 1024 * 1024
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler()]
-)
+configure_logging()
 logger = logging.getLogger('qa_agent_db')
 
 try:
     from db.database import Database
     db = Database()
-    print("Successfully imported Database class")
+    logger.debug("Successfully imported Database class")
 except ImportError as e:
-    print(f"Failed to import Database class: {str(e)}")
+    logger.error(f"Failed to import Database class: {str(e)}")
     db = None
 
+# Child processes of running tasks, so a cancellation can stop them
+_running_processes: Dict[str, Union[subprocess.Popen, asyncio.subprocess.Process]] = {}
+_cancel_requested: Set[str] = set()
+_process_lock = threading.Lock()
+# What a run reported beyond pass/fail, for its result; count_customers logs the strategy that answered as
+# "[Count strategy] network: 42 customers in 120 ms" whichever execution mode ran it
+_COUNT_STRATEGY_LINE = re.compile(r"^\[Count strategy\] (\w+): (\d+) customers in (\d+) ms$")
+_run_details: Dict[str, str] = {}
+
+def cancel_running_task(task_id: str):
+    """Stop a task's test script, now or as soon as it is started."""
+    with _process_lock:
+        _cancel_requested.add(task_id)
+        process = _running_processes.get(task_id)
+    if process is not None and process.returncode is None:
+        logger.info(f"Terminating test process for task {task_id}", extra={"task_id": task_id})
+        process.terminate()
+
+def _forget_process(task_id: str):
+    with _process_lock:
+        _running_processes.pop(task_id, None)
+        _cancel_requested.discard(task_id)
+
 def log_step(task_id: str, step_message: str):
+    log_steps(task_id, [step_message])
+
+def run_detail(task_id: str) -> Optional[str]:
+    """Take the detail a finished run reported for its result, e.g. the count strategy used."""
+    with _process_lock:
+        return _run_details.pop(task_id, None)
+
+def _note_run_details(task_id: str, step_messages: List[str]):
+    for message in step_messages:
+        if message.startswith("[Count strategy]"):
+            match = _COUNT_STRATEGY_LINE.match(message)
+            if match:
+                strategy, total, elapsed_ms = match.groups()
+                with _process_lock:
+                    _run_details[task_id] = f"counted {total} customers via {strategy} in {elapsed_ms} ms"
+
+def log_steps(task_id: str, step_messages: List[str]):
     try:
         task_id = task_id.strip('"')
+        _note_run_details(task_id, step_messages)
         if db is not None:
             try:
-                db.log_step(task_id, step_message)
+                entries = db.log_steps(task_id, step_messages)
             except Exception as db_error:
-                print(f"Database log_step failed: {str(db_error)}")
-                _log_step_direct(task_id, step_message)
+                logger.error(f"Database log_steps failed: {str(db_error)}", extra={"task_id": task_id})
+                entries = _log_steps_direct(task_id, step_messages)
         else:
-            _log_step_direct(task_id, step_message)
+            entries = _log_steps_direct(task_id, step_messages)
+        log_bus.publish(task_id, entries)
     except Exception as e:
-        print(f"Error logging step: {str(e)}")
+        logger.error(f"Error logging steps: {str(e)}", extra={"task_id": task_id})
         traceback.print_exc()
 
 def _log_step_direct(task_id: str, step_message: str):
+    return _log_steps_direct(task_id, [step_message])
+
+def _log_steps_direct(task_id: str, step_messages: List[str]) -> List[Dict]:
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute(
-            "INSERT INTO logs (task_id, timestamp, message) VALUES (?, ?, ?)",
-            (task_id, timestamp, step_message)
-        )
-        conn.commit()
-        conn.close()
+        with get_pool(DB_PATH).transaction() as conn:
+            cursor = conn.cursor()
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if not conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM task_logs WHERE task_id = ?", (task_id,))
+            last_seq = cursor.fetchone()[0]
+            cursor.executemany(
+                "INSERT INTO task_logs (task_id, seq, ts, message) VALUES (?, ?, ?, ?)",
+                [(task_id, last_seq + i, timestamp, message) for i, message in enumerate(step_messages, start=1)]
+            )
+        return [
+            {"seq": last_seq + i, "timestamp": timestamp, "message": message}
+            for i, message in enumerate(step_messages, start=1)
+        ]
     except Exception as e:
-        print(f"Error logging step: {str(e)}")
+        logger.error(f"Error logging step: {str(e)}", extra={"task_id": task_id})
+        return []
+
+class TaskCancelled(Exception):
+    """Raised inside an in-process scenario once its task is cancelled."""
+
+async def _pump_stream(stream: asyncio.StreamReader, sink: AsyncLogSink, tag: str = ""):
+    while True:
+        try:
+            line = await stream.readline()
+        except ValueError:
+            # Line longer than STREAM_LIMIT: take what is buffered and carry on
+            line = await stream.read(STREAM_LIMIT)
+        if not line:
+            return
+        sink.write(tag + line.decode(errors="replace").rstrip("\r\n"))
+
+async def _run_script(task_id: str, script_path: str, url: str, headless: bool,
+                      options: Optional[Dict[str, Any]] = None, goal: str = "add customer",
+                      timeout: float = TASK_TIMEOUT_SECONDS) -> int:
+    env = os.environ.copy()
+    env["TEST_GOAL"] = goal
+    env["TEST_URL"] = url
+    env["TEST_HEADLESS"] = str(headless)
+    # Scenario options reach the standalone scripts as QA_<OPTION> settings
+    for key, value in (options or {}).items():
+        env[f"QA_{key.upper()}"] = str(value)
+
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, script_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+        limit=STREAM_LIMIT
+    )
+    with _process_lock:
+        _running_processes[task_id] = process
+        cancelled = task_id in _cancel_requested
+    if cancelled:
+        process.terminate()
 
-def _ensure_task_exists(task_id: str, url: str = None, headless: bool = None):
+    # Both pipes are drained as output arrives, so a chatty stderr can't fill its pipe and stall the script
+    sink = AsyncLogSink(task_id, log_steps)
+    return_code = None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id TEXT PRIMARY KEY,
-                status TEXT,
-                result TEXT,
-                logs TEXT,
-                parameters TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                task_id TEXT,
-                timestamp TEXT,
-                message TEXT
-            )
-        ''')
-        conn.commit()
-        cursor.execute('SELECT COUNT(*) FROM tasks WHERE id = ?', (task_id,))
-        if cursor.fetchone()[0] == 0:
-            print(f"Creating task {task_id} in database (direct)")
-            parameters = json.dumps({"url": url, "headless": headless}) if url or headless is not None else None
-            cursor.execute(
-                'INSERT INTO tasks (id, status, result, logs, parameters) VALUES (?, ?, ?, ?, ?)',
-                (task_id, "pending", None, "[]", parameters)
-            )
-            conn.commit()
+        await asyncio.wait_for(asyncio.gather(
+            _pump_stream(process.stdout, sink),
+            _pump_stream(process.stderr, sink, "[stderr] "),
+            process.wait()
+        ), timeout)
+        return_code = process.returncode
+        outcome = "passed" if return_code == 0 else "failed"
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        sink.write(f"[Timeout] Script killed after {timeout:g} seconds")
+        return_code = TIMEOUT_RETURN_CODE
+        outcome = "timeout"
     finally:
-        if 'conn' in locals():
-            conn.close()
+        # Through the sink too, so the loop never waits on the database
+        if return_code is not None:
+            sink.write(f"Process completed with return code: {return_code}")
+        await sink.close()
+        logger.info(f"Task {task_id} log sink stats: {sink.stats()}")
+
+    SUBPROCESS_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started)
+    return return_code
+
+def _run_in_browser_pool(task_id: str, url: str, headless: bool, goal: str,
+                         options: Optional[Dict[str, Any]] = None) -> int:
+    scenario = get_scenario(goal)
+    pool = get_browser_pool(headless, profile_option(options))
+    log_step(task_id, f"Running scenario '{scenario.__name__}' on a warm {'headless' if pool.headless else 'headed'} "
+                      f"browser, profile '{pool.profile.name}'")
+
+    sink = BufferedLogSink(task_id, log_steps)
+
+    def scenario_log(message: str):
+        # Scenarios log after every action, which makes this the cancellation point
+        if task_id in _cancel_requested:
+            raise TaskCancelled(task_id)
+        sink.write(message)
 
-def _update_task_direct(task_id: str, status: str, result: Optional[str] = None):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        _ensure_task_exists(task_id)
-        if result is not None:
-            cursor.execute('UPDATE tasks SET status = ?, result = ? WHERE id = ?', (status, result, task_id))
-        else:
-            cursor.execute('UPDATE tasks SET status = ? WHERE id = ?', (status, task_id))
-        conn.commit()
+        return_code = pool.run(scenario, url, scenario_log, options)
+    except TaskCancelled:
+        return_code = 1
     finally:
-        if 'conn' in locals():
-            conn.close()
+        sink.close()
+        logger.info(f"Task {task_id} log sink stats: {sink.stats()}")
 
-def run_test_sync(task_id: str, url: str = "https://qacrmdemo.netlify.app", headless: bool = False, goal: str = "add customer"):
+    log_step(task_id, f"Scenario completed with return code: {return_code}")
+    return return_code
+
+def _run_in_process_pool(task_id: str, url: str, headless: bool, goal: str,
+                         options: Optional[Dict[str, Any]] = None) -> int:
+    profile = get_profile(profile_option(options))
+    log_step(task_id, f"Running goal '{goal}' on a worker process with a warm "
+                      f"{'headless' if profile.resolve_headless(headless) else 'headed'} browser, profile '{profile.name}'")
+
+    sink = BufferedLogSink(task_id, log_steps)
     try:
-        print(f"Starting test execution for task {task_id} with goal: {goal}")
-        task_id = task_id.strip('"')
-        log_step(task_id, f"Starting test with direct debug for goal: {goal}")
+        return_code = get_process_pool().run(
+            (goal, url, headless, options),
+            sink.write,
+            should_cancel=lambda: task_id in _cancel_requested
+        )
+    except WorkerCrashed as e:
+        sink.write(f"[Worker crashed] {str(e)}")
+        return_code = 1
+    finally:
+        sink.close()
+        logger.info(f"Task {task_id} log sink stats: {sink.stats()}")
 
-        if db is not None:
-            try:
-                task_info = db.get_task(task_id)
-                if not task_info:
-                    parameters = {"url": url, "headless": headless, "goal": goal}
-                    db.create_task(task_id, parameters)
-            except Exception as db_error:
-                print(f"Database operation failed: {str(db_error)}")
-                _ensure_task_exists(task_id, url, headless)
-        else:
-            _ensure_task_exists(task_id, url, headless)
+    if return_code is None:
+        log_step(task_id, "Worker process stopped, task cancelled")
+        return 1
+    log_step(task_id, f"Scenario completed with return code: {return_code}")
+    return return_code
+
+def _prepare_task(task_id: str, url: str, headless: bool, goal: str, mode: str) -> Optional[str]:
+    """Record the task's set-up and mark it running; returns the script path in subprocess mode."""
+    log_step(task_id, f"Starting test with direct debug for goal: {goal}")
 
-        log_step(task_id, f"Setting up test with URL: {url}, headless: {headless}")
+    # One write: creates the task if it was started directly, a no-op for one the runner already claimed
+    if db is not None and not db.start_task(task_id, {"url": url, "headless": headless, "goal": goal}):
+        raise Exception(f"Task {task_id} has already finished")
 
-        script_name = "temp_test.py" if goal.lower() != "verify total customers" else "verify_total_customers.py"
-        script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", script_name)
+    log_step(task_id, f"Setting up test with URL: {url}, headless: {headless}, mode: {mode}")
 
-        log_step(task_id, "Starting test execution")
-        os.environ["TEST_URL"] = url
-        os.environ["TEST_HEADLESS"] = str(headless)
+    log_step(task_id, "Starting test execution")
+    script_path = None
+    if mode == "subprocess":
+        # One runner script serves every goal defined in scenarios/
+        script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "run_scenario.py")
 
-        python_executable = sys.executable
-        log_step(task_id, f"Using Python executable: {python_executable}")
+        log_step(task_id, f"Using Python executable: {sys.executable}")
         log_step(task_id, f"Script path: {script_path}")
         if os.path.exists(script_path):
             log_step(task_id, "Script exists")
@@ -144,71 +270,95 @@ def run_test_sync(task_id: str, url: str = "https://qacrmdemo.netlify.app", head
             log_step(task_id, "Script does not exist")
             raise Exception("Failed to locate the script")
 
-        if db is not None:
-            try:
-                db.update_task(task_id, "running")
-            except Exception as db_error:
-                print(f"Database update failed: {str(db_error)}")
-                _update_task_direct(task_id, "running")
-        else:
-            _update_task_direct(task_id, "running")
+    return script_path
 
-        try:
-            env = os.environ.copy()
-            env["TEST_URL"] = url
-            env["TEST_HEADLESS"] = str(headless)
-
-            process = subprocess.Popen(
-                [python_executable, script_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                env=env
-            )
+# The runner that claimed the task records its terminal status once, from the return code;
+# these only report it
+def _finish_task(task_id: str, return_code: int) -> int:
+    _forget_process(task_id)
+    return 0 if return_code == 0 else 1
 
-            for stdout_line in iter(process.stdout.readline, ""):
-                if stdout_line:
-                    log_step(task_id, stdout_line.strip())
-            process.stdout.close()
+def _fail_run(task_id: str, mode: str, e: Exception) -> int:
+    _forget_process(task_id)
+    error_msg = f"Error running {mode} test: {str(e)}"
+    log_step(task_id, error_msg)
+    # From the exception itself, as this may run on another thread than the one that caught it
+    traceback.print_exception(type(e), e, e.__traceback__)
+    return 1
 
-            stderr = process.stderr.read()
-            if stderr:
-                log_step(task_id, f"STDERR:\n{stderr}")
+def _fail_setup(task_id: str, e: Exception) -> int:
+    error_msg = f"Error during test: {str(e)}"
+    traceback.print_exception(type(e), e, e.__traceback__)
+    log_step(task_id, error_msg)
+    log_step(task_id, "".join(traceback.format_exception(type(e), e, e.__traceback__)))
+    return 1
 
-            return_code = process.wait()
-            log_step(task_id, f"Process completed with return code: {return_code}")
+def run_test_sync(task_id: str, url: str = "https://qacrmdemo.netlify.app", headless: bool = False, goal: str = "add customer",
+                  execution_mode: Optional[str] = None, options: Optional[Dict[str, Any]] = None):
+    # Executor threads don't inherit the caller's context, so tag this thread's records here
+    with task_context(task_id.strip('"')):
+        return _run_test(task_id, url, headless, goal, execution_mode, options)
 
-            if return_code == 0:
-                _update_task_direct(task_id, "completed", "Test completed successfully")
-                return 0
+def _run_test(task_id: str, url: str, headless: bool, goal: str,
+              execution_mode: Optional[str], options: Optional[Dict[str, Any]]):
+    try:
+        logger.info(f"Starting test execution for task {task_id} with goal: {goal}")
+        task_id = task_id.strip('"')
+        mode = (execution_mode or EXECUTION_MODE).lower()
+        script_path = _prepare_task(task_id, url, headless, goal, mode)
+
+        try:
+            if mode == "subprocess":
+                return_code = asyncio.run(_run_script(task_id, script_path, url, headless, options, goal))
+            elif mode == "process_pool":
+                return_code = _run_in_process_pool(task_id, url, headless, goal, options)
             else:
-                result_msg = f"{'Verify total customers test' if goal.lower() == 'verify total customers' else 'Add customer test'} failed with return code {return_code}"
-                _update_task_direct(task_id, "failed", result_msg)
-                return 1
+                return_code = _run_in_browser_pool(task_id, url, headless, goal, options)
+            return _finish_task(task_id, return_code)
+        except Exception as e:
+            return _fail_run(task_id, mode, e)
 
+    except Exception as e:
+        return _fail_setup(task_id, e)
+
+async def run_test_async(task_id: str, url: str = "https://qacrmdemo.netlify.app", headless: bool = False,
+                         goal: str = "add customer", execution_mode: Optional[str] = None,
+                         options: Optional[Dict[str, Any]] = None, executor: Optional[Executor] = None):
+    """Run a test from the event loop.
+
+    Subprocess mode runs the script on the loop itself, so a running task
+    holds no thread; only its set-up and failure reporting, which write to
+    the database, briefly use one. The in-process modes drive Playwright's
+    sync API and still run ``run_test_sync`` on ``executor``.
+    """
+    mode = (execution_mode or EXECUTION_MODE).lower()
+    if mode != "subprocess":
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, run_test_sync, task_id, url, headless, goal, mode, options)
+
+    with task_context(task_id.strip('"')):
+        return await _run_test_subprocess(task_id, url, headless, goal, options)
+
+async def _run_test_subprocess(task_id: str, url: str, headless: bool, goal: str,
+                               options: Optional[Dict[str, Any]]):
+    mode = "subprocess"
+    try:
+        logger.info(f"Starting test execution for task {task_id} with goal: {goal}")
+        task_id = task_id.strip('"')
+        # to_thread keeps the task's log context and keeps these database writes off the loop
+        script_path = await asyncio.to_thread(_prepare_task, task_id, url, headless, goal, mode)
+
+        try:
+            return_code = await _run_script(task_id, script_path, url, headless, options, goal)
+            return _finish_task(task_id, return_code)
         except Exception as e:
-            error_msg = f"Error running subprocess: {str(e)}"
-            log_step(task_id, error_msg)
-            traceback.print_exc()
-            _update_task_direct(task_id, "failed", error_msg)
-            return 1
+            return await asyncio.to_thread(_fail_run, task_id, mode, e)
 
     except Exception as e:
-        error_msg = f"Error during test: {str(e)}"
-        traceback.print_exc()
-        log_step(task_id, error_msg)
-        log_step(task_id, traceback.format_exc())
-        if db is not None:
-            try:
-                db.update_task(task_id, "failed", error_msg)
-            except Exception as db_error:
-                print(f"Database update failed: {str(db_error)}")
-                _update_task_direct(task_id, "failed", error_msg)
-        else:
-            _update_task_direct(task_id, "failed", error_msg)
-        return 1
+        return await asyncio.to_thread(_fail_setup, task_id, e)
 
 if __name__ == "__main__":
-    run_test_sync("manual-debug-task")
+    # Run outside the queue, so nothing else records the outcome; a finished earlier run is reset first
+    db.reset_task("manual-debug-task", {"goal": "add customer"})
+    return_code = run_test_sync("manual-debug-task")
+    db.update_task("manual-debug-task", *task_outcome("add customer", return_code))
@@ -0,0 +1,404 @@
+"""
+Declarative browser scenarios.
+
+A scenario is a YAML or JSON file in ``scenarios/`` (or ``QA_SCENARIO_DIR``)
+naming the goal it handles and a list of steps::
+
+    goal: add customer
+    variables:
+      customer_name: "Test Customer {timestamp}"
+    steps:
+      - navigate: {path: /customers, wait_for: "text=Add Customer"}
+      - click: {selector: "text=Add Customer", wait_for: "form input"}
+      - fill_form: {selector: "form input", values: ["{customer_name}", ...]}
+      - submit: "button[type='submit']"
+      - paginate_until: {found: "text={customer_name}"}
+
+Each file is compiled once into a ``ScenarioPlan`` (steps validated and
+bound to their handlers, templates checked against the variables in
+scope) and cached until the file changes. Plans have the same call
+signature as the Python scenarios, so they run on the shared browser pool.
+
+Step types:
+
+- ``log: <message>``
+- ``navigate: <path>`` or ``{path, wait_for}``
+- ``click: <selector>`` or ``{selector, wait_for}``
+- ``fill_form: {selector, values}``
+- ``submit: <selector>``: click and wait for the page to re-render
+- ``wait_for: <selector>`` or ``{selector, state, timeout, message}``
+- ``read_number: {selector, save_as}``
+- ``paginate_until: {found: <selector>}``: page through the table until
+  the selector is visible; fails if it never is
+- ``paginate_until: {count: <variable>}``: count the table's rows across
+  all pages (using the fastest count strategy available) into a variable
+- ``assert_count: {actual, expected}``: compare two variables or numbers
+
+``{name}`` in a string is replaced by a variable: ``timestamp``, ``url``,
+the scenario's ``variables`` or anything saved by an earlier step.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import yaml
+from playwright.sync_api import BrowserContext, Page, Response, TimeoutError as PlaywrightTimeoutError
+
+from agent.customer_count import DEFAULT_COUNT_STRATEGY, ResponseRecorder, count_customers
+from agent.sharding import search_pages, shard_option
+from agent.waits import DEFAULT_TIMEOUT_MS, StepTimer, wait_for_dom_change, wait_for_number
+
+logger = logging.getLogger("qa_agent_scenarios")
+
+SCENARIO_DIR = os.environ.get(
+    "QA_SCENARIO_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scenarios")
+)
+SCENARIO_EXTENSIONS = (".yaml", ".yml", ".json")
+BUILTIN_VARIABLES = ("timestamp", "url")
+
+LogFn = Callable[[str], None]
+
+_TEMPLATE = re.compile(r"\{(\w+)\}")
+
+
+class ScenarioDefinitionError(ValueError):
+    """A scenario file is malformed or refers to an unknown step or variable."""
+
+
+class StepFailed(Exception):
+    """A step's check did not hold; the scenario fails with this message."""
+
+
+class RunState:
+    """Everything a running plan's steps share."""
+
+    def __init__(self, context: BrowserContext, url: str, log: LogFn, options: Dict[str, Any], timer: StepTimer):
+        self.context = context
+        self.url = url.rstrip("/")
+        self.log = log
+        self.options = options
+        self.timer = timer
+        self.page: Optional[Page] = None
+        self.responses: List[Response] = []
+        self.variables: Dict[str, Any] = {}
+
+    def render(self, template: str) -> str:
+        return _TEMPLATE.sub(lambda match: str(self.variables[match.group(1)]), template)
+
+    def value(self, ref: Any) -> Any:
+        """Resolve a step argument naming a variable, or pass a literal through."""
+        if isinstance(ref, str) and ref in self.variables:
+            return self.variables[ref]
+        return self.render(ref) if isinstance(ref, str) else ref
+
+
+StepFn = Callable[[RunState], None]
+
+
+def _template_names(value: Any) -> Set[str]:
+    if isinstance(value, str):
+        return set(_TEMPLATE.findall(value))
+    if isinstance(value, list):
+        return set().union(*(_template_names(item) for item in value)) if value else set()
+    if isinstance(value, dict):
+        return set().union(*(_template_names(item) for item in value.values())) if value else set()
+    return set()
+
+
+def _args(kind: str, raw: Any, shorthand: Optional[str], required: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Normalise a step's arguments, expanding the ``step: value`` shorthand."""
+    if isinstance(raw, dict):
+        args = dict(raw)
+    elif shorthand is not None and isinstance(raw, (str, int)):
+        args = {shorthand: raw}
+    else:
+        raise ScenarioDefinitionError(f"'{kind}' needs a mapping of arguments")
+    missing = [name for name in required if name not in args]
+    if missing:
+        raise ScenarioDefinitionError(f"'{kind}' is missing {', '.join(missing)}")
+    return args
+
+
+# Step compilers: each turns a step's arguments into a function of the run state
+
+def _compile_log(raw: Any) -> StepFn:
+    message = _args("log", raw, "message", ("message",))["message"]
+
+    def run(state: RunState) -> None:
+        state.log(state.render(message))
+    return run
+
+
+def _compile_navigate(raw: Any) -> StepFn:
+    args = _args("navigate", raw, "path", ("path",))
+    path, wait_for = args["path"], args.get("wait_for")
+
+    def run(state: RunState) -> None:
+        if state.page is None:
+            state.page = state.context.new_page()
+        # Keep the data API responses the page loads for count strategies
+        with ResponseRecorder(state.page) as recorder:
+            state.page.goto(f"{state.url}{state.render(path)}", wait_until="domcontentloaded")
+            if wait_for:
+                state.page.locator(state.render(wait_for)).first.wait_for(timeout=DEFAULT_TIMEOUT_MS)
+        state.responses = recorder.responses
+        state.log(f"[Navigated to {state.render(path)}]")
+    return run
+
+
+def _compile_click(raw: Any) -> StepFn:
+    args = _args("click", raw, "selector", ("selector",))
+    selector, wait_for = args["selector"], args.get("wait_for")
+
+    def run(state: RunState) -> None:
+        state.page.locator(state.render(selector)).first.click()
+        state.log(f"[Clicked {state.render(selector)}]")
+        if wait_for:
+            state.page.locator(state.render(wait_for)).first.wait_for(timeout=DEFAULT_TIMEOUT_MS)
+    return run
+
+
+def _compile_fill_form(raw: Any) -> StepFn:
+    args = _args("fill_form", raw, None, ("selector", "values"))
+    selector, values = args["selector"], args["values"]
+    if not isinstance(values, list):
+        raise ScenarioDefinitionError("'fill_form' values must be a list")
+
+    def run(state: RunState) -> None:
+        inputs = state.page.locator(state.render(selector))
+        for i, template in enumerate(values):
+            value = state.render(str(template))
+            # fill() waits for the input to be editable
+            inputs.nth(i).fill(value)
+            state.log(f"[Field {i+1} filled: {value}]")
+        state.log("[All form fields filled]")
+    return run
+
+
+def _compile_submit(raw: Any) -> StepFn:
+    selector = _args("submit", raw, "selector", ("selector",))["selector"]
+
+    def run(state: RunState) -> None:
+        button = state.page.locator(state.render(selector)).first
+        try:
+            # Saving re-renders the page (form closes, list updates)
+            wait_for_dom_change(state.page, "body", button.click)
+        except PlaywrightTimeoutError:
+            state.log("[No page update seen after submit]")
+        state.log("[Form submitted]")
+    return run
+
+
+def _compile_wait_for(raw: Any) -> StepFn:
+    args = _args("wait_for", raw, "selector", ("selector",))
+    selector, state_name = args["selector"], args.get("state", "visible")
+    timeout, message = int(args.get("timeout", DEFAULT_TIMEOUT_MS)), args.get("message")
+
+    def run(state: RunState) -> None:
+        locator = state.page.locator(state.render(selector)).first
+        try:
+            if state_name == "visible":
+                locator.scroll_into_view_if_needed(timeout=timeout)
+            locator.wait_for(state=state_name, timeout=timeout)
+        except PlaywrightTimeoutError:
+            raise StepFailed(message or f"{state.render(selector)} not {state_name} after {timeout} ms")
+    return run
+
+
+def _compile_read_number(raw: Any) -> StepFn:
+    args = _args("read_number", raw, None, ("selector", "save_as"))
+    selector, save_as = args["selector"], args["save_as"]
+
+    def run(state: RunState) -> None:
+        try:
+            state.variables[save_as] = wait_for_number(state.page.locator(state.render(selector)).first)
+        except AssertionError:
+            raise StepFailed(f"No number shown at {state.render(selector)}")
+        state.log(f"[Read {save_as}: {state.variables[save_as]}]")
+    return run
+
+
+def _compile_paginate_until(raw: Any) -> StepFn:
+    args = _args("paginate_until", raw, None)
+    if ("found" in args) == ("count" in args):
+        raise ScenarioDefinitionError("'paginate_until' needs exactly one of 'found' or 'count'")
+
+    if "found" in args:
+        selector = args["found"]
+
+        def run(state: RunState) -> None:
+            target = state.render(selector)
+            if not search_pages(state.context, state.page, state.url, target, shard_option(state.options),
+                                state.log, state.timer):
+                raise StepFailed(f"{target} not found after pagination")
+            state.log(f"[Found {target}]")
+        return run
+
+    save_as = args["count"]
+
+    def count(state: RunState) -> None:
+        strategy = state.options.get("count_strategy") or args.get("strategy") or DEFAULT_COUNT_STRATEGY
+        total, used = count_customers(state.context, state.page, state.url, state.log, state.timer,
+                                      state.responses, strategy, shard_option(state.options))
+        if total is None:
+            raise StepFailed(f"Could not count rows with strategy '{strategy}'")
+        state.variables[save_as] = total
+        state.log(f"[Total counted via {used}: {total}]")
+    return count
+
+
+def _compile_assert_count(raw: Any) -> StepFn:
+    args = _args("assert_count", raw, None, ("actual", "expected"))
+
+    def run(state: RunState) -> None:
+        actual, expected = int(state.value(args["actual"])), int(state.value(args["expected"]))
+        if actual != expected:
+            raise StepFailed(f"Count mismatch: expected {args['expected']}={expected}, "
+                             f"got {args['actual']}={actual}")
+        state.log(f"[SUCCESS] {args['actual']} matches {args['expected']}: {actual}")
+    return run
+
+
+STEP_TYPES: Dict[str, Callable[[Any], StepFn]] = {
+    "log": _compile_log,
+    "navigate": _compile_navigate,
+    "click": _compile_click,
+    "fill_form": _compile_fill_form,
+    "submit": _compile_submit,
+    "wait_for": _compile_wait_for,
+    "read_number": _compile_read_number,
+    "paginate_until": _compile_paginate_until,
+    "assert_count": _compile_assert_count,
+}
+
+
+class ScenarioPlan:
+    """A compiled scenario, callable like the Python scenarios."""
+
+    def __init__(self, name: str, goal: str, variables: Dict[str, str], steps: List[Tuple[str, StepFn]]):
+        self.__name__ = name
+        self.goal = goal
+        self.variables = variables
+        self.steps = steps
+
+    def __call__(self, context: BrowserContext, url: str, log: LogFn,
+                 options: Optional[Dict[str, Any]] = None) -> int:
+        timer = StepTimer(log)
+        state = RunState(context, url, log, options or {}, timer)
+        state.variables.update(timestamp=int(time.time()), url=state.url)
+        for name, template in self.variables.items():
+            state.variables[name] = state.render(template)
+
+        try:
+            for n, (label, step) in enumerate(self.steps, 1):
+                started = time.perf_counter()
+                with timer.step(label):
+                    step(state)
+                log(f"[Step {n}/{len(self.steps)} {label}] {(time.perf_counter() - started) * 1000:.0f} ms")
+            return 0
+        except StepFailed as e:
+            log(f"[FAIL] {str(e)}")
+            return 1
+        except Exception as e:
+            log(f"[Test error] {str(e)}")
+            log(traceback.format_exc())
+            return 1
+        finally:
+            timer.log_profile()
+
+
+def compile_definition(definition: Dict[str, Any], name: str = "scenario") -> ScenarioPlan:
+    """Validate a scenario definition and bind its steps to their handlers."""
+    if not isinstance(definition, dict):
+        raise ScenarioDefinitionError(f"{name}: expected a mapping at the top level")
+    goal = definition.get("goal")
+    steps = definition.get("steps")
+    if not isinstance(goal, str) or not goal.strip():
+        raise ScenarioDefinitionError(f"{name}: 'goal' is required")
+    if not isinstance(steps, list) or not steps:
+        raise ScenarioDefinitionError(f"{name}: 'steps' must be a non-empty list")
+
+    variables = definition.get("variables") or {}
+    if not isinstance(variables, dict):
+        raise ScenarioDefinitionError(f"{name}: 'variables' must be a mapping")
+    known = set(BUILTIN_VARIABLES)
+    for var, template in variables.items():
+        unknown = _template_names(template) - known
+        if unknown:
+            raise ScenarioDefinitionError(f"{name}: variable '{var}' uses undefined {sorted(unknown)}")
+        known.add(var)
+    variables = {var: str(template) for var, template in variables.items()}
+
+    compiled: List[Tuple[str, StepFn]] = []
+    for n, step in enumerate(steps, 1):
+        if not isinstance(step, dict) or len(step) != 1:
+            raise ScenarioDefinitionError(f"{name}: step {n} must be a single 'type: arguments' entry")
+        kind, raw = next(iter(step.items()))
+        compiler = STEP_TYPES.get(kind)
+        if compiler is None:
+            raise ScenarioDefinitionError(f"{name}: step {n} has unknown type '{kind}'")
+
+        unknown = _template_names(raw) - known
+        if unknown:
+            raise ScenarioDefinitionError(f"{name}: step {n} ({kind}) uses undefined {sorted(unknown)}")
+        try:
+            compiled.append((kind, compiler(raw)))
+        except ScenarioDefinitionError as e:
+            raise ScenarioDefinitionError(f"{name}: step {n}: {str(e)}")
+
+        if isinstance(raw, dict):
+            for key in ("save_as", "count"):
+                if isinstance(raw.get(key), str):
+                    known.add(raw[key])
+
+    return ScenarioPlan(name, goal.strip(), variables, compiled)
+
+
+_plans: Dict[str, Tuple[float, ScenarioPlan]] = {}
+_plans_lock = threading.Lock()
+
+
+def load_plan(path: str) -> ScenarioPlan:
+    """Compile a scenario file, reusing the cached plan while the file is unchanged."""
+    path = os.path.realpath(path)
+    mtime = os.path.getmtime(path)
+    with _plans_lock:
+        cached = _plans.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, encoding="utf-8") as f:
+        definition = json.load(f) if path.endswith(".json") else yaml.safe_load(f)
+    plan = compile_definition(definition, os.path.splitext(os.path.basename(path))[0])
+
+    with _plans_lock:
+        _plans[path] = (mtime, plan)
+    return plan
+
+
+def load_scenarios(directory: str = SCENARIO_DIR) -> Dict[str, ScenarioPlan]:
+    """Compile every scenario file in ``directory``, keyed by lower-cased goal."""
+    plans: Dict[str, ScenarioPlan] = {}
+    if not os.path.isdir(directory):
+        return plans
+    for entry in sorted(os.listdir(directory)):
+        if not entry.endswith(SCENARIO_EXTENSIONS):
+            continue
+        try:
+            plan = load_plan(os.path.join(directory, entry))
+        except Exception as e:
+            logger.error(f"Error loading scenario {entry}: {str(e)}")
+            continue
+        plans[plan.goal.lower()] = plan
+    return plans
+
+
+def get_plan(goal: str, directory: str = SCENARIO_DIR) -> Optional[ScenarioPlan]:
+    """Return the compiled scenario for a goal, if one is defined."""
+    return load_scenarios(directory).get((goal or "").strip().lower())
@@ -0,0 +1,37 @@
+"""
+Browser test scenarios shared by the in-process runner and the standalone scripts.
+
+Scenarios are defined declaratively in ``scenarios/*.yaml`` and compiled by
+``agent.scenario_engine``. Each one is called with a Playwright
+``BrowserContext``, the base URL of the app under test, a ``log`` callable
+and an optional dict of per-task options, and returns 0 on success or 1 on
+failure.
+"""
+from typing import Any, Callable, Dict, Optional
+
+from playwright.sync_api import BrowserContext
+
+from agent.scenario_engine import LogFn, get_plan
+
+Scenario = Callable[[BrowserContext, str, LogFn, Optional[Dict[str, Any]]], int]
+
+# Goals without a scenario of their own run the add customer flow
+DEFAULT_GOAL = "add customer"
+
+
+def get_scenario(goal: str) -> Scenario:
+    plan = get_plan(goal) or get_plan(DEFAULT_GOAL)
+    if plan is None:
+        raise LookupError(f"No scenario defined for goal '{goal}'")
+    return plan
+
+
+def add_customer(context: BrowserContext, url: str, log: LogFn, options: Optional[Dict[str, Any]] = None) -> int:
+    """Add a customer through the form and find it in the paginated list."""
+    return get_scenario("add customer")(context, url, log, options)
+
+
+def verify_total_customers(context: BrowserContext, url: str, log: LogFn,
+                           options: Optional[Dict[str, Any]] = None) -> int:
+    """Check that the dashboard total matches the number of customers in the list."""
+    return get_scenario("verify total customers")(context, url, log, options)
@@ -0,0 +1,180 @@
+"""
+Bounded task scheduler backed by the persistent tasks table.
+"""
+import asyncio
+import logging
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from db.async_db import AsyncDatabase
+from db.task_store import LEASE_SECONDS, MAX_ATTEMPTS, new_owner_id
+
+logger = logging.getLogger("qa_agent_scheduler")
+
+DEFAULT_WORKERS = int(os.environ.get("QA_MAX_WORKERS", "2"))
+# Picks up tasks queued by other processes sharing the database
+POLL_INTERVAL = float(os.environ.get("QA_QUEUE_POLL_SECONDS", "5"))
+# Task fields handed to the scenario as per-task options
+SCENARIO_OPTIONS = ("count_strategy", "shards", "profile")
+
+TaskRunner = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+def task_arguments(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyword arguments of the agent's run functions for a queued task's parameters."""
+    return {
+        "url": parameters.get("url", "https://qacrmdemo.netlify.app"),
+        "headless": parameters.get("headless", False),
+        "goal": parameters.get("goal") or "add customer",
+        "execution_mode": parameters.get("execution_mode"),
+        "options": {key: parameters[key] for key in SCENARIO_OPTIONS if parameters.get(key) is not None},
+    }
+
+
+class TaskScheduler:
+    """Runs queued tasks on a fixed number of workers.
+
+    Tasks wait in the ``tasks`` table with status ``queued`` and are claimed
+    atomically in priority order, so the queue survives a restart. At most
+    ``workers`` tasks run at once; blocking work runs on ``executor``, which has
+    one thread per worker. Database calls are awaited through ``AsyncDatabase``
+    so none of them blocks the event loop.
+
+    Claimed tasks are leased to this process and the leases renewed while
+    they run, like a standalone worker's (agent/worker.py), so tasks of a
+    process that dies are picked up again by whichever process is left.
+    """
+
+    def __init__(self, database: AsyncDatabase, run_task: TaskRunner, workers: int = DEFAULT_WORKERS,
+                 cancel_running: Optional[Callable[[str], None]] = None):
+        self.db = database
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qa-task")
+        self._run_task = run_task
+        self._cancel_running = cancel_running
+        self._wakeup = asyncio.Event()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, Optional[int]] = {}  # task_id -> version it was claimed at
+        self._cancel_requested: Set[str] = set()
+        self.owner = new_owner_id()
+        self.lease_seconds = LEASE_SECONDS
+
+    async def start(self) -> None:
+        """Requeue interrupted work and start the workers."""
+        await self.db.requeue_interrupted_tasks()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(n), name=f"qa-worker-{n}") for n in range(self.workers)
+        ]
+        self._worker_tasks.append(asyncio.create_task(self._heartbeat(), name="qa-lease-heartbeat"))
+        self._wakeup.set()
+        logger.info(f"Task scheduler started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Stop taking new work; unfinished tasks are requeued on the next start."""
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self.executor.shutdown(wait=False)
+        logger.info("Task scheduler stopped")
+
+    async def submit(self, task_id: str, parameters: Dict[str, Any], priority: int = 0,
+               dedupe_key: Optional[str] = None) -> bool:
+        """Queue a task and wake an idle worker."""
+        if not await self.db.enqueue_task(task_id, parameters, priority, dedupe_key):
+            return False
+        self._wakeup.set()
+        return True
+
+    async def submit_or_reuse(self, task_id: str, parameters: Dict[str, Any], priority: int, dedupe_key: str,
+                        cache_ttl: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """Queue a task unless an identical in-flight or cached one can stand in.
+
+        Returns ``(task_id, outcome)`` as ``Database.enqueue_or_reuse`` does.
+        """
+        reused = await self.db.enqueue_or_reuse(task_id, parameters, priority, dedupe_key, cache_ttl)
+        if reused is not None and reused[1] == "queued":
+            self._wakeup.set()
+        return reused
+
+    async def submit_batch(self, batch_id: str, tasks: List[Tuple[str, Dict[str, Any], int]]) -> bool:
+        """Queue ``(task_id, parameters, priority)`` tasks in one transaction and wake the workers."""
+        if not await self.db.enqueue_tasks(batch_id, tasks):
+            return False
+        self._wakeup.set()
+        return True
+
+    def is_running(self, task_id: str) -> bool:
+        return task_id in self._running
+
+    def running_count(self) -> int:
+        return len(self._running)
+
+    async def cancel(self, task_id: str) -> bool:
+        """Cancel a queued task, or ask a running one to stop.
+
+        Returns False if the task is neither queued nor running. A task
+        running in another process is marked cancelled; its worker stops it
+        when its next heartbeat finds the lease gone.
+        """
+        if await self.db.cancel_queued_task(task_id):
+            logger.info(f"Cancelled queued task {task_id}")
+            return True
+        if task_id in self._running:
+            logger.info(f"Cancelling running task {task_id}")
+            self._cancel_requested.add(task_id)
+            if self._cancel_running is not None:
+                self._cancel_running(task_id)
+            return True
+        if await self.db.cancel_leased_task(task_id):
+            logger.info(f"Cancelled task {task_id} running in another process")
+            return True
+        return False
+
+    async def finish(self, task_id: str, status: str, result: Optional[str] = None) -> bool:
+        """Record a task's outcome unless its lease was lost or the task changed since it was claimed."""
+        return await self.db.finish_leased_task(task_id, self.owner, status, result, self._running.get(task_id))
+
+    def was_cancelled(self, task_id: str) -> bool:
+        return task_id in self._cancel_requested
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            task = await self.db.claim_next_task(self.owner, self.lease_seconds)
+            if task is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task_id = task["id"]
+            self._running[task_id] = task.get("version")
+            try:
+                await self._run_task(task_id, task["parameters"])
+            except Exception as e:
+                logger.error(f"Worker {number} failed running task {task_id}: {str(e)}")
+                traceback.print_exc()
+            finally:
+                self._running.pop(task_id, None)
+                self._cancel_requested.discard(task_id)
+
+    async def _heartbeat(self) -> None:
+        """Renew the leases of running tasks and reclaim those other processes abandoned."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                for task_id in list(self._running):
+                    if not await self.db.renew_lease(task_id, self.owner, self.lease_seconds):
+                        logger.warning(f"Lost the lease on task {task_id}, stopping it")
+                        self._cancel_requested.add(task_id)
+                        if self._cancel_running is not None:
+                            self._cancel_running(task_id)
+                if await self.db.reclaim_expired_leases(MAX_ATTEMPTS):
+                    self._wakeup.set()
+            except Exception as e:
+                logger.error(f"Error renewing task leases: {str(e)}")
+                traceback.print_exc()
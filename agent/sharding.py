@@ -0,0 +1,177 @@
+"""
+Sharded scans of the paginated customer table.
+
+The page range is split into K contiguous shards, each on its own page
+(tab) of the task's browser context. Every shard jumps straight to its
+first page through the ``?page=N`` URL parameter, then all shards click
+"Next" in lock-step. Playwright's sync API runs on one thread, so the shards
+are interleaved: every shard fires its click before any waits for its
+table to change, and the page loads overlap.
+"""
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from playwright.sync_api import BrowserContext, Page
+
+from agent.waits import DEFAULT_TIMEOUT_MS, StepTimer, wait_for_text_change
+
+DEFAULT_SHARDS = int(os.environ.get("QA_SHARDS", "1"))
+MAX_SHARDS = 16
+
+PAGINATION = "nav[aria-label='pagination']"
+NEXT_BUTTON = "nav[aria-label='pagination'] span:text('Next')"
+
+# Called for each page with its 1-based number; returning True ends the scan
+PageVisitor = Callable[[int, Page], bool]
+
+
+def shard_option(options: Optional[Dict[str, Any]]) -> int:
+    """Return the task's shard count, clamped to 1..MAX_SHARDS."""
+    try:
+        return max(1, min(int((options or {}).get("shards") or DEFAULT_SHARDS), MAX_SHARDS))
+    except (TypeError, ValueError):
+        return 1
+
+
+def page_count(page: Page) -> Optional[int]:
+    """Read the number of pages from the pagination bar ("Page 1 of 12", or numbered links).
+
+    A windowed bar ("1 2 3 ... Next") only shows some page numbers, so this
+    can be low; ``scan_sharded`` keeps walking past it while "Next" is enabled.
+    """
+    try:
+        text = page.locator(PAGINATION).first.inner_text(timeout=DEFAULT_TIMEOUT_MS)
+    except Exception:
+        return None
+    numbers = [int(n) for n in re.findall(r"\d+", text)]
+    return max(numbers) if numbers else None
+
+
+def shard_ranges(pages: int, shards: int) -> List[Tuple[int, int]]:
+    """Split pages 1..pages into at most ``shards`` contiguous, inclusive ranges."""
+    shards = max(1, min(shards, pages))
+    size, extra = divmod(pages, shards)
+    ranges = []
+    start = 1
+    for n in range(shards):
+        end = start + size - 1 + (1 if n < extra else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def _table_text(page: Page) -> str:
+    return page.locator("table tbody").first.text_content() or ""
+
+
+def _next_enabled(page: Page) -> bool:
+    span = page.locator(NEXT_BUTTON)
+    if span.count() == 0:
+        return False
+    button = span.first.locator("xpath=..")
+    return button.get_attribute("aria-disabled") != "true" and button.is_enabled()
+
+
+def scan_sharded(context: BrowserContext, first_page: Page, url: str, shards: int, log,
+                 visit: PageVisitor) -> Optional[bool]:
+    """Visit every customers page with ``shards`` pages working in parallel.
+
+    ``first_page`` must show page 1 of /customers and becomes the first
+    shard. Returns True if ``visit`` ended the scan early, False once every
+    page was visited, or None if the table can't be sharded (a single page,
+    an unknown page count, or no support for ``?page=N``); the caller then
+    scans sequentially. The last shard only stops once "Next" is disabled,
+    so pages the bar didn't list are still visited.
+    """
+    pages = page_count(first_page)
+    if not pages or pages < 2 or shards < 2:
+        return None
+
+    ranges = shard_ranges(pages, min(shards, MAX_SHARDS))
+    log(f"[Scanning {pages} pages with {len(ranges)} shards: "
+        f"{', '.join(f'{start}-{end}' for start, end in ranges)}]")
+
+    first_text = _table_text(first_page)
+    extra_pages: List[Page] = []
+    try:
+        # Start every jump before waiting on any of them
+        for start, _ in ranges[1:]:
+            page = context.new_page()
+            extra_pages.append(page)
+            page.goto(f"{url}/customers?page={start}", wait_until="commit")
+        for page in extra_pages:
+            page.locator("table tbody tr").first.wait_for(timeout=DEFAULT_TIMEOUT_MS)
+            if _table_text(page) == first_text:
+                log("[Page jumps via ?page= are not supported, scanning sequentially]")
+                return None
+
+        # [page, current page number, last page number]
+        scans = [[page, start, end] for page, (start, end) in zip([first_page] + extra_pages, ranges)]
+        active = scans
+        while active:
+            for page, number, _ in active:
+                if visit(number, page):
+                    return True
+
+            active = [shard for shard in active if shard[1] < shard[2]]
+            previous = []
+            for shard in active:
+                previous.append(_table_text(shard[0]))
+                shard[0].locator(NEXT_BUTTON).first.locator("xpath=..").click(timeout=DEFAULT_TIMEOUT_MS)
+            for shard, text in zip(active, previous):
+                wait_for_text_change(shard[0].locator("table tbody").first, text)
+                shard[1] += 1
+
+        # The bar may not list every page; the last shard walks on to the real end
+        page, number, _ = scans[-1]
+        while _next_enabled(page):
+            previous_text = _table_text(page)
+            page.locator(NEXT_BUTTON).first.locator("xpath=..").click(timeout=DEFAULT_TIMEOUT_MS)
+            wait_for_text_change(page.locator("table tbody").first, previous_text)
+            number += 1
+            if visit(number, page):
+                return True
+        if number > pages:
+            log(f"[Pagination bar showed {pages} pages, scanned {number}]")
+        return False
+    finally:
+        for page in extra_pages:
+            try:
+                page.close()
+            except Exception:
+                pass
+
+
+def search_pages(context: BrowserContext, page: Page, url: str, selector: str, shards: int, log,
+                 timer: StepTimer) -> bool:
+    """Page through the table until ``selector`` is visible; True if it was found.
+
+    Uses a sharded scan when ``shards`` > 1 and the table allows it.
+    """
+    if shards > 1:
+        with timer.step("sharded_search"):
+            found = scan_sharded(context, page, url, shards, log,
+                                 lambda number, shard_page: shard_page.locator(selector).first.is_visible())
+        if found is not None:
+            return found
+
+    rows = page.locator("table tbody")
+    while True:
+        with timer.step("search_page"):
+            if page.locator(selector).first.is_visible():
+                return True
+
+        next_button = page.locator("nav[aria-label='pagination'] >> text=Next")
+        if next_button.count() == 0 or next_button.is_disabled():
+            return False
+
+        with timer.step("next_page"):
+            previous = rows.first.text_content() if rows.count() else None
+            next_button.click()
+            try:
+                wait_for_text_change(rows.first, previous)
+            except AssertionError:
+                log("[Next page did not load]")
+                return False
+        log("[Navigated to the next page]")
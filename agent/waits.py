@@ -0,0 +1,129 @@
+"""
+Event-driven waits and per-step timing for the browser scenarios.
+
+The helpers wait on something observable (a network response, a DOM
+mutation, a locator reaching a state) rather than sleeping for a fixed
+time, so a step takes as long as the app needs and no longer.
+"""
+import re
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Pattern, Union
+
+from playwright.sync_api import Locator, Page, expect
+
+from metrics import SCENARIO_STEP_SECONDS
+
+DEFAULT_TIMEOUT_MS = 10000
+
+UrlMatcher = Union[str, Pattern[str], Callable[[str], bool]]
+
+# Flags a mutation under the observed element; cleared for each wait
+_OBSERVE_MUTATIONS = """
+(selector) => {
+    const target = document.querySelector(selector) || document.body;
+    if (window.__qaObserver) window.__qaObserver.disconnect();
+    window.__qaMutated = false;
+    window.__qaObserver = new MutationObserver(() => { window.__qaMutated = true; });
+    window.__qaObserver.observe(target, {childList: true, subtree: true, characterData: true});
+}
+"""
+
+
+def _url_predicate(matcher: UrlMatcher) -> Callable[[str], bool]:
+    if callable(matcher):
+        return matcher
+    if isinstance(matcher, str):
+        return lambda url: matcher in url
+    return lambda url: bool(matcher.search(url))
+
+
+def wait_for_response(page: Page, url: UrlMatcher, action: Callable[[], None],
+                      timeout: int = DEFAULT_TIMEOUT_MS):
+    """Run ``action`` and wait for the response to the first matching request."""
+    matches = _url_predicate(url)
+    with page.expect_response(lambda response: matches(response.url), timeout=timeout) as info:
+        action()
+    return info.value
+
+
+def wait_for_dom_change(page: Page, selector: str, action: Callable[[], None],
+                        timeout: int = DEFAULT_TIMEOUT_MS) -> None:
+    """Run ``action`` and wait until the DOM under ``selector`` mutates.
+
+    Only suitable for in-page updates; a full navigation drops the observer.
+    """
+    page.evaluate(_OBSERVE_MUTATIONS, selector)
+    action()
+    page.wait_for_function("() => window.__qaMutated === true", timeout=timeout)
+
+
+def wait_for_text_change(locator: Locator, previous: Optional[str], timeout: int = DEFAULT_TIMEOUT_MS) -> None:
+    """Wait until ``locator``'s text differs from ``previous``.
+
+    Works across in-page re-renders and full navigations alike, since the
+    locator is re-resolved on every check.
+    """
+    if previous is None:
+        locator.wait_for(state="attached", timeout=timeout)
+        return
+    expect(locator).not_to_have_text(previous, timeout=timeout)
+
+
+def wait_for_number(locator: Locator, timeout: int = DEFAULT_TIMEOUT_MS) -> int:
+    """Wait until ``locator`` shows an integer and return it."""
+    expect(locator).to_have_text(re.compile(r"^\s*\d+\s*$"), timeout=timeout)
+    return int(locator.text_content().strip())
+
+
+def wait_until_enabled(locator: Locator, timeout: int = DEFAULT_TIMEOUT_MS) -> None:
+    """Wait until ``locator`` is visible and enabled."""
+    expect(locator).to_be_visible(timeout=timeout)
+    expect(locator).to_be_enabled(timeout=timeout)
+
+
+class StepTimer:
+    """Times named scenario steps and logs a profile of them.
+
+    Repeated steps (one per results page, say) are aggregated, so the
+    profile stays one line however long the run is.
+    """
+
+    def __init__(self, log: Callable[[str], None]):
+        self.log = log
+        self.started = time.perf_counter()
+        self._order: List[str] = []
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        if name not in self._totals:
+            self._order.append(name)
+            self._totals[name] = 0.0
+            self._counts[name] = 0
+        self._totals[name] += seconds
+        self._counts[name] += 1
+        SCENARIO_STEP_SECONDS.labels(step=name).observe(seconds)
+
+    def profile(self) -> Dict[str, Dict[str, float]]:
+        """Return ``{step: {"count", "total_ms"}}`` in first-seen order."""
+        return {
+            name: {"count": self._counts[name], "total_ms": round(self._totals[name] * 1000, 1)}
+            for name in self._order
+        }
+
+    def log_profile(self) -> None:
+        parts = []
+        for name, stats in self.profile().items():
+            suffix = f" x{stats['count']}" if stats["count"] > 1 else ""
+            parts.append(f"{name}={stats['total_ms']:.0f}ms{suffix}")
+        total_ms = (time.perf_counter() - self.started) * 1000
+        self.log(f"[Timing profile] {' '.join(parts)} total={total_ms:.0f}ms")
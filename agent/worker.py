@@ -0,0 +1,190 @@
+"""
+Standalone worker that runs queued tasks from a shared task store.
+
+Any number of workers, on any number of hosts, can point at the same store
+(see db/task_store.py). Each claims queued tasks under a lease, renews the
+leases of its running tasks on a heartbeat, and records outcomes only while
+it still holds the lease. A worker that dies stops renewing; once its leases
+expire, the next heartbeat of any worker (or API scheduler) puts those tasks
+back on the queue. Start one with ``python qa_worker.py``.
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from agent.logging_config import configure_logging, task_context
+from agent.scheduler import DEFAULT_WORKERS, POLL_INTERVAL, task_arguments
+from db.task_states import task_outcome
+from db.task_store import (DEFAULT_STORE_URL, LEASE_SECONDS, MAX_ATTEMPTS, SQLiteTaskStore, TaskStore,
+                           connect_store, new_owner_id, store_server)
+
+logger = logging.getLogger("qa_agent_worker")
+
+# (task_id, parameters) -> return code
+TaskRunner = Callable[[str, Dict[str, Any]], int]
+
+
+def agent_runner(store: TaskStore) -> TaskRunner:
+    """Run tasks with the agent, writing their logs and status through ``store``."""
+    from agent import qa_agent_final as agent
+
+    # The agent logs through its module-level database; send that to the shared store instead
+    agent.db = store
+
+    def run(task_id: str, parameters: Dict[str, Any]) -> int:
+        return agent.run_test_sync(task_id, **task_arguments(parameters))
+    return run
+
+
+class Worker:
+    """Claims and runs up to ``concurrency`` tasks at a time from ``store``."""
+
+    def __init__(self, store: TaskStore, run_task: Optional[TaskRunner] = None,
+                 concurrency: int = DEFAULT_WORKERS, lease_seconds: float = LEASE_SECONDS,
+                 poll_interval: float = POLL_INTERVAL, max_attempts: int = MAX_ATTEMPTS,
+                 cancel_running: Optional[Callable[[str], None]] = None,
+                 run_detail: Optional[Callable[[str], Optional[str]]] = None):
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.owner = new_owner_id()
+        self._run_task = run_task
+        self._cancel_running = cancel_running
+        # task_id -> what the run reported for its result, e.g. the count strategy used
+        self._run_detail = run_detail
+        self._running: Dict[str, str] = {}  # task_id -> goal
+        self._lost: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # Set only once running tasks have finished, so their leases are renewed until then
+        self._stop_heartbeat = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.completed = 0
+
+    def start(self) -> None:
+        if self._run_task is None:
+            self._run_task = agent_runner(self.store)
+            from agent import qa_agent_final as agent
+            if self._cancel_running is None:
+                self._cancel_running = agent.cancel_running_task
+            if self._run_detail is None:
+                self._run_detail = agent.run_detail
+        self._stop.clear()
+        self._stop_heartbeat.clear()
+        self._threads = [threading.Thread(target=self._loop, name=f"qa-worker-{n}", daemon=True)
+                         for n in range(self.concurrency)]
+        self._threads.append(threading.Thread(target=self._heartbeat, name="qa-worker-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Worker {self.owner} started with {self.concurrency} slots, "
+                    f"{self.lease_seconds:g} s leases")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming and wait for running tasks; unfinished ones are reclaimed once their lease expires."""
+        self._stop.set()
+        # The heartbeat thread is started last
+        for thread in self._threads[:-1]:
+            thread.join(timeout)
+        self._stop_heartbeat.set()
+        for thread in self._threads[-1:]:
+            thread.join(timeout)
+        self._threads = []
+        logger.info(f"Worker {self.owner} stopped after {self.completed} tasks")
+
+    def running_count(self) -> int:
+        return len(self._running)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                task = self.store.claim(self.owner, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Error claiming a task: {str(e)}")
+                traceback.print_exc()
+                task = None
+            if task is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._run(task["id"], task["parameters"], task.get("version"))
+
+    def _run(self, task_id: str, parameters: Dict[str, Any], version: Optional[int] = None) -> None:
+        goal = parameters.get("goal") or "add customer"
+        with self._lock:
+            self._running[task_id] = goal
+        with task_context(task_id):
+            try:
+                logger.info(f"Running task {task_id} for goal '{goal}'")
+                return_code = self._run_task(task_id, parameters)
+            except Exception as e:
+                logger.error(f"Error running task {task_id}: {str(e)}")
+                traceback.print_exc()
+                return_code = 1
+            finally:
+                with self._lock:
+                    self._running.pop(task_id, None)
+                    lost = task_id in self._lost
+                    self._lost.discard(task_id)
+            # A lost lease means the task was cancelled or handed to another worker
+            detail = self._run_detail(task_id) if self._run_detail is not None else None
+            if not lost:
+                if self.store.finish(task_id, self.owner, *task_outcome(goal, return_code, detail=detail), version):
+                    with self._lock:
+                        self.completed += 1
+
+    def _heartbeat(self) -> None:
+        while not self._stop_heartbeat.wait(self.lease_seconds / 3):
+            try:
+                for task_id in list(self._running):
+                    if not self.store.renew(task_id, self.owner, self.lease_seconds):
+                        logger.warning(f"Lost the lease on task {task_id}, stopping it", extra={"task_id": task_id})
+                        with self._lock:
+                            self._lost.add(task_id)
+                        if self._cancel_running is not None:
+                            self._cancel_running(task_id)
+                self.store.reclaim_expired(self.max_attempts)
+            except Exception as e:
+                logger.error(f"Error renewing task leases: {str(e)}")
+                traceback.print_exc()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run queued QA tasks from a shared task store.")
+    parser.add_argument("--store", default=DEFAULT_STORE_URL,
+                        help="sqlite:///<path> or manager://<host>:<port> (QA_TASK_STORE)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_WORKERS, help="tasks run at once (QA_MAX_WORKERS)")
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS)
+    parser.add_argument("--serve-store", metavar="HOST:PORT",
+                        help="instead of running tasks, serve the --store SQLite database to manager:// workers")
+    args = parser.parse_args(argv)
+
+    configure_logging(log_file=os.environ.get("QA_LOG_FILE", "worker.log"))
+    store = connect_store(args.store)
+
+    if args.serve_store:
+        if not isinstance(store, SQLiteTaskStore):
+            parser.error("--serve-store needs a sqlite:/// --store")
+        try:
+            server = store_server(store, args.serve_store)
+        except ValueError as e:
+            parser.error(str(e))
+        logger.info(f"Serving task store {args.store} on {args.serve_store}")
+        server.serve_forever()
+        return
+
+    worker = Worker(store, concurrency=args.concurrency, lease_seconds=args.lease_seconds)
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+    worker.start()
+    stopped.wait()
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,36 @@
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Body, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, validator
+import importlib
 import uuid
-from typing import Optional, List
-import sqlite3
+import hashlib
+from typing import Optional, List, AsyncIterator, Tuple, Any
 import json
 import os
-import traceback
 import logging
 from datetime import datetime
 import asyncio
-from agent.qa_agent_final import run_test_sync
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("api.log"),
-        logging.StreamHandler()
-    ]
-)
+import time
+from agent.scheduler import TaskScheduler, task_arguments
+from agent.browser_pool import close_browser_pools
+from agent.process_pool import close_process_pool
+from agent.log_bus import log_bus
+from agent.logging_config import configure_logging, task_context
+from agent.profiles import PROFILES
+from agent.dedupe import CACHE_TTL_SECONDS, CACHEABLE_GOALS, cache_ttl, dedupe_key, dedupe_stats
+from db.async_db import AsyncDatabase
+from db.database import Database
+from db.retention import RETENTION_ENABLED, RetentionWorker
+from db.pool import close_all_pools
+from db.task_states import TERMINAL_STATUSES, task_outcome
+from metrics import HTTP_REQUEST_SECONDS, REGISTRY, gauge
+
+# Configure logging; records are written by a background listener as JSON lines in a rotating api.log
+configure_logging(log_file=os.environ.get("QA_LOG_FILE", "api.log"))
 logger = logging.getLogger("qa_agent_api")
+# One line per request, sampled by default (QA_LOG_SAMPLE)
+access_logger = logging.getLogger("qa_agent_api.access")
 
 app = FastAPI(
     title="QA Agent API",
@@ -37,163 +46,492 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# What qa_agent_final runs tasks with; checked here so a typo is a 422, not a silent default
+EXECUTION_MODES = ("browser_pool", "process_pool", "subprocess")
+# agent.customer_count.COUNT_STRATEGIES, which imports Playwright and so isn't loaded at startup
+COUNT_STRATEGIES = ("auto", "network", "store", "pagination")
+
 class Task(BaseModel):
     goal: Optional[str] = "add customer"
     headless: bool = False
     url: str = "https://qacrmdemo.netlify.app"
+    priority: int = 0
+    execution_mode: Optional[str] = None  # "browser_pool" (default), "process_pool" or "subprocess"
+    count_strategy: Optional[str] = None  # "auto" (default), "network", "store" or "pagination"
+    shards: Optional[int] = Field(None, ge=1, le=16)  # pages scanned in parallel when paginating
+    profile: Optional[str] = None  # "desktop" (default) or "lean"
+
+    @validator("execution_mode")
+    def known_execution_mode(cls, value):
+        if value is not None and value.lower() not in EXECUTION_MODES:
+            raise ValueError(f"unknown execution mode, expected one of {', '.join(EXECUTION_MODES)}")
+        return value.lower() if value else value
+
+    @validator("count_strategy")
+    def known_count_strategy(cls, value):
+        if value is not None and value.lower() not in COUNT_STRATEGIES:
+            raise ValueError(f"unknown count strategy, expected one of {', '.join(COUNT_STRATEGIES)}")
+        return value.lower() if value else value
+
+    @validator("profile")
+    def known_profile(cls, value):
+        if value is not None and value.lower() not in PROFILES:
+            raise ValueError(f"unknown profile, expected one of {', '.join(PROFILES)}")
+        return value.lower() if value else value
 
 class LogEntry(BaseModel):
     timestamp: str
     message: str
+    seq: Optional[int] = None
 
 class TaskResponse(BaseModel):
     task_id: str
     status: str
     result: Optional[str] = None
-    logs: List[LogEntry] = []
+    logs: Optional[List[LogEntry]] = []  # None when listed with fields=summary
+    queue_position: Optional[int] = None
+    goal: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    dedupe: Optional[str] = None  # "in_flight" or "cached" when an identical task was reused
 
-def init_db():
-    try:
-        logger.info("Initializing database")
-        conn = sqlite3.connect('qa_tasks.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id TEXT PRIMARY KEY,
-                status TEXT,
-                result TEXT,
-                logs TEXT,
-                parameters TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                task_id TEXT,
-                timestamp TEXT,
-                message TEXT
-            )
-        ''')
-        conn.commit()
-        conn.close()
-        logger.info("Database initialization successful")
-    except Exception as e:
-        logger.error(f"Database initialization failed: {str(e)}")
-        traceback.print_exc()
+class BatchResponse(BaseModel):
+    batch_id: str
+    tasks: List[TaskResponse]
 
-def update_task_status(task_id: str, status: str, result: Optional[str] = None):
-    try:
-        conn = sqlite3.connect('qa_tasks.db')
-        cursor = conn.cursor()
-        if result:
-            cursor.execute('UPDATE tasks SET status = ?, result = ? WHERE id = ?', (status, result, task_id))
-        else:
-            cursor.execute('UPDATE tasks SET status = ? WHERE id = ?', (status, task_id))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        logger.error(f"Error updating task {task_id} status: {e}")
+class BatchTask(BaseModel):
+    task_id: str
+    status: str
+    goal: Optional[str] = None
+
+class BatchStatus(BaseModel):
+    batch_id: str
+    total: int
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    progress: float  # finished tasks / total
+    done: bool
+    created_at: str
+    finished_at: Optional[str] = None
+    duration_seconds: float  # so far, while the batch is still running
+    tasks: List[BatchTask]
+
+db = Database('qa_tasks.db')
+# What handlers await, so no sqlite3 call runs on the event loop
+adb = AsyncDatabase(db)
 
-async def run_test_task(task_id: str, url: str, headless: bool, goal: Optional[str] = "add customer"):
+MAX_BATCH_SIZE = int(os.environ.get("QA_MAX_BATCH_SIZE", "500"))
+# Idle streams send a keep-alive and re-check the database this often
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get("QA_STREAM_HEARTBEAT_SECONDS", "15"))
+# "off" makes the API a submitter only, with tasks run by qa_worker.py processes
+API_RUN_TASKS = os.environ.get("QA_API_RUN_TASKS", "on").lower() not in ("off", "0", "false")
+
+# The agent imports Playwright and the scenarios, so it is loaded on the first task rather than at startup
+_agent = None
+
+def load_agent():
+    """Import the agent runner once; safe to call from any thread."""
+    global _agent
+    if _agent is None:
+        started = time.perf_counter()
+        module = importlib.import_module("agent.qa_agent_final")
+        if _agent is None:
+            _agent = module
+            logger.info(f"Loaded agent in {time.perf_counter() - started:.2f}s")
+    return _agent
+
+def cancel_running_task(task_id: str):
+    # Nothing can be running before the agent is loaded; run_test_task re-checks after loading
+    if _agent is not None:
+        _agent.cancel_running_task(task_id)
+
+async def run_test_task(task_id: str, url: str, headless: bool, goal: Optional[str] = "add customer",
+                        execution_mode: Optional[str] = None, options: Optional[dict] = None):
     logger.info(f"Starting async task {task_id} for goal '{goal}' at {url}")
-    update_task_status(task_id, "running")
+    agent = _agent or await asyncio.get_running_loop().run_in_executor(None, load_agent)
+    if scheduler.was_cancelled(task_id):
+        agent.cancel_running_task(task_id)
 
-    loop = asyncio.get_event_loop()
-    success = await loop.run_in_executor(None, run_test_sync, task_id, url, headless, goal)
+    success = await agent.run_test_async(task_id, url, headless, goal, execution_mode, options,
+                                   executor=scheduler.executor)
 
-    if success == 0:
-        update_task_status(task_id, "completed", f"{goal.capitalize()} test completed successfully")
-    else:
-        update_task_status(task_id, "failed", f"{goal.capitalize()} test failed with return code {success}")
+    await scheduler.finish(task_id, *task_outcome(goal, success, scheduler.was_cancelled(task_id),
+                                                  agent.run_detail(task_id)))
+    log_bus.finish(task_id)
+
+async def run_queued_task(task_id: str, parameters: dict):
+    # Each worker runs the task in its own asyncio task, so the context stays with this run
+    with task_context(task_id):
+        await run_test_task(task_id, **task_arguments(parameters))
+
+scheduler = TaskScheduler(adb, run_queued_task, cancel_running=cancel_running_task)
+retention = RetentionWorker(db)
+
+# Read from the database on each scrape, so tasks queued by other processes are included
+gauge("qa_tasks", "Tasks by status", ("status",)).set_function(db.count_tasks_by_status)
+gauge("qa_scheduler_running_tasks", "Tasks running in this process").set_function(scheduler.running_count)
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    # Database() already applied any pending schema migrations
+    if API_RUN_TASKS:
+        await scheduler.start()
+    else:
+        logger.info("Running tasks is left to qa_worker.py processes (QA_API_RUN_TASKS=off)")
+    if RETENTION_ENABLED:
+        retention.start()
     logger.info("API server started")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler.stop()
+    retention.stop()
+    await adb.flush()
+    close_browser_pools()
+    close_process_pool()
+    close_all_pools()
+    logger.info("API server stopped")
+
+# Route templates by endpoint, so metrics are labelled /tasks/{task_id} rather than one series per task
+_route_paths: dict = {}
+
+def _route_template(request: Request) -> str:
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if not _route_paths:
+        _route_paths.update({route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")})
+    return _route_paths.get(endpoint, "unmatched")
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f"Request: {request.method} {request.url.path}")
+    started = time.perf_counter()
+    status = 500
     try:
         response = await call_next(request)
-        logger.info(f"Response: {response.status_code}")
+        status = response.status_code
         return response
     except Exception as e:
-        logger.error(f"Request error: {str(e)}")
-        traceback.print_exc()
+        logger.error(f"Request error: {request.method} {request.url.path}: {str(e)}", exc_info=True)
         raise
+    finally:
+        elapsed = time.perf_counter() - started
+        route = _route_template(request)
+        HTTP_REQUEST_SECONDS.labels(request.method, route, status).observe(elapsed)
+        access_logger.log(
+            logging.WARNING if status >= 500 else logging.INFO,
+            f"{request.method} {request.url.path} {status} {elapsed * 1000:.1f} ms",
+            extra={"task_id": request.path_params.get("task_id") if "path_params" in request.scope else None}
+        )
+
+def _task_parameters(task: Task) -> dict:
+    return {
+        "url": task.url,
+        "headless": task.headless,
+        "goal": task.goal,
+        "execution_mode": task.execution_mode,
+        "count_strategy": task.count_strategy,
+        "shards": task.shards,
+        "profile": task.profile
+    }
 
 @app.post("/tasks", response_model=TaskResponse)
-async def create_task(task: Task):
+async def create_task(task: Task, force: bool = Query(False, description="Always start a new run")):
     task_id = str(uuid.uuid4())
     logger.info(f"Creating task {task_id} for goal: {task.goal}")
 
-    task_data = {
-        "url": task.url,
-        "headless": task.headless,
-        "goal": task.goal
-    }
+    task_data = _task_parameters(task)
+    key = dedupe_key(task_data)
 
     try:
-        conn = sqlite3.connect('qa_tasks.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO tasks (id, status, result, logs, parameters) VALUES (?, ?, ?, ?, ?)',
-            (task_id, "pending", None, "[]", json.dumps(task_data))
-        )
-        conn.commit()
-        conn.close()
-
-        asyncio.create_task(run_test_task(task_id, task.url, task.headless, task.goal))
+        if force:
+            if not await scheduler.submit(task_id, task_data, task.priority, key):
+                raise Exception("task could not be queued")
+            dedupe_stats.record("forced")
+        else:
+            reused = await scheduler.submit_or_reuse(task_id, task_data, task.priority, key, cache_ttl(task_data))
+            if reused is None:
+                raise Exception("task could not be queued")
+            existing_id, outcome = reused
+            dedupe_stats.record(outcome)
+            if outcome != "queued":
+                logger.info(f"Reusing {outcome} task {existing_id} instead of {task_id}")
+                summary = await adb.get_task_summary(existing_id) or {}
+                status = summary.get("status", "queued")
+                return TaskResponse(task_id=existing_id, status=status, result=summary.get("result"), logs=[],
+                                    queue_position=await adb.get_queue_position(existing_id) if status == "queued" else None,
+                                    goal=summary.get("goal"), created_at=summary.get("created_at"),
+                                    updated_at=summary.get("updated_at"), dedupe=outcome)
 
-        return TaskResponse(task_id=task_id, status="pending", result=None, logs=[])
+        return TaskResponse(task_id=task_id, status="queued", result=None, logs=[],
+                            queue_position=await adb.get_queue_position(task_id))
     except Exception as e:
         logger.error(f"Failed to create task: {e}")
         raise HTTPException(status_code=500, detail="Failed to create task")
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of submission coalescing and the result cache."""
+    return {**dedupe_stats.snapshot(), "ttl_seconds": CACHE_TTL_SECONDS, "cacheable_goals": sorted(CACHEABLE_GOALS)}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Latency histograms and task/browser gauges in the Prometheus text format."""
+    # Gauges read the database while rendering
+    return PlainTextResponse(await adb.run_read(REGISTRY.render), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/tasks/batch", response_model=BatchResponse)
+async def create_batch(tasks: List[Task] = Body(...)):
+    if not tasks:
+        raise HTTPException(status_code=422, detail="A batch needs at least one task")
+    if len(tasks) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"A batch holds at most {MAX_BATCH_SIZE} tasks")
+
+    batch_id = str(uuid.uuid4())
+    queued = [(str(uuid.uuid4()), _task_parameters(task), task.priority) for task in tasks]
+    logger.info(f"Creating batch {batch_id} of {len(queued)} tasks")
+
+    if not await scheduler.submit_batch(batch_id, queued):
+        raise HTTPException(status_code=500, detail="Failed to create batch")
+
+    return BatchResponse(batch_id=batch_id, tasks=[
+        TaskResponse(task_id=task_id, status="queued", result=None, logs=[], goal=parameters["goal"])
+        for task_id, parameters, _ in queued
+    ])
+
+@app.get("/batches/{batch_id}", response_model=BatchStatus)
+async def get_batch(batch_id: str):
+    batch = await adb.get_batch(batch_id.strip())
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    counts = batch["counts"]
+    total = len(batch["tasks"])
+    finished = sum(counts.get(status, 0) for status in TERMINAL_STATUSES)
+    done = finished == total
+    created_at = datetime.strptime(batch["created_at"], '%Y-%m-%d %H:%M:%S')
+    finished_at = batch["last_updated_at"] if done else None
+    end = datetime.strptime(finished_at, '%Y-%m-%d %H:%M:%S') if finished_at else datetime.now()
+
+    return BatchStatus(
+        batch_id=batch["id"],
+        total=total,
+        queued=counts.get("queued", 0),
+        running=counts.get("running", 0) + counts.get("pending", 0),
+        completed=counts.get("completed", 0),
+        failed=counts.get("failed", 0),
+        cancelled=counts.get("cancelled", 0),
+        progress=round(finished / total, 4) if total else 1.0,
+        done=done,
+        created_at=batch["created_at"],
+        finished_at=finished_at,
+        duration_seconds=max(0.0, (end - created_at).total_seconds()),
+        tasks=[BatchTask(task_id=task["id"], status=task["status"], goal=task["goal"]) for task in batch["tasks"]]
+    )
+
+def _task_etag(summary: dict, queue_position: Optional[int], since_seq: int, tail: Optional[int]) -> str:
+    # Any new log line bumps last_seq and every status change bumps version,
+    # so the tag changes whenever the response body would
+    key = f"{summary['version']}|{summary['updated_at']}|{summary['last_seq']}|{queue_position}|{since_seq}|{tail}"
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or etag[2:] in tags
+
 @app.get("/tasks/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: str):
+async def get_task(
+    task_id: str,
+    request: Request,
+    response: Response,
+    since_seq: int = Query(0, ge=0, description="Only return log entries with a higher seq"),
+    tail: Optional[int] = Query(None, ge=0, description="Only return the last N log entries"),
+):
     try:
-        conn = sqlite3.connect('qa_tasks.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT status, result, logs FROM tasks WHERE id = ?', (task_id.strip(),))
-        result = cursor.fetchone()
-        conn.close()
+        task_id = task_id.strip()
+        summary = await adb.get_task_summary(task_id)
 
-        if result is None:
+        if summary is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        status, result_msg, logs = result
-        parsed_logs = json.loads(logs) if logs else []
+        queue_position = await adb.get_queue_position(task_id) if summary["status"] == "queued" else None
+        etag = _task_etag(summary, queue_position, since_seq, tail)
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
 
-        return TaskResponse(task_id=task_id, status=status, result=result_msg or "", logs=parsed_logs)
+        logs = await adb.get_logs(task_id, since_seq=since_seq, tail=tail)
+        response.headers["ETag"] = etag
+        return TaskResponse(task_id=task_id, status=summary["status"], result=summary["result"] or "", logs=logs,
+                            queue_position=queue_position, goal=summary["goal"],
+                            created_at=summary["created_at"], updated_at=summary["updated_at"])
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching task {task_id}: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch task")
 
+def _task_list_page(limit: int, after: Optional[str], status: Optional[str], goal: Optional[str],
+                    summary: bool) -> Optional[Tuple[bytes, Optional[str]]]:
+    """Read one page of the task list and encode it as TaskResponse JSON.
+
+    Encoding a page of 1000 tasks with their logs costs more than reading it,
+    so both run on a reader thread and the event loop only sends the bytes.
+    Returns None if ``after`` is not a task id.
+    """
+    # One extra row tells whether there is a next page
+    tasks = db.list_tasks(limit + 1, after=after, status=status, goal=goal, include_logs=not summary)
+    if tasks is None:
+        return None
+    next_after = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_after = tasks[-1]["id"]
+
+    queue_positions = {}
+    if any(task["status"] == "queued" for task in tasks):
+        queue_positions = {task_id: n for n, task_id in enumerate(db.get_queued_task_ids(), start=1)}
+
+    task_list = [{
+        "task_id": task["id"], "status": task["status"], "result": task["result"] or "",
+        "logs": None if summary else [{"timestamp": entry["timestamp"], "message": entry["message"], "seq": entry["seq"]}
+                                      for entry in task["logs"]],
+        "queue_position": queue_positions.get(task["id"]),
+        "goal": task["goal"], "created_at": task["created_at"], "updated_at": task["updated_at"], "dedupe": None,
+    } for task in tasks]
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(task_list, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), next_after
+
 @app.get("/tasks", response_model=List[TaskResponse])
-async def list_tasks():
+async def list_tasks(
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Task id of the last item of the previous page"),
+    status: Optional[str] = None,
+    goal: Optional[str] = None,
+    fields: str = Query("full", regex="^(full|summary)$")
+):
     try:
-        conn = sqlite3.connect('qa_tasks.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, status, result, logs FROM tasks ORDER BY created_at DESC')
-        rows = cursor.fetchall()
-        conn.close()
-
-        task_list = []
-        for row in rows:
-            task_id, status, result, logs_json = row
-            try:
-                logs = json.loads(logs_json) if logs_json else []
-            except json.JSONDecodeError:
-                logs = []
-            task_list.append(TaskResponse(task_id=task_id, status=status, result=result or "", logs=logs))
-
-        return task_list
+        page = await adb.run_read(_task_list_page, limit, after, status, goal, fields == "summary")
+        if page is None:
+            raise HTTPException(status_code=400, detail=f"Unknown cursor: no task has the id '{after}'")
+        body, next_after = page
+        return Response(content=body, media_type="application/json",
+                        headers={"X-Next-After": next_after} if next_after else None)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing tasks: {e}")
         raise HTTPException(status_code=500, detail="Failed to list tasks")
 
+@app.delete("/tasks/{task_id}", response_model=TaskResponse)
+async def cancel_task(task_id: str):
+    task_id = task_id.strip()
+    try:
+        task = await adb.get_task(task_id)
+        if task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        if not await scheduler.cancel(task_id):
+            raise HTTPException(status_code=409, detail=f"Task is already {task['status']}")
+
+        task = await adb.get_task(task_id)
+        if task["status"] == "cancelled":
+            log_bus.finish(task_id)
+        return TaskResponse(task_id=task_id, status=task["status"], result=task["result"] or "", logs=task["logs"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling task {task_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to cancel task")
+
+async def _log_events(task_id: str, after_seq: int) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield ("log", entry) for entries after after_seq as they are written, then ("end", summary).
+
+    New entries come from the in-process log bus. The database is only read to
+    backfill on connect, to catch up after a slow consumer falls behind, and on
+    idle heartbeats, which also picks up entries written by other processes.
+    """
+    subscription = log_bus.subscribe(task_id)
+    try:
+        last_seq = after_seq
+        for entry in await adb.get_logs(task_id, since_seq=last_seq):
+            last_seq = entry["seq"]
+            yield "log", entry
+
+        summary = await adb.get_task_summary(task_id)
+        while summary is not None and summary["status"] not in TERMINAL_STATUSES:
+            try:
+                batch = await asyncio.wait_for(subscription.queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                batch = []
+            if batch is None:
+                break
+
+            if not batch or subscription.lagged:
+                subscription.lagged = False
+                batch = await adb.get_logs(task_id, since_seq=last_seq)
+                summary = await adb.get_task_summary(task_id)
+                if not batch:
+                    yield "ping", None
+
+            for entry in batch:
+                if entry["seq"] > last_seq:
+                    last_seq = entry["seq"]
+                    yield "log", entry
+
+        # Entries written between the last batch and the final status
+        for entry in await adb.get_logs(task_id, since_seq=last_seq):
+            last_seq = entry["seq"]
+            yield "log", entry
+        summary = await adb.get_task_summary(task_id) or {}
+        yield "end", {"status": summary.get("status"), "result": summary.get("result")}
+    finally:
+        log_bus.unsubscribe(subscription)
+
+@app.get("/tasks/{task_id}/stream")
+async def stream_task_logs(task_id: str, request: Request,
+                           offset: int = Query(0, ge=0, description="Only stream entries with a higher seq")):
+    task_id = task_id.strip()
+    if await adb.get_task_summary(task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    # Reconnecting EventSource clients resume from the last id they saw
+    last_event_id = request.headers.get("last-event-id", "")
+    after_seq = int(last_event_id) if last_event_id.isdigit() else offset
+
+    async def event_source():
+        async for event, data in _log_events(task_id, after_seq):
+            if event == "log":
+                yield f"id: {data['seq']}\nevent: log\ndata: {json.dumps(data)}\n\n"
+            elif event == "ping":
+                yield ": ping\n\n"
+            else:
+                yield f"event: end\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/tasks/{task_id}/ws")
+async def websocket_task_logs(websocket: WebSocket, task_id: str, offset: int = 0):
+    task_id = task_id.strip()
+    await websocket.accept()
+    if await adb.get_task_summary(task_id) is None:
+        await websocket.close(code=4404)
+        return
+    try:
+        async for event, data in _log_events(task_id, offset):
+            await websocket.send_json({"event": event, **(data or {})})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Log stream client for task {task_id} disconnected")
+
 @app.get("/")
 async def root():
     return {"message": "QA Agent API is running"}
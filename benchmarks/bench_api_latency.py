@@ -0,0 +1,149 @@
+"""
+API request latency while tests log heavily.
+
+Starts ``uvicorn api.main:app`` on a temporary database seeded with
+``--seed`` finished tasks, as a submitter only (QA_API_RUN_TASKS=off) so no
+browser is needed. ``--clients`` threads then request ``/``, a single task and
+a page of the task list, while one client keeps scanning ``/tasks?limit=1000``
+and ``N`` logger processes append log lines to running tasks as fast as they
+can, the way busy scenarios do. Reports p50/p95/p99 per endpoint for each
+logger count; with handlers awaiting the database, p99 should stay flat as
+loggers are added.
+
+Usage:
+    python benchmarks/bench_api_latency.py [--loggers 0,4,8] [--seconds 5] [--clients 8] [--seed 20000]
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.bench_throughput import percentile  # noqa: E402
+from db.database import Database  # noqa: E402
+
+
+def seed(db: Database, count: int) -> List[str]:
+    """Insert ``count`` finished tasks with a few log lines each; returns their ids."""
+    task_ids = [str(uuid.uuid4()) for _ in range(count)]
+    now = time.strftime('%Y-%m-%d %H:%M:%S')
+    with db.pool.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO tasks (id, status, result, parameters, goal, created_at, updated_at) "
+            "VALUES (?, 'completed', 'ok', '{}', 'verify total customers', ?, ?)",
+            [(task_id, now, now) for task_id in task_ids])
+        conn.executemany("INSERT INTO task_logs (task_id, seq, ts, message) VALUES (?, ?, ?, ?)",
+                         [(task_id, seq, now, f"step {seq}") for task_id in task_ids for seq in range(1, 6)])
+    return task_ids
+
+
+def start_api(workdir: str) -> Tuple[subprocess.Popen, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, QA_API_RUN_TASKS="off", QA_RETENTION="off", QA_LOG_LEVEL="WARNING",
+               PYTHONPATH=os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port),
+                               "--log-level", "warning"], cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    api = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(api + "/", timeout=1)
+            return server, api
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("API did not start")
+
+
+def logger_process(db_path: str, stop: Any, lines: Any) -> None:
+    db = Database(db_path)
+    task_id = f"logger-{uuid.uuid4()}"
+    db.create_task(task_id, {"goal": "verify total customers"})
+    db.update_task(task_id, "running")
+    written = 0
+    while not stop.is_set():
+        db.log_steps(task_id, [f"[Step] clicked next page {written + n}" for n in range(20)])
+        written += 20
+    lines.put(written)
+
+
+def client_thread(api: str, paths: List[str], stop: threading.Event, samples: Dict[str, List[float]]) -> None:
+    session = requests.Session()
+    n = 0
+    while not stop.is_set():
+        path = paths[n % len(paths)]
+        label = "/tasks/{id}" if path.startswith("/tasks/") else path.split("?")[0]
+        n += 1
+        started = time.perf_counter()
+        session.get(api + path, timeout=30)
+        samples[label].append(time.perf_counter() - started)
+
+
+def run_phase(db: Database, api: str, task_id: str, loggers: int, clients: int, seconds: float) -> Dict:
+    stop = threading.Event()
+    samples: Dict[str, List[float]] = defaultdict(list)
+    paths = ["/", f"/tasks/{task_id}", "/tasks?limit=20&fields=summary"]
+    # Separate processes, so the loggers contend for the database and not for this process's GIL
+    stop_loggers, lines = multiprocessing.Event(), multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=logger_process, args=(db.db_path, stop_loggers, lines))
+                 for _ in range(loggers)]
+    for process in processes:
+        process.start()
+    threads = [threading.Thread(target=client_thread, args=(api, paths, stop, samples)) for _ in range(clients)]
+    # The slow scan every request used to queue behind
+    threads.append(threading.Thread(target=client_thread, args=(api, ["/tasks?limit=1000"], stop, defaultdict(list))))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    stop_loggers.set()
+    for thread in threads:
+        thread.join()
+    written = sum(lines.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return {"samples": samples, "lines_per_s": written / seconds}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loggers", default="0,4,8", help="logger process counts to compare")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=20000, help="finished tasks in the database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db = Database(os.path.join(workdir, "qa_tasks.db"))
+        task_id = seed(db, args.seed)[0]
+        server, api = start_api(workdir)
+        try:
+            print(f"{args.clients} clients + 1 list scanner for {args.seconds:g}s per row, {args.seed} tasks seeded")
+            print(f"{'loggers':>7} {'lines/s':>9}  {'endpoint':<14} {'requests':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+            for loggers in (int(n) for n in args.loggers.split(",")):
+                phase = run_phase(db, api, task_id, loggers, args.clients, args.seconds)
+                for n, (path, values) in enumerate(sorted(phase["samples"].items())):
+                    prefix = f"{loggers:>7} {phase['lines_per_s']:>9.0f}" if n == 0 else " " * 17
+                    print(f"{prefix}  {path:<14} {len(values):>8} {percentile(values, 50) * 1000:>6.1f}ms "
+                          f"{percentile(values, 95) * 1000:>6.1f}ms {percentile(values, 99) * 1000:>6.1f}ms")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
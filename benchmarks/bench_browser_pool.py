@@ -0,0 +1,90 @@
+"""
+Benchmark of task wall-clock time with cold and warm browsers.
+
+Each "task" opens a page, loads a small document and reads a value from it.
+Three setups are timed:
+
+- subprocess: a fresh Python interpreter launches Playwright and Chromium
+  (the old per-task script path)
+- cold: Playwright and Chromium are launched in-process for every task
+- warm: tasks run on a BrowserPool whose browsers are already running
+
+Usage:
+    python benchmarks/bench_browser_pool.py [--runs 5] [--headed]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from playwright.sync_api import BrowserContext, sync_playwright  # noqa: E402
+from agent.browser_pool import BrowserPool  # noqa: E402
+
+PAGE = "data:text/html,<h3>Total Customers</h3><div class='text-4xl'>42</div>"
+
+SUBPROCESS_TASK = f"""
+from playwright.sync_api import sync_playwright
+with sync_playwright() as pw:
+    browser = pw.chromium.launch(headless={{headless}})
+    page = browser.new_context().new_page()
+    page.goto({PAGE!r})
+    page.locator('.text-4xl').text_content()
+    browser.close()
+"""
+
+
+def task(context: BrowserContext) -> str:
+    page = context.new_page()
+    page.goto(PAGE)
+    return page.locator(".text-4xl").text_content()
+
+
+def run_subprocess(headless: bool) -> None:
+    subprocess.run([sys.executable, "-c", SUBPROCESS_TASK.format(headless=headless)], check=True)
+
+
+def run_cold(headless: bool) -> None:
+    with sync_playwright() as pw:
+        browser = pw.chromium.launch(headless=headless)
+        context = browser.new_context()
+        task(context)
+        context.close()
+        browser.close()
+
+
+def report(label: str, durations) -> None:
+    print(f"{label:<12} mean {statistics.mean(durations) * 1000:>8.1f} ms   "
+          f"min {min(durations) * 1000:>8.1f} ms   max {max(durations) * 1000:>8.1f} ms")
+
+
+def timed(runs: int, func) -> list:
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--headed", action="store_true", help="run with visible browser windows")
+    args = parser.parse_args()
+    headless = not args.headed
+
+    report("subprocess", timed(args.runs, lambda: run_subprocess(headless)))
+    report("cold", timed(args.runs, lambda: run_cold(headless)))
+
+    pool = BrowserPool(size=1, headless=headless)
+    pool.run(task)  # launch outside the measurement
+    report("warm", timed(args.runs, lambda: pool.run(task)))
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Microbenchmark for task creation and log append throughput.
+
+Compares the old access pattern (a fresh sqlite3 connection per call on the
+default rollback journal) with the shared WAL connection pool used by Database,
+then times pages of the task list on a table of ``--list-rows`` tasks.
+
+Usage:
+    python benchmarks/bench_db.py [--tasks 500] [--logs 5000] [--threads 4] [--list-rows 100000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db.database import Database  # noqa: E402
+from db.pool import close_all_pools  # noqa: E402
+
+
+def legacy_create_task(db_path: str, task_id: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cursor.execute('SELECT COUNT(*) FROM tasks WHERE id = ?', (task_id,))
+        cursor.fetchone()
+        cursor.execute(
+            'INSERT INTO tasks (id, status, result, logs, parameters, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (task_id, "pending", "", "[]", None, now, now)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def legacy_log_step(db_path: str, task_id: str, message: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cursor.execute('UPDATE tasks SET updated_at = ? WHERE id = ?', (now, task_id))
+        cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM task_logs WHERE task_id = ?', (task_id,))
+        seq = cursor.fetchone()[0] + 1
+        cursor.execute('INSERT INTO task_logs (task_id, seq, ts, message) VALUES (?, ?, ?, ?)',
+                       (task_id, seq, now, message))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_threads(threads: int, total: int, work) -> float:
+    """Split total calls of work(i) across threads and return the ops/sec."""
+    errors = []
+
+    def worker(offset: int) -> None:
+        for i in range(offset, total, threads):
+            try:
+                work(i)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        print(f"    {len(errors)} operations failed, e.g. {errors[0]}")
+    return total / elapsed
+
+
+def bench(label: str, db_path: str, create, log, tasks: int, logs: int, threads: int) -> None:
+    task_ids = [str(uuid.uuid4()) for _ in range(tasks)]
+    creates = run_threads(threads, tasks, lambda i: create(task_ids[i]))
+    appends = run_threads(threads, logs, lambda i: log(task_ids[i % threads], f"log line {i}"))
+    print(f"{label:<28} create_task: {creates:>9.0f} ops/s   log_step: {appends:>9.0f} ops/s")
+
+
+def bench_list_tasks(db: Database, rows: int) -> None:
+    """Time the first page, a deep page, and filtered pages of ``list_tasks``."""
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany(
+        "INSERT INTO tasks (id, status, result, logs, parameters, goal, created_at, updated_at) "
+        "VALUES (?, ?, '', '[]', '{}', ?, ?, ?)",
+        (
+            (f"task-{i:06d}", "completed" if i % 3 else "failed", "add customer" if i % 2 else "verify total customers",
+             f"2025-01-{1 + i // 4000 % 28:02d} {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+             "2025-01-01 00:00:00")
+            for i in range(rows)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+    pages = {
+        "first page": dict(limit=100),
+        "middle page": dict(limit=100, after=f"task-{rows // 2:06d}"),
+        "failed, after cursor": dict(limit=100, status="failed", after="task-000300"),
+        "goal, summary": dict(limit=100, goal="add customer", include_logs=False),
+    }
+    for label, page in pages.items():
+        started = time.perf_counter()
+        tasks = db.list_tasks(**page)
+        elapsed = time.perf_counter() - started
+        print(f"list_tasks {label:<24} {len(tasks or []):>4} tasks in {elapsed * 1000:>7.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--logs", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--list-rows", type=int, default=100_000, help="tasks in the list_tasks table, 0 to skip")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        Database(legacy_path)
+        close_all_pools()
+        sqlite3.connect(legacy_path).execute('PRAGMA journal_mode=DELETE').fetchone()
+
+        bench("connect per call (before)", legacy_path,
+              lambda task_id: legacy_create_task(legacy_path, task_id),
+              lambda task_id, message: legacy_log_step(legacy_path, task_id, message),
+              args.tasks, args.logs, args.threads)
+
+        db = Database(os.path.join(tmp, "pooled.db"))
+        bench("WAL connection pool (after)", db.db_path,
+              db.create_task, db.log_step,
+              args.tasks, args.logs, args.threads)
+
+        if args.list_rows:
+            bench_list_tasks(Database(os.path.join(tmp, "listed.db")), args.list_rows)
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
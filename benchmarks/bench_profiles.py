@@ -0,0 +1,75 @@
+"""
+Benchmark of scenario wall-clock time under each execution profile.
+
+Serves the local CRM fixture with some page weight (images and a web font),
+then runs a goal N times on a warm BrowserPool per profile and reports
+browser launch time, run time and how many requests the profile aborted.
+
+Usage:
+    python benchmarks/bench_profiles.py [--runs 5] [--goal "verify total customers"]
+                                        [--images 20] [--asset-kb 64] [--latency-ms 20]
+                                        [--profiles desktop,lean] [--headed]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from agent.browser_pool import BrowserPool  # noqa: E402
+from agent.profiles import PROFILES, get_profile  # noqa: E402
+from agent.scenarios import get_scenario  # noqa: E402
+from benchmarks.crm_fixture import start_fixture  # noqa: E402
+
+
+def counting(scenario, blocked: list):
+    """Wrap a scenario so every aborted request of its context is counted."""
+    def run(context, url, log, options=None):
+        context.on("requestfailed", lambda request: blocked.append(request.url)
+                   if "ERR_FAILED" in (request.failure or "") else None)
+        return scenario(context, url, log, options)
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--goal", default="verify total customers")
+    parser.add_argument("--images", type=int, default=20, help="images per page served by the fixture")
+    parser.add_argument("--asset-kb", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=20, help="fixture delay per response")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--headed", action="store_true", help="headless flag passed to profiles that follow it")
+    args = parser.parse_args()
+
+    server, url = start_fixture(latency_ms=args.latency_ms, images=args.images, asset_kb=args.asset_kb)
+    scenario = get_scenario(args.goal)
+    print(f"Goal '{args.goal}' against {url}, {args.images} x {args.asset_kb} KB assets per page, {args.runs} runs")
+    print(f"{'profile':<10} {'launch':>10} {'mean':>10} {'p50':>10} {'max':>10} {'blocked/run':>12} {'failed':>7}")
+    try:
+        for name in args.profiles.split(","):
+            profile = get_profile(name.strip())
+            pool = BrowserPool(size=1, headless=not args.headed, profile=profile)
+            started = time.perf_counter()
+            pool.run(lambda context: None)  # launch outside the measurement
+            launch = time.perf_counter() - started
+
+            durations, blocked, failed = [], [], 0
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                if pool.run(counting(scenario, blocked), url, lambda message: None) != 0:
+                    failed += 1
+                durations.append(time.perf_counter() - started)
+            pool.close()
+
+            print(f"{profile.name:<10} {launch * 1000:>8.0f}ms {statistics.mean(durations) * 1000:>8.0f}ms "
+                  f"{statistics.median(durations) * 1000:>8.0f}ms {max(durations) * 1000:>8.0f}ms "
+                  f"{len(blocked) / args.runs:>12.1f} {failed:>7}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
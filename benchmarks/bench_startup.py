@@ -0,0 +1,114 @@
+"""
+Startup-time benchmark for ``uvicorn api.main:app``.
+
+Each run uses a fresh interpreter and a fresh working directory, so the
+database is created and migrated from scratch on the first run and only
+opened when the same directory is reused. Reports:
+
+- import time of ``api.main`` and whether it pulled in Playwright or the agent
+- time-to-first-request: from spawning uvicorn to the first 200 from GET /
+- the same against an already migrated database
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--port 8799] [--path /]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import requests
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Prints the import time and which heavy modules came along, as JSON
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import api.main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "playwright": any(name.startswith("playwright") for name in sys.modules),
+    "agent": "agent.qa_agent_final" in sys.modules,
+}))
+"""
+
+
+def child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.abspath(REPO_ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    # Keep the child's background work out of the measurement
+    env.setdefault("QA_RETENTION", "off")
+    env.setdefault("QA_LOG_LEVEL", "WARNING")
+    return env
+
+
+def measure_import(workdir: str) -> Dict:
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=workdir, env=child_env(),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_first_request(workdir: str, port: int, path: str, timeout: float = 30) -> float:
+    """Seconds from spawning uvicorn to the first successful response."""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=child_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                if requests.get(f"http://127.0.0.1:{port}{path}", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def summary(values: List[float]) -> str:
+    return (f"mean {statistics.mean(values) * 1000:>7.0f}ms  min {min(values) * 1000:>7.0f}ms  "
+            f"max {max(values) * 1000:>7.0f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--path", default="/", help="endpoint polled for the first request")
+    args = parser.parse_args()
+
+    imports, heavy = [], set()
+    cold, warm = [], []
+    with tempfile.TemporaryDirectory() as shared:
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as workdir:
+                probe = measure_import(workdir)
+            imports.append(probe["seconds"])
+            heavy.update(name for name in ("playwright", "agent") if probe[name])
+            with tempfile.TemporaryDirectory() as workdir:
+                cold.append(measure_first_request(workdir, args.port, args.path))
+            # Same directory every run: the schema is already at the current version
+            warm.append(measure_first_request(shared, args.port, args.path))
+
+    print(f"{args.runs} runs of uvicorn api.main:app, first request GET {args.path}")
+    print(f"import api.main          {summary(imports)}")
+    print(f"first request, new db    {summary(cold)}")
+    print(f"first request, reuse db  {summary(warm)}")
+    print(f"loaded at import         {', '.join(sorted(heavy)) or 'neither playwright nor the agent'}")
+
+
+if __name__ == "__main__":
+    main()
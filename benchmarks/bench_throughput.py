@@ -0,0 +1,160 @@
+"""
+End-to-end throughput benchmark against a running API.
+
+Submits tasks through POST /tasks, keeping ``--concurrency`` of them in
+flight, and polls each one until it finishes. Reports tasks/min and
+p50/p95/p99 task latency (submit to terminal status). While the load runs,
+a probe appends log lines to the API's database and reports the write
+latency it sees, to show contention on the shared SQLite file.
+
+By default the tasks target a local CRM fixture started in this process,
+so runs do not depend on the public demo site.
+
+Usage:
+    uvicorn api.main:app &
+    python benchmarks/bench_throughput.py [--tasks 20] [--concurrency 4] [--goal "verify total customers"]
+                                          [--customers 95] [--latency-ms 0] [--target-url URL]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.crm_fixture import start_fixture  # noqa: E402
+from db.database import Database  # noqa: E402
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def run_task(api: str, body: Dict, poll_interval: float, timeout: float) -> Dict:
+    """Submit one task and wait for it; returns its final status and latency."""
+    session = requests.Session()
+    started = time.perf_counter()
+    # Identical submissions are coalesced or served from the result cache; every task here must really run
+    response = session.post(f"{api}/tasks", json=body, params={"force": "true"}, timeout=30)
+    response.raise_for_status()
+    task_id = response.json()["task_id"]
+
+    etag: Optional[str] = None
+    status = response.json()["status"]
+    deadline = started + timeout
+    while status not in TERMINAL_STATUSES and time.perf_counter() < deadline:
+        time.sleep(poll_interval)
+        headers = {"If-None-Match": etag} if etag else {}
+        # tail=0 skips the logs; the ETag turns unchanged polls into empty 304s
+        response = session.get(f"{api}/tasks/{task_id}", params={"tail": 0}, headers=headers, timeout=30)
+        if response.status_code == 304:
+            continue
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        status = response.json()["status"]
+
+    return {"task_id": task_id, "status": status, "latency": time.perf_counter() - started}
+
+
+class WriteProbe:
+    """Appends a log line to a probe task at a fixed rate and times each write."""
+
+    def __init__(self, db_path: str, interval: float = 0.1):
+        self.db = Database(db_path)
+        self.interval = interval
+        self.task_id = f"bench-probe-{uuid.uuid4()}"
+        self.latencies: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="write-probe", daemon=True)
+
+    def start(self) -> None:
+        self.db.create_task(self.task_id, {"goal": "write probe"})
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        with self.db.pool.transaction() as conn:
+            conn.execute("DELETE FROM task_logs WHERE task_id = ?", (self.task_id,))
+            conn.execute("DELETE FROM tasks WHERE id = ?", (self.task_id,))
+
+    def _run(self) -> None:
+        n = 0
+        while not self._stop.wait(self.interval):
+            n += 1
+            started = time.perf_counter()
+            self.db.log_step(self.task_id, f"probe {n}")
+            self.latencies.append(time.perf_counter() - started)
+
+
+def report_latencies(label: str, seconds: List[float], unit: str = "s") -> None:
+    scale = 1000 if unit == "ms" else 1
+    print(f"{label:<22} p50 {percentile(seconds, 50) * scale:>9.2f} {unit}   "
+          f"p95 {percentile(seconds, 95) * scale:>9.2f} {unit}   "
+          f"p99 {percentile(seconds, 99) * scale:>9.2f} {unit}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", default="http://127.0.0.1:8000")
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--goal", default="verify total customers")
+    parser.add_argument("--headed", action="store_true", help="run with visible browser windows")
+    parser.add_argument("--target-url", help="app under test; defaults to a local CRM fixture")
+    parser.add_argument("--customers", type=int, default=95, help="fixture dataset size")
+    parser.add_argument("--page-size", type=int, default=10, help="fixture page size")
+    parser.add_argument("--latency-ms", type=float, default=0, help="fixture response latency")
+    parser.add_argument("--db", default="qa_tasks.db", help="API database file for the write probe")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--timeout", type=float, default=600, help="per-task timeout in seconds")
+    args = parser.parse_args()
+
+    server = None
+    target_url = args.target_url
+    if not target_url:
+        server, target_url = start_fixture(customers=args.customers, page_size=args.page_size,
+                                           latency_ms=args.latency_ms)
+        print(f"CRM fixture at {target_url} ({args.customers} customers, {args.latency_ms} ms latency)")
+
+    body = {"goal": args.goal, "url": target_url, "headless": not args.headed}
+    probe = WriteProbe(args.db)
+    probe.start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: run_task(args.api, body, args.poll_interval, args.timeout),
+                                range(args.tasks)))
+    elapsed = time.perf_counter() - started
+
+    probe.stop()
+    if server is not None:
+        server.shutdown()
+
+    by_status: Dict[str, int] = {}
+    for result in results:
+        by_status[result["status"]] = by_status.get(result["status"], 0) + 1
+
+    print(f"{args.tasks} tasks, concurrency {args.concurrency}, goal {args.goal!r}")
+    print(f"statuses               {', '.join(f'{k}={v}' for k, v in sorted(by_status.items()))}")
+    print(f"wall clock             {elapsed:.2f} s")
+    print(f"throughput             {args.tasks / elapsed * 60:.1f} tasks/min")
+    report_latencies("task latency", [r["latency"] for r in results])
+    report_latencies("db write latency", probe.latencies, unit="ms")
+
+
+if __name__ == "__main__":
+    main()
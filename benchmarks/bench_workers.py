@@ -0,0 +1,122 @@
+"""
+Throughput of standalone workers as their number grows.
+
+Queues ``--tasks`` tasks per round in a temporary database and drains them
+with 1, 2, 4, ... worker processes sharing it, either straight through
+SQLite or through a ``manager://`` store served by ``qa_worker.py
+--serve-store`` (the multi-node set-up). Tasks sleep for ``--task-ms``
+instead of driving a browser, so the numbers show the cost of claiming,
+heartbeating and finishing, and how close throughput stays to linear.
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1,2,4] [--tasks 200] [--task-ms 50]
+                                       [--concurrency 2] [--store sqlite|manager]
+"""
+import argparse
+import multiprocessing
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# A throwaway key for the manager:// store, shared with the server and worker processes through the environment
+os.environ.setdefault("QA_STORE_AUTHKEY", secrets.token_hex(16))
+
+from agent.worker import Worker  # noqa: E402
+from db.database import Database  # noqa: E402
+from db.task_store import connect_store  # noqa: E402
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def worker_process(store_url: str, concurrency: int, task_ms: float, stop: Any) -> None:
+    def run(task_id: str, parameters: Dict[str, Any]) -> int:
+        time.sleep(task_ms / 1000)
+        return 0
+
+    worker = Worker(connect_store(store_url), run, concurrency=concurrency, poll_interval=0.05)
+    worker.start()
+    stop.wait()
+    worker.stop()
+
+
+def serve_store(db_path: str) -> Tuple[subprocess.Popen, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "qa_worker.py"), "--store", f"sqlite:///{db_path}",
+         "--serve-store", f"127.0.0.1:{port}"],
+        env=dict(os.environ, QA_LOG_LEVEL="WARNING", QA_LOG_FILE=os.devnull), stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return server, f"manager://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("task store server did not start")
+
+
+def run_round(db: Database, store_url: str, workers: int, tasks: int, concurrency: int, task_ms: float) -> float:
+    """Seconds for ``workers`` processes to drain ``tasks`` queued tasks."""
+    db.enqueue_tasks(f"bench-{uuid.uuid4()}", [(str(uuid.uuid4()), {"goal": "verify total customers"}, 0)
+                                               for _ in range(tasks)])
+    stop = multiprocessing.Event()
+    processes = [multiprocessing.Process(target=worker_process, args=(store_url, concurrency, task_ms, stop))
+                 for _ in range(workers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    while sum(db.count_tasks_by_status(("queued", "running")).values()):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for process in processes:
+        process.join()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="worker process counts to compare")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks per round")
+    parser.add_argument("--task-ms", type=float, default=50, help="simulated run time of a task")
+    parser.add_argument("--concurrency", type=int, default=2, help="tasks each worker runs at once")
+    parser.add_argument("--store", choices=("sqlite", "manager"), default="sqlite")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "qa_tasks.db")
+        db = Database(db_path)
+        server = None
+        store_url = f"sqlite:///{db_path}"
+        if args.store == "manager":
+            server, store_url = serve_store(db_path)
+        try:
+            counts: List[int] = [int(n) for n in args.workers.split(",")]
+            ideal = args.concurrency / (args.task_ms / 1000)
+            print(f"{args.tasks} tasks of {args.task_ms:g} ms per round, {args.concurrency} per worker, "
+                  f"store {store_url.split('://')[0]}")
+            print(f"{'workers':>8} {'seconds':>9} {'tasks/s':>9} {'per worker':>11} {'of ideal':>9}")
+            for workers in counts:
+                elapsed = run_round(db, store_url, workers, args.tasks, args.concurrency, args.task_ms)
+                rate = args.tasks / elapsed
+                print(f"{workers:>8} {elapsed:>9.2f} {rate:>9.1f} {rate / workers:>11.1f} "
+                      f"{rate / (ideal * workers):>8.0%}")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Local stand-in for the demo CRM, for offline runs and benchmarks.
+
+Serves the pages the scenarios drive: the dashboard with its "Total
+Customers" card, /customers with the "Add Customer" form, the customer
+table and nav[aria-label='pagination']. Pages render client-side from a
+small JSON API, like the real app, and /customers?page=N opens on page N:
+
+    GET  /api/customers?page=N   one page of customers plus paging info
+    POST /api/customers          add a customer (JSON body)
+    GET  /api/stats              {"total": <count shown on the dashboard>}
+
+With --images N every page also loads N images and a web font of --asset-kb
+each from /static/, the kind of weight execution profiles can block.
+
+Usage:
+    python benchmarks/crm_fixture.py [--port 8765] [--customers 95] [--page-size 10]
+                                     [--latency-ms 0] [--total-skew 0] [--images 0] [--asset-kb 64]
+
+--total-skew makes the dashboard total differ from the real row count, to
+reproduce the known dashboard/list mismatch.
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+SHELL = """<!doctype html>
+<html>
+<head><meta charset="utf-8"><title>QA CRM Fixture</title></head>
+<body>
+<header><a href="/">Dashboard</a> | <a href="/customers">Customers</a></header>
+<main id="app"></main>
+<script>
+const app = document.getElementById("app");
+
+function el(tag, attrs, ...children) {
+    const node = document.createElement(tag);
+    Object.entries(attrs || {}).forEach(([key, value]) => node.setAttribute(key, value));
+    children.forEach(child => node.append(child));
+    return node;
+}
+
+async function dashboard() {
+    const value = el("div", {"class": "text-4xl"});
+    app.append(el("div", {"class": "card"},
+        el("div", {"class": "card-header"}, el("h3", {}, "Total Customers")),
+        el("div", {"class": "card-content"}, value)));
+    const stats = await (await fetch("/api/stats")).json();
+    value.textContent = String(stats.total);
+}
+
+const FIELDS = ["Name", "Email", "Phone", "Company", "Registration No", "VAT No",
+                "Address", "Postal Code", "City", "Country"];
+let currentPage = 1;
+
+async function renderPage(tbody, nav, page) {
+    const data = await (await fetch(`/api/customers?page=${page}`)).json();
+    currentPage = data.page;
+    tbody.replaceChildren(...data.customers.map(c =>
+        el("tr", {}, el("td", {}, c.name), el("td", {}, c.email), el("td", {}, c.company))));
+    const prev = el("button", {"type": "button"}, el("span", {}, "Previous"));
+    const next = el("button", {"type": "button"}, el("span", {}, "Next"));
+    if (data.page <= 1) { prev.setAttribute("aria-disabled", "true"); prev.disabled = true; }
+    if (data.page >= data.pages) { next.setAttribute("aria-disabled", "true"); next.disabled = true; }
+    prev.onclick = () => renderPage(tbody, nav, currentPage - 1);
+    next.onclick = () => renderPage(tbody, nav, currentPage + 1);
+    nav.replaceChildren(prev, el("span", {}, `Page ${data.page} of ${data.pages}`), next);
+}
+
+async function customers() {
+    const tbody = el("tbody");
+    const nav = el("nav", {"aria-label": "pagination"});
+    const form = el("form", {"id": "customer-form"});
+    form.hidden = true;
+    FIELDS.forEach(name => form.append(el("label", {}, name, el("input", {"name": name}))));
+    form.append(el("button", {"type": "submit"}, "Save"));
+    const add = el("button", {"type": "button"}, "Add Customer");
+    add.onclick = () => { form.hidden = false; };
+    form.onsubmit = async event => {
+        event.preventDefault();
+        const values = Array.from(form.querySelectorAll("input")).map(input => input.value);
+        await fetch("/api/customers", {method: "POST", headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({name: values[0], email: values[1], company: values[3]})});
+        form.reset();
+        form.hidden = true;
+        await renderPage(tbody, nav, currentPage);
+    };
+    app.append(el("h2", {}, "Customers"), add, form,
+        el("table", {}, el("thead", {}, el("tr", {}, el("th", {}, "Name"), el("th", {}, "Email"),
+            el("th", {}, "Company"))), tbody), nav);
+    await renderPage(tbody, nav, Number(new URLSearchParams(location.search).get("page")) || 1);
+}
+
+(location.pathname.startsWith("/customers") ? customers : dashboard)();
+</script>
+</body>
+</html>
+"""
+
+
+class CRMData:
+    """Thread-safe in-memory customer list."""
+
+    def __init__(self, customers: int = 95, page_size: int = 10, total_skew: int = 0):
+        self.page_size = max(1, page_size)
+        self.total_skew = total_skew
+        self._lock = threading.Lock()
+        self._customers: List[Dict[str, str]] = [
+            {"name": f"Customer {n:05d}", "email": f"customer{n}@example.com", "company": f"Company {n % 17}"}
+            for n in range(1, customers + 1)
+        ]
+
+    def page(self, number: int) -> Dict[str, Any]:
+        with self._lock:
+            pages = max(1, math.ceil(len(self._customers) / self.page_size))
+            number = min(max(1, number), pages)
+            start = (number - 1) * self.page_size
+            return {
+                "customers": self._customers[start:start + self.page_size],
+                "page": number,
+                "pages": pages,
+                "total": len(self._customers),
+            }
+
+    def add(self, customer: Dict[str, Any]) -> None:
+        with self._lock:
+            self._customers.append({
+                "name": str(customer.get("name", "")),
+                "email": str(customer.get("email", "")),
+                "company": str(customer.get("company", "")),
+            })
+
+    def total(self) -> int:
+        with self._lock:
+            return len(self._customers) + self.total_skew
+
+
+def render_shell(images: int = 0) -> bytes:
+    """The page shell, with ``images`` images and a web font when asked for."""
+    if not images:
+        return SHELL.encode()
+    head = ("<style>@font-face { font-family: Fixture; src: url(/static/font.woff2); }"
+            " body { font-family: Fixture, sans-serif; }</style></head>")
+    tags = "".join(f'<img src="/static/img-{n}.png" width="64" height="64">' for n in range(images))
+    return SHELL.replace("</head>", head, 1).replace('<main id="app">', f'<div>{tags}</div><main id="app">', 1).encode()
+
+
+def make_handler(data: CRMData, latency_ms: float, images: int = 0, asset_kb: int = 64):
+    shell = render_shell(images)
+    asset = bytes(asset_kb * 1024)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status: int, payload: Any) -> None:
+            self._send(status, json.dumps(payload).encode(), "application/json")
+
+        def do_GET(self) -> None:
+            parsed = urlparse(self.path)
+            if parsed.path == "/api/customers":
+                page = parse_qs(parsed.query).get("page", ["1"])[0]
+                self._json(200, data.page(int(page) if page.isdigit() else 1))
+            elif parsed.path == "/api/stats":
+                self._json(200, {"total": data.total()})
+            elif parsed.path in ("/", "/customers", "/customers/"):
+                self._send(200, shell, "text/html; charset=utf-8")
+            elif parsed.path.startswith("/static/"):
+                self._send(200, asset, "font/woff2" if parsed.path.endswith(".woff2") else "image/png")
+            else:
+                self._json(404, {"detail": "Not found"})
+
+        def do_POST(self) -> None:
+            if urlparse(self.path).path != "/api/customers":
+                self._json(404, {"detail": "Not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                customer = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._json(400, {"detail": "Invalid JSON"})
+                return
+            data.add(customer)
+            self._json(201, {"total": data.total()})
+
+    return Handler
+
+
+def start_fixture(host: str = "127.0.0.1", port: int = 0, customers: int = 95, page_size: int = 10,
+                  latency_ms: float = 0, total_skew: int = 0, images: int = 0,
+                  asset_kb: int = 64) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve the fixture on a background thread and return the server and its base URL."""
+    data = CRMData(customers, page_size, total_skew)
+    server = ThreadingHTTPServer((host, port), make_handler(data, latency_ms, images, asset_kb))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="crm-fixture", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--customers", type=int, default=95, help="initial number of customers")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every response")
+    parser.add_argument("--total-skew", type=int, default=0, help="added to the dashboard total")
+    parser.add_argument("--images", type=int, default=0, help="images loaded by every page")
+    parser.add_argument("--asset-kb", type=int, default=64, help="size of each image and the font")
+    args = parser.parse_args(argv)
+
+    server, url = start_fixture(args.host, args.port, args.customers, args.page_size,
+                                args.latency_ms, args.total_skew, args.images, args.asset_kb)
+    print(f"CRM fixture serving {args.customers} customers at {url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compressed archive segments for the logs of finished tasks.
+
+Each archived task's log entries are stored as one gzip member appended to a
+segment file; the task_archives table records the segment, byte offset and
+length of the member, so a single task's logs are read back with one seek
+and decompressed only when they are asked for. Concatenated gzip members
+form a valid gzip file, so a segment can also be inspected with zcat.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("qa_agent_db")
+
+SEGMENT_BYTES = int(os.environ.get("QA_ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+SEGMENT_PATTERN = re.compile(r"^segment-(\d+)\.gz$")
+
+# (segment file name, offset, length)
+ArchiveLocation = Tuple[str, int, int]
+
+
+def archive_dir_for(db_path: str) -> str:
+    """Default archive directory for a database: QA_ARCHIVE_DIR, or <db>.archive next to it."""
+    return os.environ.get("QA_ARCHIVE_DIR") or os.path.realpath(db_path) + ".archive"
+
+
+@lru_cache(maxsize=64)
+def _read_member(path: str, offset: int, length: int) -> Tuple[Dict[str, Any], ...]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    return tuple(json.loads(gzip.decompress(data)))
+
+
+class ArchiveStore:
+    """Appends and reads gzip members in size-capped segment files.
+
+    Writers must be serialized; ``Database`` appends only while holding the
+    SQLite write lock, which also covers other processes sharing the files.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = max(1, segment_bytes)
+        self._lock = threading.Lock()
+
+    def _current_segment(self) -> str:
+        numbers = [int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(self.directory)) if m]
+        number = max(numbers, default=1)
+        name = f"segment-{number:06d}.gz"
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            name = f"segment-{number + 1:06d}.gz"
+        return name
+
+    def append(self, entries_by_task: List[Tuple[str, List[Dict[str, Any]]]]) -> Dict[str, ArchiveLocation]:
+        """Write each task's entries as one member and return where each landed.
+
+        The segment is fsynced before returning, so the locations can be
+        committed to the database right away.
+        """
+        locations: Dict[str, ArchiveLocation] = {}
+        if not entries_by_task:
+            return locations
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            name = self._current_segment()
+            with open(os.path.join(self.directory, name), "ab") as f:
+                for task_id, entries in entries_by_task:
+                    data = gzip.compress(json.dumps(entries, separators=(",", ":")).encode(), compresslevel=6)
+                    offset = f.tell()
+                    f.write(data)
+                    locations[task_id] = (name, offset, len(data))
+                f.flush()
+                os.fsync(f.fileno())
+        return locations
+
+    def read(self, segment: str, offset: int, length: int) -> List[Dict[str, Any]]:
+        """Decompress one task's archived entries; recently read members are cached."""
+        if not SEGMENT_PATTERN.match(segment):
+            raise ValueError(f"Invalid archive segment name: {segment}")
+        return list(_read_member(os.path.join(self.directory, segment), offset, length))
+
+    def total_bytes(self) -> Optional[int]:
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(os.path.getsize(os.path.join(self.directory, name))
+                   for name in os.listdir(self.directory) if SEGMENT_PATTERN.match(name))
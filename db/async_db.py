@@ -0,0 +1,66 @@
+"""
+Awaitable access to the tasks database for the API's event loop.
+
+``sqlite3`` calls block, and a slow scan or a wait on the write lock while
+tests are logging would otherwise stall every request the loop is serving.
+``AsyncDatabase`` runs ``Database`` methods off the loop instead: writes go
+through one dedicated writer thread, which queues them and applies them in
+order, and reads run on a small pool of reader threads. Each thread keeps its
+own pooled WAL connection, so reads proceed while the writer, or a test
+thread logging steps, holds the write lock.
+"""
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from db.database import Database
+
+logger = logging.getLogger("qa_agent_db")
+
+READER_THREADS = int(os.environ.get("QA_DB_READERS", "4"))
+
+# Database methods that only read; every other method is sent to the writer thread
+READ_METHODS = frozenset({
+    "get_task", "get_task_summary", "get_logs", "list_tasks", "get_all_tasks", "get_batch",
+    "get_queue_position", "get_queued_task_ids", "count_tasks_by_status",
+})
+
+
+class AsyncDatabase:
+    """Awaitable wrapper of a ``Database``: ``await adb.get_task(task_id)``."""
+
+    def __init__(self, database: Database, readers: int = READER_THREADS):
+        self.db = database
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qa-db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=max(1, readers), thread_name_prefix="qa-db-reader")
+
+    async def run_read(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a read-only callable on a reader thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._readers, functools.partial(fn, *args, **kwargs))
+
+    async def run_write(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a callable on the writer thread, after every write queued before it."""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, functools.partial(fn, *args, **kwargs))
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self.db, name)
+        if not callable(method):
+            return method
+        run = self.run_read if name in READ_METHODS else self.run_write
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await run(method, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    async def flush(self) -> None:
+        """Wait until every write queued so far has been applied."""
+        await self.run_write(lambda: None)
+
+    def close(self) -> None:
+        """Finish queued writes and stop the threads."""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
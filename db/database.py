@@ -2,191 +2,712 @@
 Database operations for QA Agent tasks.
 """
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import traceback
 import logging
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
+from db.archive import ArchiveStore, archive_dir_for
+from db.migrations import SCHEMA_VERSION, migrate
+from db.pool import get_pool
+from db.task_states import TERMINAL_STATUSES, status_in
+from metrics import DB_QUERY_SECONDS, instrument_methods
 
 # Configure logging
 logger = logging.getLogger("qa_agent_db")
 
+@instrument_methods(DB_QUERY_SECONDS)
 class Database:
     def __init__(self, db_path: str = 'qa_tasks.db'):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
+        self.archive = ArchiveStore(archive_dir_for(db_path))
         self._init_db()
 
     def _init_db(self):
-        """Initialize database tables."""
-        conn = None
+        """Bring the schema up to date; a no-op once the database is at SCHEMA_VERSION."""
         try:
-            logger.info(f"Initializing database at {self.db_path}")
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create tasks table with updated schema
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id TEXT PRIMARY KEY,
-                status TEXT NOT NULL,
-                result TEXT,
-                logs TEXT DEFAULT '[]',
-                parameters TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            
-            # Add columns if they don't exist
-            columns_to_add = {
-                "updated_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
-                "parameters": "TEXT",
-                "result": "TEXT", 
-                "logs": "TEXT DEFAULT '[]'"
-            }
-            
-            for column, type_def in columns_to_add.items():
-                try:
-                    cursor.execute(f'ALTER TABLE tasks ADD COLUMN {column} {type_def}')
-                    logger.info(f"Added column {column} to tasks table")
-                except sqlite3.OperationalError:
-                    # Column already exists
-                    pass
-            
-            conn.commit()
-            logger.info("Database initialization complete")
+            applied = migrate(self.pool.connection())
+            if applied:
+                logger.info(f"Database at {self.db_path} migrated to schema version {SCHEMA_VERSION}")
         except Exception as e:
             logger.error(f"Error initializing database: {str(e)}")
             traceback.print_exc()
-        finally:
-            if conn:
-                conn.close()
 
     def create_task(self, task_id: str, parameters: dict = None) -> None:
-        """Create a new task."""
-        conn = None
+        """Create a new pending task; an existing task is left as it is (see ``reset_task``)."""
         try:
-            logger.info(f"Creating task {task_id}")
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Check if task already exists
-            cursor.execute('SELECT COUNT(*) FROM tasks WHERE id = ?', (task_id,))
-            if cursor.fetchone()[0] > 0:
-                logger.warning(f"Task {task_id} already exists, updating instead")
-                cursor.execute(
-                    'UPDATE tasks SET status = ?, updated_at = ?, parameters = ? WHERE id = ?',
-                    ("pending", now, json.dumps(parameters) if parameters else None, task_id)
-                )
-            else:
-                cursor.execute(
-                    'INSERT INTO tasks (id, status, result, logs, parameters, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
-                    (task_id, "pending", "", "[]", json.dumps(parameters) if parameters else None, now, now)
-                )
+            logger.debug(f"Creating task {task_id}", extra={"task_id": task_id})
+            condition, allowed = status_in("pending")
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                goal = (parameters or {}).get("goal")
+                row = conn.execute(
+                    f'''INSERT INTO tasks (id, status, result, logs, parameters, goal, created_at, updated_at)
+                    VALUES (?, 'pending', '', '[]', ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET status = 'pending', updated_at = excluded.updated_at,
+                    parameters = excluded.parameters, goal = excluded.goal, version = version + 1
+                    WHERE {condition}
+                    RETURNING version''',
+                    (task_id, json.dumps(parameters) if parameters else None, goal, now, now, *allowed)
+                ).fetchone()
             
-            conn.commit()
-            logger.info(f"Task {task_id} created successfully")
+            if not row:
+                logger.warning(f"Task {task_id} already exists, leaving it unchanged", extra={"task_id": task_id})
+                return
+            logger.info(f"Task {task_id} created successfully", extra={"task_id": task_id})
         except Exception as e:
             logger.error(f"Error creating task {task_id}: {str(e)}")
             traceback.print_exc()
-        finally:
-            if conn:
-                conn.close()
+
+    def reset_task(self, task_id: str, parameters: dict = None) -> None:
+        """Put a task back to pending whatever its status, for re-running it by hand.
+
+        Outside the state machine on purpose; runners never call it.
+        """
+        try:
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                conn.execute(
+                    '''INSERT INTO tasks (id, status, result, logs, parameters, goal, created_at, updated_at)
+                    VALUES (?, 'pending', '', '[]', ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET status = 'pending', result = '', updated_at = excluded.updated_at,
+                    parameters = excluded.parameters, goal = excluded.goal, lease_owner = NULL,
+                    lease_expires_at = NULL, version = version + 1''',
+                    (task_id, json.dumps(parameters) if parameters else None, (parameters or {}).get("goal"), now, now)
+                )
+            logger.info(f"Task {task_id} reset to pending", extra={"task_id": task_id})
+        except Exception as e:
+            logger.error(f"Error resetting task {task_id}: {str(e)}")
+            traceback.print_exc()
+
+    def transition(self, task_id: str, status: str, result: Optional[str] = None,
+                   expected_version: Optional[int] = None, owner: Optional[str] = None) -> Optional[int]:
+        """Move a task to ``status`` if the state machine allows it from its current status.
+
+        With ``expected_version`` the change only applies if the task is still
+        at that version, and with ``owner`` only while that owner holds its
+        lease; the lease is released either way. Returns the task's new
+        version, or None when the task is missing or the change was refused.
+        """
+        try:
+            condition, allowed = status_in(status)
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                row = conn.execute(
+                    f'''UPDATE tasks SET status = ?, result = COALESCE(?, result), updated_at = ?,
+                    lease_owner = NULL, lease_expires_at = NULL, version = version + 1
+                    WHERE id = ? AND {condition} AND (? IS NULL OR version = ?) AND (? IS NULL OR lease_owner = ?)
+                    RETURNING version''',
+                    (status, result or None, now, task_id, *allowed, expected_version, expected_version, owner, owner)
+                ).fetchone()
+            if not row:
+                held = f", lease no longer held by {owner}" if owner else ""
+                logger.warning(f"Refused to move task {task_id} to {status}{held}", extra={"task_id": task_id})
+                return None
+            return row[0]
+        except Exception as e:
+            logger.error(f"Error moving task {task_id} to {status}: {str(e)}")
+            traceback.print_exc()
+            return None
 
     def update_task(self, task_id: str, status: str, result: Optional[str] = None) -> None:
-        """Update task status and result."""
-        conn = None
+        """Update task status and result, creating the task if it does not exist.
+
+        A status the task cannot move to from its current one is dropped, so a
+        late update never overwrites a task that has already finished.
+        """
         try:
-            logger.info(f"Updating task {task_id} with status {status}")
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            logger.debug(f"Updating task {task_id} with status {status}", extra={"task_id": task_id})
+            condition, allowed = status_in(status)
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                row = conn.execute(
+                    f'''INSERT INTO tasks (id, status, result, logs, parameters, created_at, updated_at)
+                    VALUES (?, ?, COALESCE(?, ''), '[]', NULL, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET status = excluded.status,
+                    result = COALESCE(?, result), updated_at = excluded.updated_at, version = version + 1
+                    WHERE {condition}
+                    RETURNING version''',
+                    (task_id, status, result or None, now, now, result or None, *allowed)
+                ).fetchone()
             
-            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Check if task exists
-            cursor.execute('SELECT COUNT(*) FROM tasks WHERE id = ?', (task_id,))
-            if cursor.fetchone()[0] == 0:
-                logger.warning(f"Task {task_id} not found, creating new task")
-                self.create_task(task_id)
-                
-            if result:
-                cursor.execute(
-                    'UPDATE tasks SET status = ?, result = ?, updated_at = ? WHERE id = ?',
-                    (status, result, now, task_id)
+            if not row:
+                logger.warning(f"Ignored update of task {task_id} to {status}: not allowed from its current status",
+                               extra={"task_id": task_id})
+                return
+            logger.info(f"Task {task_id} updated to {status}", extra={"task_id": task_id})
+        except Exception as e:
+            logger.error(f"Error updating task {task_id}: {str(e)}")
+            traceback.print_exc()
+
+    def start_task(self, task_id: str, parameters: Optional[dict] = None) -> bool:
+        """Mark a task running, creating it if needed; True if it is running afterwards.
+
+        Tasks claimed from the queue are already running and are not written again.
+        """
+        try:
+            condition, allowed = status_in("running")
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                row = conn.execute(
+                    f'''INSERT INTO tasks (id, status, result, logs, parameters, goal, created_at, updated_at)
+                    VALUES (?, 'running', '', '[]', ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET status = 'running', updated_at = excluded.updated_at,
+                    version = version + 1
+                    WHERE {condition}
+                    RETURNING status''',
+                    (task_id, json.dumps(parameters) if parameters else None, (parameters or {}).get("goal"),
+                     now, now, *allowed)
+                ).fetchone()
+                if row:
+                    return True
+                # Not moved: fine if a runner already claimed it, refused if it has finished
+                status = conn.execute('SELECT status FROM tasks WHERE id = ?', (task_id,)).fetchone()[0]
+            if status != "running":
+                logger.warning(f"Not starting task {task_id}: it is already {status}", extra={"task_id": task_id})
+            return status == "running"
+        except Exception as e:
+            logger.error(f"Error starting task {task_id}: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    def enqueue_task(self, task_id: str, parameters: dict, priority: int = 0, dedupe_key: Optional[str] = None) -> bool:
+        """Add a task to the persistent run queue."""
+        try:
+            logger.info(f"Queueing task {task_id} with priority {priority}")
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                conn.execute(
+                    'INSERT INTO tasks (id, status, result, logs, parameters, goal, priority, dedupe_key, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (task_id, "queued", None, "[]", json.dumps(parameters), parameters.get("goal"), priority, dedupe_key, now, now)
                 )
-            else:
-                cursor.execute(
-                    'UPDATE tasks SET status = ?, updated_at = ? WHERE id = ?',
-                    (status, now, task_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error queueing task {task_id}: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    def enqueue_or_reuse(self, task_id: str, parameters: dict, priority: int, dedupe_key: str,
+                         cache_ttl: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """Queue a task unless an identical one can stand in for it.
+
+        An identical task that is still queued or running is reused, as is
+        one that finished within ``cache_ttl`` seconds when given. Returns
+        ``(task_id, outcome)`` with outcome "in_flight", "cached" or
+        "queued", or None on error.
+        """
+        try:
+            with self.pool.transaction() as conn:
+                # Take the write lock first so concurrent submitters can't both miss
+                if not conn.in_transaction:
+                    conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute(
+                    '''SELECT id FROM tasks WHERE dedupe_key = ? AND status IN ('queued', 'pending', 'running')
+                    ORDER BY rowid DESC LIMIT 1''',
+                    (dedupe_key,)
+                ).fetchone()
+                if row:
+                    return row[0], "in_flight"
+
+                if cache_ttl:
+                    cutoff = datetime.fromtimestamp(datetime.now().timestamp() - cache_ttl).strftime('%Y-%m-%d %H:%M:%S')
+                    row = conn.execute(
+                        '''SELECT id FROM tasks WHERE dedupe_key = ? AND status IN ('completed', 'failed')
+                        AND updated_at >= ? ORDER BY updated_at DESC, rowid DESC LIMIT 1''',
+                        (dedupe_key, cutoff)
+                    ).fetchone()
+                    if row:
+                        return row[0], "cached"
+
+                if not self.enqueue_task(task_id, parameters, priority, dedupe_key):
+                    return None
+            return task_id, "queued"
+        except Exception as e:
+            logger.error(f"Error queueing task {task_id}: {str(e)}")
+            traceback.print_exc()
+            return None
+
+    def enqueue_tasks(self, batch_id: str, tasks: List[Tuple[str, dict, int]]) -> bool:
+        """Queue ``(task_id, parameters, priority)`` tasks as one batch in a single transaction."""
+        try:
+            logger.info(f"Queueing batch {batch_id} of {len(tasks)} tasks")
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                conn.execute(
+                    'INSERT INTO batches (id, size, created_at) VALUES (?, ?, ?)',
+                    (batch_id, len(tasks), now)
                 )
-            
-            conn.commit()
-            logger.info(f"Task {task_id} updated successfully")
+                conn.executemany(
+                    'INSERT INTO tasks (id, status, result, logs, parameters, goal, priority, batch_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [
+                        (task_id, "queued", None, "[]", json.dumps(parameters), parameters.get("goal"), priority, batch_id, now, now)
+                        for task_id, parameters, priority in tasks
+                    ]
+                )
+            return True
         except Exception as e:
-            logger.error(f"Error updating task {task_id}: {str(e)}")
+            logger.error(f"Error queueing batch {batch_id}: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Get a batch's tasks and its progress counts by status."""
+        try:
+            conn = self.pool.connection()
+            batch = conn.execute('SELECT size, created_at FROM batches WHERE id = ?', (batch_id,)).fetchone()
+            if not batch:
+                return None
+            size, created_at = batch
+            rows = conn.execute(
+                'SELECT id, status, goal, updated_at FROM tasks WHERE batch_id = ? ORDER BY rowid',
+                (batch_id,)
+            ).fetchall()
+
+            counts: Dict[str, int] = {}
+            for _, status, _, _ in rows:
+                counts[status] = counts.get(status, 0) + 1
+            return {
+                "id": batch_id,
+                "size": size,
+                "created_at": created_at,
+                "counts": counts,
+                "last_updated_at": max((row[3] for row in rows if row[3]), default=None),
+                "tasks": [{"id": task_id, "status": status, "goal": goal} for task_id, status, goal, _ in rows]
+            }
+        except Exception as e:
+            logger.error(f"Error getting batch {batch_id}: {str(e)}")
+            traceback.print_exc()
+            return None
+
+    def claim_next_task(self, owner: Optional[str] = None, lease_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Atomically move the highest-priority, oldest queued task to running.
+
+        With an ``owner`` the task is leased to it for ``lease_seconds``; the
+        owner must renew the lease while it runs or the task is reclaimed.
+        The returned ``version`` lets the owner finish the task only if
+        nothing else changed it meanwhile.
+        """
+        try:
+            condition, allowed = status_in("running", among=("queued",))
+            with self.pool.transaction() as conn:
+                now = datetime.now()
+                expires = (now + timedelta(seconds=lease_seconds)).strftime('%Y-%m-%d %H:%M:%S') if owner else None
+                row = conn.execute(
+                    f'''UPDATE tasks SET status = 'running', updated_at = ?,
+                    lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, version = version + 1
+                    WHERE id = (SELECT id FROM tasks WHERE status = 'queued' ORDER BY priority DESC, rowid LIMIT 1)
+                    AND {condition}
+                    RETURNING id, parameters, version''',
+                    (now.strftime('%Y-%m-%d %H:%M:%S'), owner, expires, *allowed)
+                ).fetchone()
+            if not row:
+                return None
+            task_id, parameters, version = row
+            try:
+                parsed_parameters = json.loads(parameters) if parameters else {}
+            except json.JSONDecodeError as e:
+                logger.error(f"Error parsing parameters for task {task_id}: {str(e)}")
+                parsed_parameters = {}
+            return {"id": task_id, "parameters": parsed_parameters, "version": version}
+        except Exception as e:
+            logger.error(f"Error claiming next task: {str(e)}")
+            traceback.print_exc()
+            return None
+
+    def renew_lease(self, task_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend ``owner``'s lease on a running task.
+
+        False means the lease was lost: it expired and was reclaimed, or the
+        task was cancelled, so the owner should stop working on it.
+        """
+        try:
+            with self.pool.transaction() as conn:
+                expires = (datetime.now() + timedelta(seconds=lease_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+                cursor = conn.execute(
+                    "UPDATE tasks SET lease_expires_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                    (expires, task_id, owner)
+                )
+            return cursor.rowcount == 1
+        except Exception as e:
+            logger.error(f"Error renewing lease on task {task_id}: {str(e)}")
+            traceback.print_exc()
+            # Unknown rather than lost; the next heartbeat tries again
+            return True
+
+    def finish_leased_task(self, task_id: str, owner: str, status: str, result: Optional[str] = None,
+                           expected_version: Optional[int] = None) -> bool:
+        """Record the terminal status of a leased task, only if ``owner`` still holds the lease.
+
+        With ``expected_version`` (from ``claim_next_task``) the outcome is
+        also dropped if the task changed since it was claimed, e.g. it was
+        reclaimed and claimed again by the same owner.
+        """
+        if status not in TERMINAL_STATUSES:
+            logger.error(f"Cannot finish task {task_id} as {status}: not a terminal status")
+            return False
+        return self.transition(task_id, status, result, expected_version, owner=owner) is not None
+
+    def reclaim_expired_leases(self, max_attempts: int = 3) -> int:
+        """Requeue running tasks whose lease expired; fail those already tried ``max_attempts`` times."""
+        try:
+            fail_condition, fail_allowed = status_in("failed", among=("running",))
+            requeue_condition, requeue_allowed = status_in("queued", among=("running",))
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                failed = conn.execute(
+                    f'''UPDATE tasks SET status = 'failed', result = ?, updated_at = ?, lease_owner = NULL, lease_expires_at = NULL,
+                    version = version + 1 WHERE lease_owner IS NOT NULL AND lease_expires_at < ? AND {fail_condition} AND attempts >= ?''',
+                    (f"Worker lost after {max_attempts} attempts", now, now, *fail_allowed, max_attempts)
+                ).rowcount
+                requeued = conn.execute(
+                    f'''UPDATE tasks SET status = 'queued', updated_at = ?, lease_owner = NULL, lease_expires_at = NULL,
+                    version = version + 1 WHERE lease_owner IS NOT NULL AND lease_expires_at < ? AND {requeue_condition}''',
+                    (now, now, *requeue_allowed)
+                ).rowcount
+            if failed or requeued:
+                logger.info(f"Reclaimed expired leases: requeued {requeued} tasks, failed {failed}")
+            return failed + requeued
+        except Exception as e:
+            logger.error(f"Error reclaiming expired leases: {str(e)}")
+            traceback.print_exc()
+            return 0
+
+    def cancel_leased_task(self, task_id: str) -> bool:
+        """Cancel a task running under a lease; its worker notices on the next heartbeat."""
+        try:
+            condition, allowed = status_in("cancelled", among=("running",))
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                cursor = conn.execute(
+                    f'''UPDATE tasks SET status = 'cancelled', result = ?, updated_at = ?, lease_owner = NULL, lease_expires_at = NULL,
+                    version = version + 1 WHERE id = ? AND lease_owner IS NOT NULL AND {condition}''',
+                    ("Cancelled while running", now, task_id, *allowed)
+                )
+            return cursor.rowcount == 1
+        except Exception as e:
+            logger.error(f"Error cancelling task {task_id}: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    def requeue_interrupted_tasks(self) -> int:
+        """Put tasks left running or pending by a previous process back on the queue.
+
+        Leased tasks may still be running on another worker and are left to
+        ``reclaim_expired_leases``.
+        """
+        try:
+            condition, allowed = status_in("queued", among=("running", "pending"))
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                cursor = conn.execute(
+                    "UPDATE tasks SET status = 'queued', updated_at = ?, version = version + 1 "
+                    f"WHERE {condition} AND lease_owner IS NULL",
+                    (now, *allowed)
+                )
+            if cursor.rowcount:
+                logger.info(f"Requeued {cursor.rowcount} interrupted tasks")
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error requeueing interrupted tasks: {str(e)}")
+            traceback.print_exc()
+            return 0
+
+    def cancel_queued_task(self, task_id: str) -> bool:
+        """Cancel a task that has not started yet."""
+        try:
+            condition, allowed = status_in("cancelled", among=("queued",))
+            with self.pool.transaction() as conn:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                cursor = conn.execute(
+                    "UPDATE tasks SET status = 'cancelled', result = ?, updated_at = ?, version = version + 1 "
+                    f"WHERE id = ? AND {condition}",
+                    ("Cancelled before start", now, task_id, *allowed)
+                )
+            return cursor.rowcount == 1
+        except Exception as e:
+            logger.error(f"Error cancelling task {task_id}: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    def get_queued_task_ids(self) -> List[str]:
+        """Get queued task ids in the order they will run."""
+        try:
+            cursor = self.pool.connection().execute(
+                "SELECT id FROM tasks WHERE status = 'queued' ORDER BY priority DESC, rowid"
+            )
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting queued tasks: {str(e)}")
+            traceback.print_exc()
+            return []
+
+    def count_tasks_by_status(self, statuses: Tuple[str, ...] = ("queued", "running")) -> Dict[str, int]:
+        """Count tasks in each of ``statuses``, including those with none."""
+        try:
+            placeholders = ", ".join("?" for _ in statuses)
+            cursor = self.pool.connection().execute(
+                f"SELECT status, COUNT(*) FROM tasks WHERE status IN ({placeholders}) GROUP BY status",
+                statuses
+            )
+            counts = {status: 0 for status in statuses}
+            counts.update(dict(cursor.fetchall()))
+            return counts
+        except Exception as e:
+            logger.error(f"Error counting tasks: {str(e)}")
             traceback.print_exc()
-        finally:
-            if conn:
-                conn.close()
+            return {}
+
+    def get_queue_position(self, task_id: str) -> Optional[int]:
+        """Get the 1-based queue position of a queued task."""
+        try:
+            row = self.pool.connection().execute(
+                '''SELECT (SELECT COUNT(*) FROM tasks AS ahead
+                        WHERE ahead.status = 'queued'
+                        AND (ahead.priority > me.priority OR (ahead.priority = me.priority AND ahead.rowid < me.rowid))) + 1
+                FROM tasks AS me WHERE me.id = ? AND me.status = 'queued'
+                ''',
+                (task_id,)
+            ).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logger.error(f"Error getting queue position for task {task_id}: {str(e)}")
+            traceback.print_exc()
+            return None
 
     def log_step(self, task_id: str, message: str) -> None:
         """Add a log message to task."""
-        conn = None
+        self.log_steps(task_id, [message])
+
+    def log_steps(self, task_id: str, messages: List[str]) -> List[Dict[str, Any]]:
+        """Add several log messages to task in one transaction and return the stored entries."""
+        if not messages:
+            return []
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get existing logs
-            cursor.execute('SELECT logs FROM tasks WHERE id = ?', (task_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                logger.warning(f"Task {task_id} not found, creating new task")
-                self.create_task(task_id)
-                
-                # Try again to get logs
-                cursor.execute('SELECT logs FROM tasks WHERE id = ?', (task_id,))
-                result = cursor.fetchone()
-                
-            existing_logs = json.loads(result[0]) if result and result[0] else []
+            with self.pool.transaction() as conn:
+                cursor = conn.cursor()
             
-            # Add new log
-            new_log = {
-                "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                "message": message
-            }
-            existing_logs.append(new_log)
+                # Touching the task row first takes the write lock before seq is read; a missing task is created
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                cursor.execute(
+                    '''INSERT INTO tasks (id, status, result, logs, parameters, created_at, updated_at)
+                    VALUES (?, 'pending', '', '[]', NULL, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET updated_at = excluded.updated_at''',
+                    (task_id, now, now)
+                )
             
-            # Update logs and updated_at
-            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute(
-                'UPDATE tasks SET logs = ?, updated_at = ? WHERE id = ?',
-                (json.dumps(existing_logs), now, task_id)
-            )
+                # The (task_id, seq) key keeps MAX(seq) an index lookup; archived tasks continue after their archive
+                cursor.execute(
+                    '''SELECT COALESCE((SELECT MAX(seq) FROM task_logs WHERE task_id = ?),
+                        (SELECT last_seq FROM task_archives WHERE task_id = ?), 0)''',
+                    (task_id, task_id)
+                )
+                last_seq = cursor.fetchone()[0]
+                cursor.executemany(
+                    'INSERT INTO task_logs (task_id, seq, ts, message) VALUES (?, ?, ?, ?)',
+                    [(task_id, last_seq + i, now, message) for i, message in enumerate(messages, start=1)]
+                )
+                entries = [
+                    {"seq": last_seq + i, "timestamp": now, "message": message}
+                    for i, message in enumerate(messages, start=1)
+                ]
             
-            conn.commit()
             # Only log info for significant events to avoid excessive logging
-            if "error" in message.lower() or "fail" in message.lower() or "success" in message.lower():
-                logger.info(f"Task {task_id} log: {message}")
+            for entry in entries:
+                message = entry["message"].lower()
+                if "error" in message or "fail" in message or "success" in message:
+                    logger.info(f"Task {task_id} log: {entry['message']}",
+                                extra={"task_id": task_id, "step": entry["seq"]})
+            return entries
         except Exception as e:
             logger.error(f"Error logging to task {task_id}: {str(e)}")
             traceback.print_exc()
-        finally:
-            if conn:
-                conn.close()
+            return []
+
+    def _fetch_logs(self, cursor: sqlite3.Cursor, task_id: str, since_seq: int = 0,
+                    tail: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rebuild a task's log list from task_logs and, once archived, its archive segment.
+
+        The archive is only decompressed when the requested range reaches into it.
+        """
+        cursor.execute('SELECT segment, offset, length, last_seq FROM task_archives WHERE task_id = ?', (task_id,))
+        archived = cursor.fetchone()
+        if archived is None or archived[0] is None or since_seq >= archived[3]:
+            return self._fetch_live_logs(cursor, task_id, since_seq, tail)
+        
+        segment, offset, length, last_seq = archived
+        live = self._fetch_live_logs(cursor, task_id, last_seq, tail)
+        if tail is not None and len(live) >= tail:
+            return live
+        try:
+            entries = [entry for entry in self.archive.read(segment, offset, length) if entry["seq"] > since_seq]
+        except Exception as e:
+            logger.error(f"Error reading archived logs of task {task_id} from {segment}: {str(e)}")
+            entries = []
+        entries.extend(live)
+        return entries[max(0, len(entries) - tail):] if tail is not None else entries
+
+    def _fetch_live_logs(self, cursor: sqlite3.Cursor, task_id: str, since_seq: int = 0,
+                    tail: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Read a task's log entries from task_logs."""
+        if tail is not None:
+            # Walk the primary key backwards so only the last ``tail`` rows are read
+            cursor.execute(
+                'SELECT seq, ts, message FROM task_logs WHERE task_id = ? AND seq > ? ORDER BY seq DESC LIMIT ?',
+                (task_id, since_seq, tail)
+            )
+            rows = cursor.fetchall()[::-1]
+        else:
+            cursor.execute(
+                'SELECT seq, ts, message FROM task_logs WHERE task_id = ? AND seq > ? ORDER BY seq',
+                (task_id, since_seq)
+            )
+            rows = cursor.fetchall()
+        return [{"seq": seq, "timestamp": ts, "message": message} for seq, ts, message in rows]
+
+    def get_logs(self, task_id: str, since_seq: int = 0, tail: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the log entries of a task after ``since_seq``, in insertion order.
+
+        With ``tail`` only the last ``tail`` of those entries are returned.
+        """
+        try:
+            return self._fetch_logs(self.pool.connection().cursor(), task_id, since_seq, tail)
+        except Exception as e:
+            logger.error(f"Error getting logs for task {task_id}: {str(e)}")
+            traceback.print_exc()
+            return []
+
+    def archive_tasks(self, max_age_days: Optional[float] = None, keep_latest: Optional[int] = None,
+                      limit: int = 50) -> int:
+        """Move the logs of up to ``limit`` finished tasks into archive segments.
+
+        A finished task is archived once it was last updated more than
+        ``max_age_days`` ago, or once it is no longer among the ``keep_latest``
+        newest finished tasks. Its task row stays as the summary. Returns the
+        number of tasks archived, or 0 on error.
+        """
+        if not max_age_days and not keep_latest:
+            return 0
+        try:
+            with self.pool.transaction() as conn:
+                # The write lock also serializes appends to the archive segments
+                if not conn.in_transaction:
+                    conn.execute('BEGIN IMMEDIATE')
+                cutoff = ""
+                if max_age_days:
+                    cutoff = datetime.fromtimestamp(datetime.now().timestamp() - max_age_days * 86400).strftime('%Y-%m-%d %H:%M:%S')
+                task_ids = [row[0] for row in conn.execute(
+                    '''SELECT id FROM tasks
+                    WHERE status IN ('completed', 'failed', 'cancelled')
+                    AND NOT EXISTS (SELECT 1 FROM task_archives WHERE task_id = tasks.id)
+                    AND (updated_at < ? OR rowid NOT IN (
+                        SELECT rowid FROM tasks WHERE status IN ('completed', 'failed', 'cancelled')
+                        ORDER BY created_at DESC, rowid DESC LIMIT ?))
+                    ORDER BY created_at, rowid LIMIT ?''',
+                    (cutoff, keep_latest or -1, limit)
+                ).fetchall()]
+                if not task_ids:
+                    return 0
+                
+                cursor = conn.cursor()
+                entries_by_task = [(task_id, self._fetch_live_logs(cursor, task_id)) for task_id in task_ids]
+                locations = self.archive.append([(task_id, entries) for task_id, entries in entries_by_task if entries])
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                conn.executemany(
+                    '''INSERT INTO task_archives (task_id, segment, offset, length, entries, last_seq, archived_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                    [(task_id, *locations.get(task_id, (None, None, None)), len(entries),
+                      entries[-1]["seq"] if entries else 0, now)
+                     for task_id, entries in entries_by_task]
+                )
+                conn.executemany('DELETE FROM task_logs WHERE task_id = ?', [(task_id,) for task_id in task_ids])
+            logger.info(f"Archived logs of {len(task_ids)} tasks")
+            return len(task_ids)
+        except Exception as e:
+            logger.error(f"Error archiving task logs: {str(e)}")
+            traceback.print_exc()
+            return 0
+
+    def is_incremental_vacuum(self) -> bool:
+        """Whether the database already runs in incremental auto_vacuum mode."""
+        try:
+            return self.pool.connection().execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        except Exception as e:
+            logger.error(f"Error reading auto_vacuum mode: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    def enable_incremental_vacuum(self) -> bool:
+        """Switch a database created without auto_vacuum to incremental mode.
+
+        Needs a full VACUUM once, which rewrites the file and holds the write
+        lock while it runs. Returns True if the database is in incremental mode.
+        """
+        try:
+            conn = self.pool.connection()
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                return True
+            logger.info(f"Converting {self.db_path} to incremental auto_vacuum with a full VACUUM")
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        except Exception as e:
+            logger.error(f"Error enabling incremental vacuum: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    def incremental_vacuum(self, max_pages: int = 1000) -> int:
+        """Return up to ``max_pages`` free pages to the filesystem and report how many were freed."""
+        try:
+            conn = self.pool.connection()
+            before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if before:
+                # execute() steps the pragma once, which frees a single page; executescript runs it to the end
+                conn.executescript(f'PRAGMA incremental_vacuum({int(max_pages)});')
+            return before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+        except Exception as e:
+            logger.error(f"Error running incremental vacuum: {str(e)}")
+            traceback.print_exc()
+            return 0
+
+    def get_task_summary(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get task status, timestamps and latest log seq without reading its logs."""
+        try:
+            row = self.pool.connection().execute(
+                '''SELECT status, result, goal, created_at, updated_at, version,
+                    COALESCE((SELECT MAX(seq) FROM task_logs WHERE task_id = tasks.id),
+                        (SELECT last_seq FROM task_archives WHERE task_id = tasks.id), 0)
+                FROM tasks WHERE id = ?
+                ''',
+                (task_id,)
+            ).fetchone()
+            if not row:
+                return None
+            status, result, goal, created_at, updated_at, version, last_seq = row
+            return {
+                "id": task_id,
+                "status": status,
+                "result": result,
+                "goal": goal,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "version": version,
+                "last_seq": last_seq
+            }
+        except Exception as e:
+            logger.error(f"Error getting summary of task {task_id}: {str(e)}")
+            traceback.print_exc()
+            return None
 
     def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get task details."""
-        conn = None
         try:
-            logger.info(f"Getting task {task_id}")
-            conn = sqlite3.connect(self.db_path)
+            logger.debug(f"Getting task {task_id}")
+            conn = self.pool.connection()
             cursor = conn.cursor()
             
             cursor.execute(
-                'SELECT status, result, logs, parameters, created_at, updated_at FROM tasks WHERE id = ?',
+                'SELECT status, result, parameters, created_at, updated_at, version FROM tasks WHERE id = ?',
                 (task_id,)
             )
             result = cursor.fetchone()
@@ -194,22 +715,17 @@ class Database:
             if not result:
                 logger.warning(f"Task {task_id} not found")
                 return None
-                
-            status, result_text, logs, parameters, created_at, updated_at = result
+            
+            status, result_text, parameters, created_at, updated_at, version = result
+            parsed_logs = self._fetch_logs(cursor, task_id)
             
             # Parse JSON fields
-            try:
-                parsed_logs = json.loads(logs) if logs else []
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing logs for task {task_id}: {str(e)}")
-                parsed_logs = []
-                
             try:
                 parsed_parameters = json.loads(parameters) if parameters else {}
             except json.JSONDecodeError as e:
                 logger.error(f"Error parsing parameters for task {task_id}: {str(e)}")
                 parsed_parameters = {}
-                
+            
             return {
                 "id": task_id,
                 "status": status,
@@ -217,43 +733,42 @@ class Database:
                 "logs": parsed_logs,
                 "parameters": parsed_parameters,
                 "created_at": created_at,
-                "updated_at": updated_at
+                "updated_at": updated_at,
+                "version": version
             }
         except Exception as e:
             logger.error(f"Error getting task {task_id}: {str(e)}")
             traceback.print_exc()
             return None
-        finally:
-            if conn:
-                conn.close()
 
     def get_all_tasks(self) -> List[Dict[str, Any]]:
         """Get all tasks."""
-        conn = None
         try:
-            logger.info("Getting all tasks")
-            conn = sqlite3.connect(self.db_path)
+            logger.debug("Getting all tasks")
+            conn = self.pool.connection()
             cursor = conn.cursor()
             
             cursor.execute(
-                'SELECT id, status, result, logs, parameters, created_at, updated_at FROM tasks ORDER BY created_at DESC'
+                'SELECT id, status, result, parameters, created_at, updated_at FROM tasks ORDER BY created_at DESC'
             )
             results = cursor.fetchall()
             
+            # One ordered scan of task_logs instead of a query per task
+            logs_by_task: Dict[str, List[Dict[str, Any]]] = {}
+            cursor.execute('SELECT task_id, seq, ts, message FROM task_logs ORDER BY task_id, seq')
+            for log_task_id, seq, ts, message in cursor.fetchall():
+                logs_by_task.setdefault(log_task_id, []).append({"seq": seq, "timestamp": ts, "message": message})
+            
             tasks = []
-            for task_id, status, result, logs, parameters, created_at, updated_at in results:
-                try:
-                    parsed_logs = json.loads(logs) if logs else []
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error parsing logs for task {task_id}: {str(e)}")
-                    parsed_logs = []
-                    
+            for task_id, status, result, parameters, created_at, updated_at in results:
+                parsed_logs = logs_by_task.get(task_id, [])
+                
                 try:
                     parsed_parameters = json.loads(parameters) if parameters else {}
                 except json.JSONDecodeError as e:
                     logger.error(f"Error parsing parameters for task {task_id}: {str(e)}")
                     parsed_parameters = {}
-                
+            
                 tasks.append({
                     "id": task_id,
                     "status": status,
@@ -264,12 +779,81 @@ class Database:
                     "updated_at": updated_at
                 })
             
-            logger.info(f"Retrieved {len(tasks)} tasks")
+            logger.debug(f"Retrieved {len(tasks)} tasks")
             return tasks
         except Exception as e:
             logger.error(f"Error getting all tasks: {str(e)}")
             traceback.print_exc()
             return []
-        finally:
-            if conn:
-                conn.close() 
\ No newline at end of file
+
+    def list_tasks(self, limit: int = 100, after: Optional[str] = None, status: Optional[str] = None,
+                   goal: Optional[str] = None, include_logs: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """Get one page of tasks, newest first.
+
+        ``after`` is the id of the last task of the previous page. Pages are
+        read with a keyset condition on (created_at, rowid), so deep pages cost
+        the same as the first one. Returns None when no task has the id
+        ``after``, so a stale cursor isn't mistaken for the end of the list.
+        With ``include_logs=False`` the log table is never read and tasks
+        carry no ``logs`` key.
+        """
+        try:
+            conn = self.pool.connection()
+            cursor = conn.cursor()
+            conditions = []
+            params: List[Any] = []
+            if status:
+                conditions.append('status = ?')
+                params.append(status)
+            if goal:
+                conditions.append('goal = ? COLLATE NOCASE')
+                params.append(goal)
+            if after:
+                position = cursor.execute('SELECT created_at, rowid FROM tasks WHERE id = ?', (after,)).fetchone()
+                if position is None:
+                    logger.warning(f"Task list cursor {after} does not match any task")
+                    return None
+                conditions.append('(created_at, rowid) < (?, ?)')
+                params.extend(position)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            
+            cursor.execute(
+                f'''SELECT id, status, result, goal, parameters, created_at, updated_at FROM tasks
+                {where} ORDER BY created_at DESC, rowid DESC LIMIT ?''',
+                (*params, limit)
+            )
+            rows = cursor.fetchall()
+            
+            logs_by_task: Dict[str, List[Dict[str, Any]]] = {}
+            if include_logs and rows:
+                placeholders = ", ".join("?" for _ in rows)
+                cursor.execute(
+                    f'SELECT task_id, seq, ts, message FROM task_logs WHERE task_id IN ({placeholders}) ORDER BY task_id, seq',
+                    [row[0] for row in rows]
+                )
+                for log_task_id, seq, ts, message in cursor.fetchall():
+                    logs_by_task.setdefault(log_task_id, []).append({"seq": seq, "timestamp": ts, "message": message})
+            
+            tasks = []
+            for task_id, task_status, result, task_goal, parameters, created_at, updated_at in rows:
+                task = {
+                    "id": task_id,
+                    "status": task_status,
+                    "result": result,
+                    "goal": task_goal,
+                    "created_at": created_at,
+                    "updated_at": updated_at
+                }
+                if include_logs:
+                    try:
+                        task["parameters"] = json.loads(parameters) if parameters else {}
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Error parsing parameters for task {task_id}: {str(e)}")
+                        task["parameters"] = {}
+                    task["logs"] = logs_by_task.get(task_id, [])
+                tasks.append(task)
+            return tasks
+        except Exception as e:
+            logger.error(f"Error listing tasks: {str(e)}")
+            traceback.print_exc()
+            return []
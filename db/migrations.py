@@ -0,0 +1,206 @@
+"""
+Versioned schema migrations for the tasks database.
+
+The schema version lives in SQLite's ``PRAGMA user_version``. Opening a
+database applies only the migrations it has not seen yet, inside one write
+transaction, so starting against an up-to-date file costs a single PRAGMA
+read. Append new migrations to ``MIGRATIONS``; never edit or reorder the ones
+already released. The first migrations are written to also upgrade files
+created before the schema was versioned (version 0 with some tables and
+columns already in place).
+"""
+import json
+import logging
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger("qa_agent_db")
+
+
+def _create_tasks(cursor: sqlite3.Cursor) -> None:
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        result TEXT,
+        logs TEXT DEFAULT '[]',
+        parameters TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Columns added over time; unversioned databases may have any subset of them
+    # (SQLite rejects non-constant defaults in ALTER TABLE)
+    columns_to_add = {
+        "updated_at": "TIMESTAMP",
+        "parameters": "TEXT",
+        "result": "TEXT",
+        "logs": "TEXT DEFAULT '[]'",
+        "priority": "INTEGER DEFAULT 0",
+        "goal": "TEXT",
+        "batch_id": "TEXT",
+        "dedupe_key": "TEXT"
+    }
+    cursor.execute("PRAGMA table_info(tasks)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for column, type_def in columns_to_add.items():
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE tasks ADD COLUMN {column} {type_def}')
+            logger.info(f"Added column {column} to tasks table")
+
+
+def _create_task_logs(cursor: sqlite3.Cursor) -> None:
+    # Append-only log storage, one row per entry
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS task_logs (
+        task_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        ts TEXT NOT NULL,
+        message TEXT NOT NULL,
+        PRIMARY KEY (task_id, seq)
+    ) WITHOUT ROWID
+    ''')
+    _migrate_legacy_logs(cursor)
+
+
+def _migrate_legacy_logs(cursor: sqlite3.Cursor) -> None:
+    """Move JSON log blobs and rows of the old logs table into task_logs."""
+    cursor.execute(
+        "SELECT id, logs FROM tasks WHERE logs IS NOT NULL AND logs NOT IN ('', '[]')"
+    )
+    blobs = cursor.fetchall()
+    for task_id, logs in blobs:
+        try:
+            entries = json.loads(logs)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing logs for task {task_id}, dropping them: {str(e)}")
+            entries = []
+        _append_legacy_entries(
+            cursor, task_id,
+            [(entry.get("timestamp", ""), entry.get("message", "")) for entry in entries]
+        )
+        cursor.execute("UPDATE tasks SET logs = '[]' WHERE id = ?", (task_id,))
+    if blobs:
+        logger.info(f"Migrated JSON logs of {len(blobs)} tasks to task_logs")
+
+    # The old logs table was only written by the agent's direct fallback
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'logs'")
+    if cursor.fetchone():
+        cursor.execute('SELECT task_id, timestamp, message FROM logs ORDER BY rowid')
+        rows_by_task: Dict[str, List[tuple]] = {}
+        for task_id, timestamp, message in cursor.fetchall():
+            rows_by_task.setdefault(task_id, []).append((timestamp or "", message or ""))
+        for task_id, rows in rows_by_task.items():
+            _append_legacy_entries(cursor, task_id, rows)
+        cursor.execute('DROP TABLE logs')
+        logger.info(f"Migrated legacy logs table for {len(rows_by_task)} tasks to task_logs")
+
+
+def _append_legacy_entries(cursor: sqlite3.Cursor, task_id: str, entries: List[tuple]) -> None:
+    """Append (timestamp, message) pairs after the task's existing log entries."""
+    cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM task_logs WHERE task_id = ?', (task_id,))
+    last_seq = cursor.fetchone()[0]
+    cursor.executemany(
+        'INSERT INTO task_logs (task_id, seq, ts, message) VALUES (?, ?, ?, ?)',
+        [(task_id, last_seq + i, ts, message) for i, (ts, message) in enumerate(entries, start=1)]
+    )
+
+
+def _create_batches(cursor: sqlite3.Cursor) -> None:
+    # Tasks submitted together through POST /tasks/batch
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS batches (
+        id TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        created_at TIMESTAMP NOT NULL
+    )
+    ''')
+
+
+def _create_task_archives(cursor: sqlite3.Cursor) -> None:
+    # Where the logs of finished tasks moved by retention live; segment is NULL if there were none
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS task_archives (
+        task_id TEXT PRIMARY KEY,
+        segment TEXT,
+        offset INTEGER,
+        length INTEGER,
+        entries INTEGER NOT NULL,
+        last_seq INTEGER NOT NULL,
+        archived_at TIMESTAMP NOT NULL
+    ) WITHOUT ROWID
+    ''')
+
+
+def _create_task_indexes(cursor: sqlite3.Cursor) -> None:
+    # Lets the scheduler find the next queued task without a table scan
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status_priority ON tasks (status, priority)')
+
+    # Keyset pagination of the task list, optionally filtered by status or goal
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks (created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status_created_at ON tasks (status, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_goal_created_at ON tasks (goal COLLATE NOCASE, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_batch_id ON tasks (batch_id) WHERE batch_id IS NOT NULL')
+    # Finds identical in-flight or recently finished tasks
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_dedupe ON tasks (dedupe_key, status) WHERE dedupe_key IS NOT NULL')
+    # Rows written before the goal column existed
+    cursor.execute(
+        "UPDATE tasks SET goal = json_extract(parameters, '$.goal') "
+        "WHERE goal IS NULL AND json_valid(parameters) AND json_extract(parameters, '$.goal') IS NOT NULL"
+    )
+
+
+def _add_task_leases(cursor: sqlite3.Cursor) -> None:
+    # A running task is held by one worker until lease_expires_at; attempts counts claims
+    cursor.execute('ALTER TABLE tasks ADD COLUMN lease_owner TEXT')
+    cursor.execute('ALTER TABLE tasks ADD COLUMN lease_expires_at TIMESTAMP')
+    cursor.execute('ALTER TABLE tasks ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+    # Finds expired leases without scanning finished tasks
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks (lease_expires_at) WHERE lease_owner IS NOT NULL')
+
+
+def _add_task_versions(cursor: sqlite3.Cursor) -> None:
+    # Bumped by every status change, for updates conditional on the version a caller read
+    cursor.execute('ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+
+# Migration N brings the schema from user_version N-1 to N
+MIGRATIONS: List[Tuple[str, Callable[[sqlite3.Cursor], None]]] = [
+    ("create tasks", _create_tasks),
+    ("create task_logs", _create_task_logs),
+    ("create batches", _create_batches),
+    ("create task_archives", _create_task_archives),
+    ("create task indexes", _create_task_indexes),
+    ("add task leases", _add_task_leases),
+    ("add task versions", _add_task_versions),
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply the migrations ``conn``'s database has not seen and return how many ran.
+
+    Runs in a transaction of its own and takes the write lock before reading
+    the version again, so processes starting together migrate only once.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return 0
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = schema_version(conn)
+        cursor = conn.cursor()
+        for number, (name, step) in enumerate(MIGRATIONS[version:], start=version + 1):
+            step(cursor)
+            logger.info(f"Applied schema migration {number}: {name}")
+        # PRAGMA takes no parameters; SCHEMA_VERSION is an int
+        cursor.execute(f"PRAGMA user_version = {max(version, SCHEMA_VERSION)}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return max(0, SCHEMA_VERSION - version)
@@ -0,0 +1,122 @@
+"""
+Shared SQLite connection pool for QA Agent tasks.
+"""
+import os
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger("qa_agent_db")
+
+BUSY_TIMEOUT_MS = int(os.environ.get("QA_DB_BUSY_TIMEOUT_MS", "5000"))
+CACHED_STATEMENTS = 256
+
+_pools: Dict[str, "ConnectionPool"] = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Hands every thread its own persistent connection to one database file.
+
+    Connections are opened once per thread in WAL mode with synchronous=NORMAL
+    and a busy timeout, so readers never wait on the writer and short lock waits
+    are retried by SQLite instead of failing. Keeping connections open lets the
+    sqlite3 statement cache reuse prepared statements across calls.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=CACHED_STATEMENTS,
+            # Only the owning thread uses it; close_all() may run elsewhere
+            check_same_thread=False,
+        )
+        # Only takes effect before the file is first written, so it has to precede the switch to WAL;
+        # older databases are converted by retention with a one-off VACUUM. Setting it on an existing
+        # file waits for the write lock, which would stall every new reader behind a busy writer
+        if conn.execute('PRAGMA page_count').fetchone()[0] == 0:
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        with self._lock:
+            # Drop connections whose threads have exited
+            alive = []
+            for thread, old_conn in self._connections:
+                if thread.is_alive():
+                    alive.append((thread, old_conn))
+                else:
+                    old_conn.close()
+            alive.append((threading.current_thread(), conn))
+            self._connections = alive
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a transaction on the thread's connection.
+
+        Nested blocks join the outermost transaction, which commits on success
+        and rolls back if the block raises.
+        """
+        conn = self.connection()
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            if self._local.depth == 1 and conn.in_transaction:
+                conn.rollback()
+            raise
+        else:
+            if self._local.depth == 1 and conn.in_transaction:
+                conn.commit()
+        finally:
+            self._local.depth -= 1
+
+    def close_all(self) -> None:
+        """Close every connection opened by this pool."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing connection to {self.db_path}: {str(e)}")
+        self._local = threading.local()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Return the process-wide pool for a database file."""
+    key = os.path.realpath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools() -> None:
+    """Close the connections of every pool, e.g. on shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
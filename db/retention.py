@@ -0,0 +1,135 @@
+"""
+Background retention for the tasks database.
+
+Finished tasks past the age or count policy have their logs moved into
+compressed archive segments (see db/archive.py), leaving the task row as a
+slim summary; the space their log rows took is then handed back to the
+filesystem with incremental VACUUM, a few pages at a time so writers are
+never blocked for long.
+
+Databases created before incremental auto_vacuum need one full VACUUM to
+switch modes, which holds the write lock for the whole rewrite. That only
+happens when asked for, with QA_RETENTION_VACUUM_CONVERT=on or once by hand:
+
+    python -m db.retention --convert qa_tasks.db
+"""
+import argparse
+import logging
+import os
+import threading
+import traceback
+from typing import Dict, Optional
+
+from db.database import Database
+from metrics import counter
+
+logger = logging.getLogger("qa_agent_retention")
+
+RETENTION_ENABLED = os.environ.get("QA_RETENTION", "on").lower() not in ("off", "0", "false")
+# Archive the logs of tasks finished more than this many days ago (0 turns the age policy off)
+RETENTION_DAYS = float(os.environ.get("QA_RETENTION_DAYS", "7"))
+# Keep the logs of this many newest finished tasks in the database (0 turns the count policy off)
+RETENTION_KEEP_TASKS = int(os.environ.get("QA_RETENTION_KEEP_TASKS", "1000"))
+RETENTION_INTERVAL_SECONDS = float(os.environ.get("QA_RETENTION_INTERVAL_SECONDS", "3600"))
+# Tasks archived per write transaction, and free pages released per vacuum step
+ARCHIVE_BATCH = int(os.environ.get("QA_ARCHIVE_BATCH", "50"))
+VACUUM_PAGES = int(os.environ.get("QA_VACUUM_PAGES", "1000"))
+# Convert a non-incremental database with a full VACUUM on the first run; off, as it blocks every writer meanwhile
+VACUUM_CONVERT = os.environ.get("QA_RETENTION_VACUUM_CONVERT", "off").lower() in ("on", "1", "true")
+# Pause between batches so API writes get the lock in between
+BATCH_PAUSE_SECONDS = 0.05
+
+ARCHIVED_TASKS = counter("qa_archived_tasks_total", "Tasks whose logs were moved to archive segments")
+VACUUMED_PAGES = counter("qa_vacuumed_pages_total", "Free pages released by incremental vacuum")
+
+
+class RetentionWorker:
+    """Applies the retention policy every ``interval`` seconds on its own thread."""
+
+    def __init__(self, database: Database, max_age_days: Optional[float] = RETENTION_DAYS,
+                 keep_latest: Optional[int] = RETENTION_KEEP_TASKS, interval: float = RETENTION_INTERVAL_SECONDS,
+                 batch: int = ARCHIVE_BATCH, vacuum_pages: int = VACUUM_PAGES, convert: bool = VACUUM_CONVERT):
+        self.db = database
+        self.max_age_days = max_age_days
+        self.keep_latest = keep_latest
+        self.interval = interval
+        self.batch = max(1, batch)
+        self.vacuum_pages = max(1, vacuum_pages)
+        self.convert = convert
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._incremental = False
+        self._warned_not_incremental = False
+
+    def run_once(self) -> Dict[str, int]:
+        """Archive every task past the policy, then release the freed pages."""
+        archived = 0
+        while not self._stop.is_set():
+            count = self.db.archive_tasks(self.max_age_days, self.keep_latest, self.batch)
+            archived += count
+            if count < self.batch:
+                break
+            self._stop.wait(BATCH_PAUSE_SECONDS)
+        ARCHIVED_TASKS.inc(archived)
+
+        if not self._incremental:
+            self._incremental = self.db.is_incremental_vacuum() or (self.convert and self.db.enable_incremental_vacuum())
+            if not self._incremental and not self._warned_not_incremental:
+                self._warned_not_incremental = True
+                logger.warning(f"{self.db.db_path} is not in incremental auto_vacuum mode, so archived log space "
+                               f"is reused but not returned to the filesystem; convert it with "
+                               f"`python -m db.retention --convert {self.db.db_path}`")
+        vacuumed = 0
+        while self._incremental and not self._stop.is_set():
+            pages = self.db.incremental_vacuum(self.vacuum_pages)
+            vacuumed += pages
+            if pages < self.vacuum_pages:
+                break
+            self._stop.wait(BATCH_PAUSE_SECONDS)
+        VACUUMED_PAGES.inc(vacuumed)
+
+        if archived or vacuumed:
+            logger.info(f"Retention archived {archived} tasks and released {vacuumed} pages")
+        return {"archived": archived, "vacuumed_pages": vacuumed}
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error applying retention: {str(e)}")
+                traceback.print_exc()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="qa-retention", daemon=True)
+        self._thread.start()
+        logger.info(f"Retention started: archive after {self.max_age_days} days or beyond "
+                    f"the newest {self.keep_latest} finished tasks, every {self.interval:g} s")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="One-off maintenance of the tasks database.")
+    parser.add_argument("db_path", nargs="?", default="qa_tasks.db")
+    parser.add_argument("--convert", action="store_true",
+                        help="switch to incremental auto_vacuum with a full VACUUM (blocks writers while it runs)")
+    args = parser.parse_args()
+    if not args.convert:
+        parser.error("nothing to do; pass --convert")
+    logging.basicConfig(level=logging.INFO)
+    if not Database(args.db_path).enable_incremental_vacuum():
+        raise SystemExit(f"Could not convert {args.db_path}")
+    print(f"{args.db_path} now uses incremental auto_vacuum")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+The task state machine.
+
+A task moves through these statuses:
+
+    pending -> queued -> running -> completed | failed | cancelled
+
+Tasks can also fail or be cancelled before they run, and a running task goes
+back to queued when its lease expires. The last three statuses are final.
+
+Every status change is one conditional statement whose ``WHERE status IN
+(...)`` clause lists the statuses the change may start from, so a change
+that is not allowed, such as a late write arriving after a task finished,
+matches no row instead of overwriting the final status. Each change also
+bumps the task's ``version``, which callers can pass back to apply a change
+only if nothing else touched the task since they read it.
+"""
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+TERMINAL_STATUSES = frozenset({"completed", "failed", "cancelled"})
+
+# status -> statuses a task may move to from it
+TRANSITIONS: Dict[str, FrozenSet[str]] = {
+    # Created by a run started outside the queue (the agent's own entry point)
+    "pending": frozenset({"queued", "running", "failed", "cancelled"}),
+    "queued": frozenset({"running", "failed", "cancelled"}),
+    # Back to queued when a lease expires or the process running it restarts
+    "running": frozenset({"completed", "failed", "cancelled", "queued"}),
+    "completed": frozenset(),
+    "failed": frozenset(),
+    "cancelled": frozenset(),
+}
+
+
+def can_transition(from_status: str, to_status: str) -> bool:
+    return to_status in TRANSITIONS.get(from_status, frozenset())
+
+
+def sources(status: str, among: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """Statuses a task may move to ``status`` from, optionally only those in ``among``."""
+    if status not in TRANSITIONS:
+        raise ValueError(f"Unknown task status '{status}'")
+    allowed = (s for s, targets in TRANSITIONS.items() if status in targets)
+    return tuple(sorted(s for s in allowed if among is None or s in among))
+
+
+def status_in(status: str, among: Optional[Iterable[str]] = None) -> Tuple[str, Tuple[str, ...]]:
+    """A ``status IN (...)`` condition and its parameters for a move to ``status``."""
+    allowed = sources(status, among)
+    return f"status IN ({', '.join('?' for _ in allowed)})", allowed
+
+
+def task_outcome(goal: str, return_code: int, cancelled: bool = False,
+                 detail: Optional[str] = None) -> Tuple[str, str]:
+    """Terminal ``(status, result)`` of a run; ``detail`` is what the run reported, e.g. how it counted."""
+    suffix = f" ({detail})" if detail else ""
+    if cancelled:
+        return "cancelled", f"{goal.capitalize()} test cancelled"
+    if return_code == 0:
+        return "completed", f"{goal.capitalize()} test completed successfully{suffix}"
+    return "failed", f"{goal.capitalize()} test failed with return code {return_code}{suffix}"
@@ -0,0 +1,152 @@
+"""
+Shared task stores for workers running on any number of hosts.
+
+A worker only needs the operations of ``TaskStore``: claim a queued task
+under a lease, renew the lease while it runs, record the outcome, reclaim
+leases whose worker went away, and write the task's logs. Stores are chosen
+by URL (QA_TASK_STORE):
+
+    sqlite:///path/to/qa_tasks.db   the tasks database itself, for workers on one host
+    manager://host:port             a store served over TCP by ``serve_store``
+
+``manager://`` serves a SQLite store from one process through
+``multiprocessing.managers``; it stands in for a networked database in
+multi-node set-ups and tests without adding a server dependency. Workers
+hold no state the store does not have, so another backend only needs to
+implement ``TaskStore``.
+
+The manager protocol unpickles what it receives, so anyone who can reach a
+``manager://`` port with the key can run code on the serving host. There is
+no default key: both ends need QA_STORE_AUTHKEY set to a shared secret, and
+the port should only be reachable on a trusted network (bind 127.0.0.1 or a
+private interface, never a public one).
+"""
+import logging
+import os
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.database import Database
+
+logger = logging.getLogger("qa_agent_task_store")
+
+DEFAULT_STORE_URL = os.environ.get("QA_TASK_STORE", "sqlite:///qa_tasks.db")
+# Shared secret of manager:// stores; unset means they cannot be served or used
+STORE_AUTHKEY = os.environ.get("QA_STORE_AUTHKEY", "").encode() or None
+# A worker that misses heartbeats for this long loses its tasks to others
+LEASE_SECONDS = float(os.environ.get("QA_LEASE_SECONDS", "30"))
+# Claims of a task before a lost lease fails it instead of requeueing it
+MAX_ATTEMPTS = int(os.environ.get("QA_MAX_ATTEMPTS", "3"))
+
+
+def new_owner_id() -> str:
+    """A lease owner id unique to this process: host, pid and a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class TaskStore(ABC):
+    """Operations a worker performs on the shared task queue."""
+
+    @abstractmethod
+    def claim(self, owner: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Lease the next queued task to ``owner``; returns ``{"id", "parameters", "version"}`` or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def renew(self, task_id: str, owner: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Extend a lease; False once it is lost (reclaimed or cancelled)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def finish(self, task_id: str, owner: str, status: str, result: Optional[str] = None,
+               expected_version: Optional[int] = None) -> bool:
+        """Record a terminal status if ``owner`` still holds the lease and the task is at ``expected_version``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def reclaim_expired(self, max_attempts: int = MAX_ATTEMPTS) -> int:
+        """Requeue (or fail) tasks whose lease has expired; returns how many."""
+        raise NotImplementedError
+
+    # What the agent uses while it runs a task
+    @abstractmethod
+    def start_task(self, task_id: str, parameters: Optional[dict] = None) -> bool:
+        """Mark a task running unless it already is; False if it has finished."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def log_steps(self, task_id: str, messages: List[str]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class SQLiteTaskStore(TaskStore):
+    """Leases tasks straight from the SQLite tasks database."""
+
+    def __init__(self, database: Database):
+        self.db = database
+
+    def claim(self, owner: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        return self.db.claim_next_task(owner, lease_seconds)
+
+    def renew(self, task_id: str, owner: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        return self.db.renew_lease(task_id, owner, lease_seconds)
+
+    def finish(self, task_id: str, owner: str, status: str, result: Optional[str] = None,
+               expected_version: Optional[int] = None) -> bool:
+        return self.db.finish_leased_task(task_id, owner, status, result, expected_version)
+
+    def reclaim_expired(self, max_attempts: int = MAX_ATTEMPTS) -> int:
+        return self.db.reclaim_expired_leases(max_attempts)
+
+    def start_task(self, task_id: str, parameters: Optional[dict] = None) -> bool:
+        return self.db.start_task(task_id, parameters)
+
+    def log_steps(self, task_id: str, messages: List[str]) -> List[Dict[str, Any]]:
+        return self.db.log_steps(task_id, messages)
+
+
+def _parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _require_authkey(authkey: Optional[bytes]) -> bytes:
+    if not authkey:
+        raise ValueError("manager:// task stores need a shared secret in QA_STORE_AUTHKEY")
+    return authkey
+
+
+def store_server(store: TaskStore, address: str, authkey: Optional[bytes] = STORE_AUTHKEY) -> Any:
+    """A ``multiprocessing.managers`` server exposing ``store``; call ``serve_forever()`` on it.
+
+    Refuses to start without ``authkey``. Only bind ``address`` to a trusted network.
+    """
+    authkey = _require_authkey(authkey)
+    class StoreServer(BaseManager):
+        pass
+
+    StoreServer.register("store", callable=lambda: store)
+    return StoreServer(address=_parse_address(address), authkey=authkey).get_server()
+
+
+class _StoreClient(BaseManager):
+    pass
+
+
+_StoreClient.register("store")
+
+
+def connect_store(url: str = DEFAULT_STORE_URL, authkey: Optional[bytes] = STORE_AUTHKEY) -> TaskStore:
+    """Open the store a ``sqlite://`` or ``manager://`` URL points to."""
+    if url.startswith("sqlite:///"):
+        return SQLiteTaskStore(Database(url[len("sqlite:///"):]))
+    if url.startswith("manager://"):
+        client = _StoreClient(address=_parse_address(url[len("manager://"):]), authkey=_require_authkey(authkey))
+        client.connect()
+        logger.info(f"Connected to task store at {url}")
+        # The proxy forwards each call over its own connection per thread
+        return client.store()
+    raise ValueError(f"Unsupported task store URL '{url}', expected sqlite:///<path> or manager://<host>:<port>")
@@ -0,0 +1,290 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms are kept in memory and rendered on demand by
+the API's /metrics endpoint. Recording a value is a dict lookup plus a short
+lock, so it is cheap enough for per-query and per-request use. Metrics only
+cover the process they are recorded in: scenarios run by ``process_pool``
+workers or subprocess scripts report their steps to their own process.
+
+It sits outside the ``agent`` and ``db`` packages so both can record metrics
+without ``db`` depending on the agent.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds, from a fast SQLite query up to a long browser run
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, Any] = {}
+        self._lookup: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any, **kwargs: Any) -> Any:
+        """Return the child for one combination of label values."""
+        if kwargs:
+            values = tuple(map(kwargs.__getitem__, self.labelnames))
+        # Keyed by the raw values too, so the hot path skips the str() conversions
+        child = self._lookup.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                self._lookup[values] = child
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, child in list(self._children.items()):
+            yield "", _format_labels(self.labelnames, key), child.value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, or is read from ``set_function`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], Any]] = None
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], Any]) -> None:
+        """Read the gauge from ``function`` on every scrape.
+
+        ``function`` returns a number, or for a labelled gauge a dict mapping
+        label value tuples (or a single label value) to numbers.
+        """
+        self._function = function
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        if self._function is None:
+            yield from super()._samples()
+            return
+        result = self._function()
+        if not isinstance(result, dict):
+            yield "", "", float(result or 0)
+            return
+        for key, value in result.items():
+            key = key if isinstance(key, tuple) else (key,)
+            yield "", _format_labels(self.labelnames, [str(v) for v in key]), float(value or 0)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    """Counts observations into cumulative ``le`` buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"'), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class Registry:
+    """Named metrics, rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs: Any):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered differently")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # A failing gauge function must not take the whole scrape down
+                lines.append(f"# {metric.name} unavailable: {_escape(str(e))}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+# Shared metrics recorded across modules
+HTTP_REQUEST_SECONDS = histogram("qa_http_request_duration_seconds", "HTTP handler latency",
+                                 ("method", "route", "status"))
+DB_QUERY_SECONDS = histogram("qa_db_query_duration_seconds", "Latency of Database methods", ("method",))
+BROWSER_LAUNCH_SECONDS = histogram("qa_browser_launch_duration_seconds", "Time to launch a pooled browser",
+                                   ("profile", "headless"))
+ACTIVE_BROWSERS = gauge("qa_active_browsers", "Pooled browsers currently running", ("profile", "headless"))
+SCENARIO_STEP_SECONDS = histogram("qa_scenario_step_duration_seconds", "Time spent in each scenario step",
+                                  ("step",))
+SUBPROCESS_SECONDS = histogram("qa_subprocess_duration_seconds", "Wall-clock time of subprocess-mode scripts",
+                               ("outcome",))
+
+
+def timed(metric: Histogram, **labels: Any) -> Callable:
+    """Decorate a function so every call is observed in ``metric``."""
+    def decorator(func: Callable) -> Callable:
+        child = metric.labels(**labels)
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def instrument_methods(metric: Histogram, label: str = "method") -> Callable:
+    """Class decorator timing every public method, labelled with its name."""
+    def decorator(cls):
+        for name, member in list(vars(cls).items()):
+            if callable(member) and not name.startswith("_"):
+                setattr(cls, name, timed(metric, **{label: name})(member))
+        return cls
+    return decorator
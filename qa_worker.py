@@ -0,0 +1,15 @@
+"""
+Entry point of a standalone task worker; see agent/worker.py.
+
+    python qa_worker.py --store sqlite:///qa_tasks.db --concurrency 2
+    QA_STORE_AUTHKEY=<secret> python qa_worker.py --store sqlite:///qa_tasks.db --serve-store 10.0.0.5:50000
+    QA_STORE_AUTHKEY=<secret> python qa_worker.py --store manager://10.0.0.5:50000
+
+--serve-store shares the database with workers on other hosts. Anyone who can
+reach its port with the key can run code on this host, so bind it to a private
+interface of a trusted network, never 0.0.0.0 on a public one.
+"""
+from agent.worker import main
+
+if __name__ == "__main__":
+    main()
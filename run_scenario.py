@@ -0,0 +1,43 @@
+# run_scenario.py
+"""
+Run one scenario in a fresh browser and exit with its return code.
+
+The goal comes from the command line or TEST_GOAL, the app URL from TEST_URL,
+headless mode from TEST_HEADLESS and the execution profile from QA_PROFILE.
+"""
+import os
+import sys
+import traceback
+from playwright.sync_api import sync_playwright
+from agent.profiles import get_profile
+from agent.scenarios import get_scenario
+
+def log(message: str):
+    # Flushed per line so the agent can stream it from the pipe
+    print(message, flush=True)
+
+def main(goal: str = None):
+    goal = goal or os.environ.get("TEST_GOAL", "add customer")
+    url = os.environ.get("TEST_URL", "https://qacrmdemo.netlify.app")
+    headless = os.environ.get("TEST_HEADLESS", "false").lower() in ("1", "true", "yes")
+
+    try:
+        scenario = get_scenario(goal)
+        profile = get_profile()
+        with sync_playwright() as pw:
+            log(f"[Playwright initialized, profile '{profile.name}']")
+            browser = profile.launch(pw, headless)
+            context = profile.new_context(browser)
+            result = scenario(context, url, log)
+
+            browser.close()
+            log("[Browser closed]")
+            return result
+
+    except Exception as e:
+        log(f"[Test error] {str(e)}")
+        traceback.print_exc()
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main(" ".join(sys.argv[1:]) or None))
@@ -0,0 +1,259 @@
+import json
+import sys
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    """The API on a database in a temporary directory, with no scheduler or retention running."""
+    tmp_path = tmp_path_factory.mktemp("api")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("QA_API_RUN_TASKS", "off")
+        monkeypatch.setenv("QA_RETENTION", "off")
+        monkeypatch.setenv("QA_LOG_FILE", str(tmp_path / "api.log"))
+        monkeypatch.setenv("QA_ARCHIVE_DIR", str(tmp_path / "archive"))
+        # main opens qa_tasks.db in the working directory when imported
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delitem(sys.modules, "api.main", raising=False)
+        from api import main
+        with TestClient(main.app) as client:
+            yield main, client
+
+
+def submit(client, goal="add customer"):
+    response = client.post("/tasks", json={"goal": goal}, params={"force": "true"})
+    assert response.status_code == 200
+    return response.json()["task_id"]
+
+
+def test_get_task_answers_304_until_the_task_changes(api):
+    """If-None-Match with the current ETag is answered 304; a new log line or status changes the tag."""
+    main, client = api
+    task_id = submit(client)
+
+    first = client.get(f"/tasks/{task_id}")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.json()["status"] == "queued"
+    assert etag.startswith('W/"')
+
+    unchanged = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+    assert unchanged.content == b""
+    # A strong form of the same tag and lists of tags match too
+    assert client.get(f"/tasks/{task_id}", headers={"If-None-Match": f'"other", {etag[2:]}'}).status_code == 304
+
+    main.db.log_step(task_id, "Opened the CRM")
+    logged = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert logged.status_code == 200
+    assert logged.headers["ETag"] != etag
+    assert [entry["message"] for entry in logged.json()["logs"]] == ["Opened the CRM"]
+
+    etag = logged.headers["ETag"]
+    assert main.db.transition(task_id, "failed", "Add customer test failed") is not None
+    finished = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert finished.status_code == 200
+    assert finished.json()["status"] == "failed"
+
+
+def test_get_task_log_range(api):
+    """since_seq and tail select log entries, are part of the ETag, and are validated."""
+    main, client = api
+    task_id = submit(client)
+    main.db.log_steps(task_id, [f"step {i}" for i in range(1, 6)])
+
+    logs = client.get(f"/tasks/{task_id}").json()["logs"]
+    assert [entry["seq"] for entry in logs] == [1, 2, 3, 4, 5]
+
+    since = client.get(f"/tasks/{task_id}", params={"since_seq": 3})
+    assert [entry["message"] for entry in since.json()["logs"]] == ["step 4", "step 5"]
+    tail = client.get(f"/tasks/{task_id}", params={"tail": 2})
+    assert [entry["message"] for entry in tail.json()["logs"]] == ["step 4", "step 5"]
+    # Same body, different query: a tag cached for one range is not reused for another
+    assert since.headers["ETag"] != tail.headers["ETag"]
+    assert client.get(f"/tasks/{task_id}", params={"tail": 2},
+                      headers={"If-None-Match": since.headers["ETag"]}).status_code == 200
+
+    for params in ({"since_seq": -1}, {"tail": -1}, {"since_seq": "x"}):
+        assert client.get(f"/tasks/{task_id}", params=params).status_code == 422
+    assert client.get("/tasks/no-such-task").status_code == 404
+
+
+def read_events(response):
+    """Parse a text/event-stream body into (id, event, data) tuples, skipping comments."""
+    events = []
+    for block in response.text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if fields:
+            events.append((fields.get("id"), fields.get("event"), json.loads(fields["data"])))
+    return events
+
+
+def test_stream_resumes_after_last_event_id(api):
+    """A reconnect with Last-Event-ID gets only later entries, then an end event with the final status."""
+    main, client = api
+    task_id = submit(client)
+    main.db.log_steps(task_id, [f"step {i}" for i in range(1, 5)])
+    main.db.transition(task_id, "failed", "Add customer test failed")
+
+    events = read_events(client.get(f"/tasks/{task_id}/stream"))
+    assert [event_id for event_id, _, _ in events] == ["1", "2", "3", "4", None]
+
+    resumed = read_events(client.get(f"/tasks/{task_id}/stream", params={"offset": 0},
+                                     headers={"Last-Event-ID": "2"}))
+    assert [(event_id, event, data["message"]) for event_id, event, data in resumed[:-1]] == [
+        ("3", "log", "step 3"), ("4", "log", "step 4")
+    ]
+    assert resumed[-1] == (None, "end", {"status": "failed", "result": "Add customer test failed"})
+
+    # Nothing after the last id, just the end; a malformed id falls back to offset
+    assert [event for _, event, _ in read_events(client.get(
+        f"/tasks/{task_id}/stream", headers={"Last-Event-ID": "4"}))] == ["end"]
+    assert [event_id for event_id, _, _ in read_events(client.get(
+        f"/tasks/{task_id}/stream", params={"offset": 3}, headers={"Last-Event-ID": "abc"}))] == ["4", None]
+    assert client.get("/tasks/no-such-task/stream").status_code == 404
+
+
+def test_stream_follows_a_running_task_until_it_ends(api, monkeypatch):
+    """Entries written while the stream is open are sent, and the stream closes once the task finishes."""
+    main, client = api
+    # Entries written straight to the database are picked up on the idle re-check
+    monkeypatch.setattr(main, "STREAM_HEARTBEAT_SECONDS", 0.05)
+    task_id = submit(client)
+    main.db.transition(task_id, "running")
+    main.db.log_step(task_id, "step 1")
+
+    def finish_later():
+        time.sleep(0.2)
+        main.db.log_step(task_id, "step 2")
+        main.db.transition(task_id, "completed", "Add customer test completed successfully")
+
+    writer = threading.Thread(target=finish_later)
+    writer.start()
+    events = read_events(client.get(f"/tasks/{task_id}/stream", headers={"Last-Event-ID": "0"}))
+    writer.join()
+
+    assert [(event, data.get("message")) for _, event, data in events] == [
+        ("log", "step 1"), ("log", "step 2"), ("end", None)
+    ]
+    assert events[-1][2]["status"] == "completed"
+
+
+def test_batch_status_aggregates_its_tasks(api):
+    """GET /batches/{id} counts its tasks by status and is done once every task has finished."""
+    main, client = api
+    created = client.post("/tasks/batch", json=[{"goal": "add customer"}, {"goal": "count customers"},
+                                                {"goal": "add customer", "priority": 5}])
+    assert created.status_code == 200
+    batch_id = created.json()["batch_id"]
+    first, second, third = [task["task_id"] for task in created.json()["tasks"]]
+
+    batch = client.get(f"/batches/{batch_id}").json()
+    assert (batch["total"], batch["queued"], batch["progress"], batch["done"]) == (3, 3, 0.0, False)
+    assert [task["goal"] for task in batch["tasks"]] == ["add customer", "count customers", "add customer"]
+    assert batch["finished_at"] is None
+
+    main.db.transition(first, "running")
+    main.db.transition(first, "completed", "Add customer test completed successfully")
+    main.db.transition(second, "running")
+    batch = client.get(f"/batches/{batch_id}").json()
+    assert (batch["queued"], batch["running"], batch["completed"]) == (1, 1, 1)
+    assert batch["progress"] == round(1 / 3, 4)
+    assert not batch["done"]
+
+    main.db.transition(second, "failed", "Count customers test failed with return code 1")
+    main.db.transition(third, "cancelled", "Cancelled before start")
+    batch = client.get(f"/batches/{batch_id}").json()
+    assert (batch["queued"], batch["running"]) == (0, 0)
+    assert (batch["completed"], batch["failed"], batch["cancelled"]) == (1, 1, 1)
+    assert (batch["progress"], batch["done"]) == (1.0, True)
+    assert batch["finished_at"] is not None
+    assert batch["duration_seconds"] >= 0
+
+    assert client.get("/batches/no-such-batch").status_code == 404
+
+
+def test_batch_size_is_validated(api, monkeypatch):
+    """Empty and oversized batches are refused before anything is queued."""
+    main, client = api
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 2)
+    assert client.post("/tasks/batch", json=[]).status_code == 422
+    assert client.post("/tasks/batch", json=[{"goal": "add customer"}] * 3).status_code == 422
+    assert client.post("/tasks/batch", json=[{"goal": "add customer"}] * 2).status_code == 200
+
+
+def test_delete_cancels_unfinished_tasks_only(api):
+    """DELETE cancels a queued or leased task with 200 and answers 409 once the task has finished."""
+    main, client = api
+    queued = submit(client)
+    cancelled = client.delete(f"/tasks/{queued}")
+    assert cancelled.status_code == 200
+    assert (cancelled.json()["status"], cancelled.json()["result"]) == ("cancelled", "Cancelled before start")
+
+    again = client.delete(f"/tasks/{queued}")
+    assert again.status_code == 409
+    assert again.json()["detail"] == "Task is already cancelled"
+
+    # Running under a qa_worker.py lease: marked cancelled here, the worker stops on its next heartbeat
+    leased = client.post("/tasks", json={"goal": "add customer", "priority": 100}, params={"force": "true"}).json()["task_id"]
+    assert main.db.claim_next_task("worker-1", 30)["id"] == leased
+    response = client.delete(f"/tasks/{leased}")
+    assert response.status_code == 200
+    assert (response.json()["status"], response.json()["result"]) == ("cancelled", "Cancelled while running")
+    assert not main.db.renew_lease(leased, "worker-1", 30)
+
+    finished = submit(client)
+    main.db.transition(finished, "running")
+    main.db.transition(finished, "completed", "Add customer test completed successfully")
+    conflict = client.delete(f"/tasks/{finished}")
+    assert conflict.status_code == 409
+    assert conflict.json()["detail"] == "Task is already completed"
+    assert client.get(f"/tasks/{finished}").json()["status"] == "completed"
+
+    assert client.delete("/tasks/no-such-task").status_code == 404
+
+
+def test_unknown_execution_mode_is_refused(api):
+    """A mistyped mode is a 422 instead of a run in the default browser pool."""
+    main, client = api
+    response = client.post("/tasks", json={"goal": "add customer", "execution_mode": "subproces"})
+    assert response.status_code == 422
+    assert "browser_pool, process_pool, subprocess" in response.text
+    assert client.post("/tasks/batch", json=[{"execution_mode": "threads"}]).status_code == 422
+
+    task_id = client.post("/tasks", json={"goal": "add customer", "execution_mode": "Subprocess"},
+                          params={"force": "true"}).json()["task_id"]
+    assert main.db.get_task(task_id)["parameters"]["execution_mode"] == "subprocess"
+
+
+def test_unknown_count_strategy_is_refused(api):
+    main, client = api
+    response = client.post("/tasks", json={"goal": "verify total customers", "count_strategy": "netwrok"})
+    assert response.status_code == 422
+    assert "auto, network, store, pagination" in response.text
+    assert client.post("/tasks/batch", json=[{"count_strategy": "guess"}]).status_code == 422
+
+    task_id = client.post("/tasks", json={"goal": "verify total customers", "count_strategy": "Store"},
+                          params={"force": "true"}).json()["task_id"]
+    assert main.db.get_task(task_id)["parameters"]["count_strategy"] == "store"
+    # The API's list stays in step with the strategies the agent knows
+    from agent.customer_count import COUNT_STRATEGIES
+    assert main.COUNT_STRATEGIES == COUNT_STRATEGIES
+
+
+def test_task_list_refuses_an_unknown_cursor(api):
+    """A stale or mistyped ``after`` is a 400, while a real cursor pages on."""
+    main, client = api
+    first, second = submit(client), submit(client)
+    page = client.get("/tasks", params={"limit": 1})
+    assert [task["task_id"] for task in page.json()] == [second]
+    assert client.get("/tasks", params={"limit": 1, "after": page.headers["X-Next-After"]}).json()[0]["task_id"] == first
+
+    response = client.get("/tasks", params={"after": "no-such-task"})
+    assert response.status_code == 400
+    assert "no-such-task" in response.json()["detail"]
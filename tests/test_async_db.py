@@ -0,0 +1,55 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+from db.async_db import AsyncDatabase
+from db.database import Database
+
+
+@pytest.fixture
+def adb(tmp_path):
+    adb = AsyncDatabase(Database(str(tmp_path / "qa_tasks.db")), readers=2)
+    yield adb
+    adb.close()
+
+
+def test_writes_apply_in_order_and_reads_see_them(adb):
+    async def scenario():
+        await asyncio.gather(*(adb.enqueue_task(f"t{n}", {"goal": "add customer"}, priority=n % 3)
+                               for n in range(20)))
+        await adb.log_steps("t0", ["one", "two"])
+        return await adb.get_queued_task_ids(), await adb.get_logs("t0")
+
+    queued, logs = asyncio.run(scenario())
+    assert len(queued) == 20
+    assert [entry["message"] for entry in logs] == ["one", "two"]
+
+
+def test_event_loop_keeps_running_while_the_write_lock_is_held(adb):
+    """A write waiting on another connection's lock neither blocks the loop nor reads."""
+    adb.db.enqueue_task("a", {})
+    blocker = sqlite3.connect(adb.db.db_path, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.5, blocker.commit)
+
+    async def scenario():
+        release.start()
+        started = time.perf_counter()
+        write = asyncio.create_task(adb.enqueue_task("b", {}))
+        ticks = 0
+        while not write.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+            if ticks == 5:
+                task = await adb.get_task_summary("a")
+                read_seconds = time.perf_counter() - started
+        return await write, task, read_seconds, ticks
+
+    written, task, read_seconds, ticks = asyncio.run(scenario())
+    blocker.close()
+    assert written is True
+    assert task["status"] == "queued"
+    assert read_seconds < 0.4
+    assert ticks > 20
@@ -0,0 +1,93 @@
+import asyncio
+import textwrap
+import time
+
+import pytest
+from agent import qa_agent_final
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    lines = []
+    monkeypatch.setattr(qa_agent_final, "log_steps", lambda task_id, messages: lines.extend(messages))
+    return lines
+
+
+def write_script(tmp_path, body):
+    script = tmp_path / "script.py"
+    script.write_text(textwrap.dedent(body))
+    return str(script)
+
+
+def test_reads_stdout_and_stderr_concurrently(tmp_path, logged):
+    """A script filling its stderr pipe before printing to stdout still finishes."""
+    script = write_script(tmp_path, """
+        import sys
+        for i in range(5000):
+            sys.stderr.write(f"warning {i} " + "x" * 40 + "\\n")
+        print("done", flush=True)
+    """)
+    return_code = asyncio.run(qa_agent_final._run_script("task-1", script, "http://crm.test", True))
+
+    assert return_code == 0
+    assert "done" in logged
+    assert logged.count("[stderr] warning 0 " + "x" * 40) == 1
+    assert sum(line.startswith("[stderr] ") for line in logged) == 5000
+    assert logged[-1] == "Process completed with return code: 0"
+
+
+def test_kills_script_after_timeout(tmp_path, logged):
+    """A script that outlives the timeout is killed and reported as timed out."""
+    script = write_script(tmp_path, """
+        import time
+        print("started", flush=True)
+        time.sleep(60)
+    """)
+    return_code = asyncio.run(qa_agent_final._run_script("task-2", script, "http://crm.test", True,
+                                                         timeout=0.5))
+
+    assert return_code == qa_agent_final.TIMEOUT_RETURN_CODE
+    assert "started" in logged
+    assert "[Timeout] Script killed after 0.5 seconds" in logged
+
+
+def test_subprocess_setup_writes_run_off_the_event_loop(monkeypatch):
+    """Set-up and failure reporting wait on the database without blocking the loop."""
+    class SlowDatabase:
+        def start_task(self, task_id, parameters):
+            time.sleep(0.3)
+            return False
+
+        def log_steps(self, task_id, messages):
+            time.sleep(0.05)
+            return []
+
+    monkeypatch.setattr(qa_agent_final, "db", SlowDatabase())
+
+    async def scenario():
+        ticks = 0
+        run = asyncio.create_task(qa_agent_final.run_test_async("task-3", execution_mode="subprocess"))
+        while not run.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        return await run, ticks
+
+    return_code, ticks = asyncio.run(scenario())
+    assert return_code == 1
+    assert ticks > 20
+
+
+def test_count_strategy_reaches_the_run_detail(tmp_path, monkeypatch):
+    """The strategy a script counted with is kept for the task's result, whichever mode logged it."""
+    class Database:
+        def log_steps(self, task_id, messages):
+            return []
+
+    monkeypatch.setattr(qa_agent_final, "db", Database())
+    script = write_script(tmp_path, """
+        print("[Count strategy] network: 42 customers in 120 ms", flush=True)
+    """)
+    asyncio.run(qa_agent_final._run_script("task-4", script, "http://crm.test", True))
+
+    assert qa_agent_final.run_detail("task-4") == "counted 42 customers via network in 120 ms"
+    assert qa_agent_final.run_detail("task-4") is None
@@ -0,0 +1,50 @@
+import json
+from urllib.request import Request, urlopen
+
+import pytest
+from benchmarks.crm_fixture import start_fixture
+
+
+@pytest.fixture
+def crm():
+    server, url = start_fixture(customers=25, page_size=10, total_skew=2)
+    yield url
+    server.shutdown()
+
+
+def get_json(url):
+    with urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def test_pages_and_added_customers(crm):
+    """Customers are paged, new ones land on the last page and the total can be skewed."""
+    last = get_json(f"{crm}/api/customers?page=3")
+    assert last["pages"] == 3 and len(last["customers"]) == 5
+    assert get_json(f"{crm}/api/customers?page=99")["page"] == 3
+
+    body = json.dumps({"name": "Test Customer 1", "email": "t@test.com", "company": "QA Co."}).encode()
+    with urlopen(Request(f"{crm}/api/customers", data=body, headers={"Content-Type": "application/json"})) as response:
+        assert response.status == 201
+
+    assert get_json(f"{crm}/api/customers?page=3")["customers"][-1]["name"] == "Test Customer 1"
+    assert get_json(f"{crm}/api/stats")["total"] == 28
+
+    with urlopen(f"{crm}/customers") as response:
+        page = response.read().decode()
+    assert "pagination" in page and "Add Customer" in page
+
+
+def test_page_weight_for_profile_benchmarks():
+    """With images the shell references them and a font, all served from /static/."""
+    server, url = start_fixture(customers=5, images=3, asset_kb=2)
+    try:
+        with urlopen(f"{url}/customers") as response:
+            page = response.read().decode()
+        assert page.count('<img src="/static/img-') == 3
+        assert "/static/font.woff2" in page
+        with urlopen(f"{url}/static/img-0.png") as response:
+            assert response.headers["Content-Type"] == "image/png"
+            assert len(response.read()) == 2048
+    finally:
+        server.shutdown()
@@ -0,0 +1,77 @@
+from agent.customer_count import count_customers, count_from_responses, current_page, extract_records, page_url
+from agent.waits import StepTimer
+
+
+class FakeResponse:
+    def __init__(self, url, payload, status=200):
+        self.url = url
+        self.payload = payload
+        self.status = status
+        self.ok = 200 <= status < 300
+
+    def json(self):
+        if isinstance(self.payload, Exception):
+            raise self.payload
+        return self.payload
+
+
+class FakeRequest:
+    def __init__(self, responses):
+        self.responses = responses
+
+    def get(self, url):
+        return self.responses[url]
+
+
+class FakePage:
+    """The parts of a Playwright page the network and store strategies use."""
+
+    def __init__(self, api_pages, stored_count=None):
+        self.request = FakeRequest(api_pages)
+        self.stored_count = stored_count
+
+    def evaluate(self, script):
+        return self.stored_count
+
+
+API = "http://crm.test/api/customers?page={}"
+ROWS = [{"name": "a"}, {"name": "b"}]
+
+
+def test_extract_records_from_common_payload_shapes():
+    """Record lists are found in bare arrays and under the usual envelope keys."""
+    rows = [{"name": "a"}, {"name": "b"}]
+    assert extract_records(rows) == (rows, None)
+    assert extract_records({"customers": rows, "page": 1, "pages": 4}) == (rows, 4)
+    assert extract_records({"data": [], "totalPages": 1}) == ([], 1)
+    assert extract_records({"status": "ok"}) == (None, None)
+    assert extract_records([1, 2, 3]) == (None, None)
+
+
+def test_page_url_rewrites_the_page_parameter():
+    url = "http://crm.test/api/customers?sort=name&page=1"
+    assert page_url(url, 3) == "http://crm.test/api/customers?sort=name&page=3"
+    assert page_url("http://crm.test/api/customers", 2) is None
+    assert current_page("http://crm.test/api/customers?p=5") == 5
+    assert current_page("http://crm.test/api/customers") == 1
+
+
+def test_network_count_fetches_the_other_api_pages():
+    first = FakeResponse(API.format(1), {"customers": ROWS, "pages": 3})
+    page = FakePage({API.format(2): FakeResponse(API.format(2), {"customers": ROWS}),
+                     API.format(3): FakeResponse(API.format(3), {"customers": ROWS[:1]})})
+    assert count_from_responses(page, [first], lambda message: None) == 5
+
+
+def test_auto_count_falls_back_when_an_api_page_fails():
+    """An error status, a body that isn't JSON or one without records gives up on the network count."""
+    first = FakeResponse(API.format(1), {"customers": ROWS, "pages": 3})
+    for broken in (FakeResponse(API.format(3), {"customers": ROWS}, status=500),
+                   FakeResponse(API.format(3), ValueError("not JSON")),
+                   FakeResponse(API.format(3), {"status": "ok"})):
+        page = FakePage({API.format(2): FakeResponse(API.format(2), {"customers": ROWS}), API.format(3): broken},
+                        stored_count=7)
+        logged = []
+        assert count_from_responses(page, [first], logged.append) is None
+        assert count_customers(None, page, API.format(1), logged.append, StepTimer(logged.append), [first]) == (7, "store")
+        assert any(line.startswith("[Count strategy] network unavailable") for line in logged)
@@ -0,0 +1,290 @@
+import json
+import sqlite3
+
+import pytest
+from db.database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "qa_tasks.db"))
+
+
+def test_log_step_appends_in_order(db):
+    """Log entries are stored one row each and read back in order."""
+    db.create_task("task-1", {"goal": "add customer"})
+    for i in range(5):
+        db.log_step("task-1", f"step {i}")
+
+    task = db.get_task("task-1")
+    assert [entry["message"] for entry in task["logs"]] == [f"step {i}" for i in range(5)]
+
+    conn = sqlite3.connect(db.db_path)
+    seqs = [row[0] for row in conn.execute("SELECT seq FROM task_logs WHERE task_id = 'task-1' ORDER BY seq")]
+    blob = conn.execute("SELECT logs FROM tasks WHERE id = 'task-1'").fetchone()[0]
+    conn.close()
+    assert seqs == [1, 2, 3, 4, 5]
+    assert blob == "[]"
+
+
+def test_log_step_creates_missing_task(db):
+    """Logging to an unknown task creates it instead of dropping the entry."""
+    db.log_step("ghost", "hello")
+
+    task = db.get_task("ghost")
+    assert task["status"] == "pending"
+    assert [entry["message"] for entry in task["logs"]] == ["hello"]
+
+
+def test_get_all_tasks_rebuilds_logs(db):
+    """Every task in the listing gets its own log entries."""
+    db.create_task("a")
+    db.create_task("b")
+    db.log_step("a", "a1")
+    db.log_step("b", "b1")
+    db.log_step("a", "a2")
+
+    tasks = {task["id"]: task for task in db.get_all_tasks()}
+    assert [entry["message"] for entry in tasks["a"]["logs"]] == ["a1", "a2"]
+    assert [entry["message"] for entry in tasks["b"]["logs"]] == ["b1"]
+
+
+def test_json_blob_logs_are_migrated(tmp_path):
+    """Databases holding JSON log blobs are migrated once into task_logs."""
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE tasks (id TEXT PRIMARY KEY, status TEXT, result TEXT, logs TEXT, parameters TEXT, "
+        "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.execute("CREATE TABLE logs (task_id TEXT, timestamp TEXT, message TEXT)")
+    legacy_logs = [{"timestamp": "2025-01-01 00:00:00", "message": "first"},
+                   {"timestamp": "2025-01-01 00:00:01", "message": "second"}]
+    conn.execute("INSERT INTO tasks (id, status, logs) VALUES ('old', 'completed', ?)", (json.dumps(legacy_logs),))
+    conn.execute("INSERT INTO logs VALUES ('old', '2025-01-01 00:00:02', 'third')")
+    conn.commit()
+    conn.close()
+
+    db = Database(db_path)
+    Database(db_path)  # a second start must not duplicate anything
+
+    task = db.get_task("old")
+    assert [entry["message"] for entry in task["logs"]] == ["first", "second", "third"]
+    assert task["logs"][0]["timestamp"] == "2025-01-01 00:00:00"
+
+
+def test_schema_migrations_run_once(db, monkeypatch):
+    """The schema version is recorded, and an up-to-date database runs no migrations."""
+    from db import migrations
+
+    conn = db.pool.connection()
+    assert migrations.schema_version(conn) == migrations.SCHEMA_VERSION
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+    assert {"priority", "goal", "batch_id", "dedupe_key"} <= columns
+
+    ran = []
+    monkeypatch.setattr(migrations, "MIGRATIONS",
+                        [(name, lambda cursor, name=name: ran.append(name)) for name, _ in migrations.MIGRATIONS])
+    assert migrations.migrate(conn) == 0
+    db._init_db()
+    assert ran == []
+
+
+def test_log_steps_writes_batch_after_existing_entries(db):
+    """A batch continues the task's sequence numbers."""
+    db.create_task("task-1")
+    db.log_step("task-1", "first")
+    entries = db.log_steps("task-1", ["second", "third"])
+
+    assert [(entry["seq"], entry["message"]) for entry in entries] == [(2, "second"), (3, "third")]
+    assert [entry["message"] for entry in db.get_logs("task-1", since_seq=2)] == ["third"]
+    assert [entry["message"] for entry in db.get_task("task-1")["logs"]] == ["first", "second", "third"]
+
+
+def test_get_logs_since_and_tail(db):
+    """Incremental reads return only newer entries, or only the last few."""
+    db.create_task("task-1", {"goal": "add customer"})
+    db.log_steps("task-1", [f"step {i}" for i in range(1, 11)])
+
+    assert [entry["seq"] for entry in db.get_logs("task-1", since_seq=7)] == [8, 9, 10]
+    assert [entry["seq"] for entry in db.get_logs("task-1", tail=3)] == [8, 9, 10]
+    assert [entry["seq"] for entry in db.get_logs("task-1", since_seq=8, tail=5)] == [9, 10]
+    assert db.get_logs("task-1", tail=0) == []
+
+    summary = db.get_task_summary("task-1")
+    assert summary["last_seq"] == 10
+    db.log_step("task-1", "one more")
+    assert db.get_task_summary("task-1")["last_seq"] == 11
+
+
+def test_queue_claims_by_priority_then_age(db):
+    """Higher priority runs first; equal priorities run in submission order."""
+    db.enqueue_task("low", {"goal": "add customer"}, priority=0)
+    db.enqueue_task("high", {"goal": "add customer"}, priority=5)
+    db.enqueue_task("low-2", {"goal": "add customer"}, priority=0)
+
+    assert db.get_queued_task_ids() == ["high", "low", "low-2"]
+    assert db.get_queue_position("low-2") == 3
+
+    claimed = db.claim_next_task()
+    assert claimed == {"id": "high", "parameters": {"goal": "add customer"}, "version": 1}
+    assert db.get_task("high")["status"] == "running"
+    assert db.get_queue_position("high") is None
+    assert db.get_queue_position("low-2") == 2
+
+
+def test_cancel_and_requeue(db):
+    """Only queued tasks can be cancelled; interrupted runs go back on the queue."""
+    db.enqueue_task("a", {})
+    db.enqueue_task("b", {})
+    db.claim_next_task()
+
+    assert db.cancel_queued_task("a") is False
+    assert db.cancel_queued_task("b") is True
+    assert db.get_task("b")["status"] == "cancelled"
+
+    assert db.requeue_interrupted_tasks() == 1
+    assert db.claim_next_task()["id"] == "a"
+    assert db.claim_next_task() is None
+
+
+def test_status_changes_follow_the_state_machine(db):
+    """Only allowed transitions apply, each bumps the version, and finished tasks stay finished."""
+    db.enqueue_task("a", {"goal": "add customer"})
+    assert db.get_task("a")["version"] == 0
+    assert db.transition("a", "completed") is None
+    assert db.start_task("a", {"goal": "add customer"}) is True
+    # Already running, e.g. claimed by the scheduler: not written again
+    assert db.start_task("a") is True
+    assert db.get_task("a")["version"] == 1
+
+    assert db.transition("a", "completed", "ok", expected_version=0) is None
+    assert db.transition("a", "completed", "ok", expected_version=1) == 2
+
+    # Late writes of another outcome are dropped
+    db.update_task("a", "failed", "late failure")
+    assert db.transition("a", "running") is None
+    assert db.start_task("a") is False
+    task = db.get_task("a")
+    assert (task["status"], task["result"], task["version"]) == ("completed", "ok", 2)
+    assert db.transition("a", "bogus") is None
+
+
+def test_create_task_leaves_finished_tasks_alone(db):
+    """Creating an existing task does not reset it; only reset_task does."""
+    db.update_task("a", "completed", "ok")
+    db.create_task("a", {"goal": "add customer"})
+    task = db.get_task("a")
+    assert (task["status"], task["result"]) == ("completed", "ok")
+
+    db.reset_task("a", {"goal": "add customer"})
+    task = db.get_task("a")
+    assert (task["status"], task["result"]) == ("pending", "")
+
+
+def test_update_task_creates_missing_task_in_one_statement(db):
+    """update_task inserts a missing task with the given status instead of reading first."""
+    db.update_task("new", "running")
+    db.update_task("new", "failed", "boom")
+    task = db.get_task("new")
+    assert (task["status"], task["result"], task["version"]) == ("failed", "boom", 1)
+
+
+def test_batch_is_queued_together_and_tracked(db):
+    """A batch inserts all its tasks at once and reports counts by status."""
+    tasks = [(f"task-{n}", {"goal": "verify total customers"}, 0) for n in range(3)]
+    assert db.enqueue_tasks("batch-1", tasks)
+    assert db.get_queued_task_ids() == ["task-0", "task-1", "task-2"]
+
+    claimed = db.claim_next_task()
+    db.update_task(claimed["id"], "completed", "ok")
+    db.update_task("task-1", "failed", "boom")
+
+    batch = db.get_batch("batch-1")
+    assert batch["size"] == 3
+    assert batch["counts"] == {"completed": 1, "failed": 1, "queued": 1}
+    assert [task["id"] for task in batch["tasks"]] == ["task-0", "task-1", "task-2"]
+    assert db.get_batch("missing") is None
+
+    # Ids must be unique, so a clashing batch is rejected as a whole
+    assert not db.enqueue_tasks("batch-2", [("task-9", {}, 0), ("task-0", {}, 0)])
+    assert db.get_batch("batch-2") is None
+    assert db.get_task("task-9") is None
+
+
+def test_enqueue_or_reuse_coalesces_identical_tasks(db):
+    """Identical submissions attach to in-flight work or reuse a fresh result."""
+    params = {"goal": "verify total customers"}
+    assert db.enqueue_or_reuse("task-1", params, 0, "key") == ("task-1", "queued")
+    assert db.enqueue_or_reuse("task-2", params, 0, "key") == ("task-1", "in_flight")
+    assert db.enqueue_or_reuse("task-3", params, 0, "other") == ("task-3", "queued")
+
+    db.claim_next_task()
+    assert db.enqueue_or_reuse("task-4", params, 0, "key") == ("task-1", "in_flight")
+    db.update_task("task-1", "completed", "ok")
+
+    assert db.enqueue_or_reuse("task-5", params, 0, "key", cache_ttl=60) == ("task-1", "cached")
+    # Without a TTL (a goal that changes data) a finished task is not reused
+    assert db.enqueue_or_reuse("task-6", params, 0, "key") == ("task-6", "queued")
+    db.cancel_queued_task("task-6")
+
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("UPDATE tasks SET updated_at = '2000-01-01 00:00:00' WHERE id = 'task-1'")
+    conn.commit()
+    conn.close()
+    assert db.enqueue_or_reuse("task-7", params, 0, "key", cache_ttl=60) == ("task-7", "queued")
+
+
+def test_list_tasks_pages_with_filters(db):
+    """Pages follow the cursor, respect filters and skip logs in summary mode."""
+    for i in range(5):
+        db.enqueue_task(f"t{i}", {"goal": "verify total customers" if i % 2 else "add customer"})
+        db.log_step(f"t{i}", f"log {i}")
+
+    first = db.list_tasks(limit=2)
+    second = db.list_tasks(limit=2, after=first[-1]["id"])
+    assert [task["id"] for task in first + second] == ["t4", "t3", "t2", "t1"]
+    assert [(entry["seq"], entry["message"]) for entry in first[0]["logs"]] == [(1, "log 4")]
+
+    verify = db.list_tasks(goal="Verify Total Customers", include_logs=False)
+    assert [task["id"] for task in verify] == ["t3", "t1"]
+    assert "logs" not in verify[0]
+
+    db.claim_next_task()
+    assert [task["id"] for task in db.list_tasks(status="running")] == ["t0"]
+
+    # A cursor that matches no task is an error, not an empty last page
+    assert db.list_tasks(limit=2, after="gone") is None
+    assert db.list_tasks(limit=2, after="t0") == []
+
+
+def test_list_tasks_pages_are_read_from_indexes(db):
+    """Every page of the task list is read in order from an index, whatever the filter or cursor.
+
+    The query plan is checked rather than the time, which depends on the
+    machine; benchmarks/bench_db.py times these pages on a 100k-task table.
+    """
+    for i in range(20):
+        db.enqueue_task(f"t{i}", {"goal": "add customer" if i % 2 else "verify total customers"})
+    db.transition("t3", "failed")
+
+    statements = []
+    conn = db.pool.connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        pages = [
+            dict(limit=10),
+            dict(limit=10, after="t10"),
+            dict(limit=10, status="failed", after="t5"),
+            dict(limit=10, goal="add customer", include_logs=False),
+        ]
+        for page in pages:
+            statements.clear()
+            assert db.list_tasks(**page) is not None
+            query = next(sql for sql in statements if "ORDER BY created_at DESC" in sql)
+            plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+            assert "USING INDEX idx_tasks_" in plan or "USING COVERING INDEX idx_tasks_" in plan, (page, plan)
+            # A sort would read every matching row before returning the first page
+            assert "TEMP B-TREE" not in plan, (page, plan)
+    finally:
+        conn.set_trace_callback(None)
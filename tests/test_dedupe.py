@@ -0,0 +1,33 @@
+from agent import dedupe
+from agent.dedupe import DedupeStats, cache_ttl, dedupe_key
+
+
+def test_dedupe_key_ignores_case_trailing_slash_and_other_fields():
+    base = {"goal": "Verify Total Customers", "url": "https://crm.test/", "headless": True}
+    same = {"goal": "verify total customers", "url": "https://crm.test", "headless": True, "priority": 5}
+    assert dedupe_key(base) == dedupe_key(same)
+    assert dedupe_key(base) != dedupe_key({**base, "headless": False})
+
+
+def test_dedupe_key_separates_runs_with_different_options():
+    base = {"goal": "verify total customers", "url": "https://crm.test", "headless": True}
+    assert dedupe_key(base) == dedupe_key({**base, "count_strategy": None, "shards": None})
+    for option in ({"execution_mode": "subprocess"}, {"count_strategy": "pagination"}, {"shards": 4},
+                   {"profile": "lean"}):
+        assert dedupe_key(base) != dedupe_key({**base, **option})
+
+
+def test_only_read_only_goals_are_cached(monkeypatch):
+    monkeypatch.setattr(dedupe, "CACHE_TTL_SECONDS", 30.0)
+    assert cache_ttl({"goal": "verify total customers"}) == 30.0
+    assert cache_ttl({"goal": "add customer"}) is None
+
+    monkeypatch.setattr(dedupe, "CACHE_TTL_SECONDS", 0.0)
+    assert cache_ttl({"goal": "verify total customers"}) is None
+
+
+def test_stats_count_each_outcome():
+    stats = DedupeStats()
+    for outcome in ("queued", "queued", "in_flight", "cached", "forced"):
+        stats.record(outcome)
+    assert stats.snapshot() == {"in_flight_hits": 1, "cache_hits": 1, "misses": 2, "forced": 1}
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+from agent import log_bus as log_bus_module
+from agent.log_bus import LogBus
+
+
+@pytest.mark.asyncio
+async def test_publish_from_thread_reaches_every_subscriber():
+    """Entries published on a worker thread are delivered to each subscriber."""
+    bus = LogBus()
+    first = bus.subscribe("task-1")
+    second = bus.subscribe("task-1")
+    other = bus.subscribe("task-2")
+
+    entries = [{"seq": 1, "timestamp": "t", "message": "hello"}]
+    thread = threading.Thread(target=bus.publish, args=("task-1", entries))
+    thread.start()
+    thread.join()
+
+    assert await asyncio.wait_for(first.queue.get(), 1) == entries
+    assert await asyncio.wait_for(second.queue.get(), 1) == entries
+    assert other.queue.empty()
+
+    bus.finish("task-1")
+    assert await asyncio.wait_for(first.queue.get(), 1) is None
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_marked_lagged(monkeypatch):
+    """A full queue drops batches and flags the subscriber to reload from the database."""
+    monkeypatch.setattr(log_bus_module, "MAX_PENDING_BATCHES", 2)
+    bus = LogBus()
+    subscription = bus.subscribe("task-1")
+
+    for seq in range(1, 4):
+        bus.publish("task-1", [{"seq": seq, "timestamp": "t", "message": str(seq)}])
+    bus.finish("task-1")
+    await asyncio.sleep(0)
+
+    assert subscription.lagged is True
+    assert subscription.queue.get_nowait()[0]["seq"] == 2
+    assert subscription.queue.get_nowait() is None
+
+    bus.unsubscribe(subscription)
+    assert bus.subscriber_count("task-1") == 0
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from agent.log_sink import AsyncLogSink, BufferedLogSink
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, task_id, messages):
+        self.batches.append((task_id, list(messages)))
+
+
+def test_flushes_when_batch_is_full():
+    """A full batch is written at once, in one call."""
+    writer = RecordingWriter()
+    sink = BufferedLogSink("task-1", writer, max_lines=3, max_delay_ms=60000)
+    for i in range(7):
+        sink.write(f"line {i}")
+
+    assert writer.batches == [("task-1", ["line 0", "line 1", "line 2"]),
+                              ("task-1", ["line 3", "line 4", "line 5"])]
+    sink.close()
+    assert writer.batches[-1] == ("task-1", ["line 6"])
+
+
+def test_flushes_after_delay():
+    """A partial batch is written once its oldest line has waited max_delay_ms."""
+    writer = RecordingWriter()
+    sink = BufferedLogSink("task-1", writer, max_lines=100, max_delay_ms=50)
+    sink.write("only line")
+
+    deadline = time.monotonic() + 2
+    while not writer.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.batches == [("task-1", ["only line"])]
+    sink.close()
+
+
+def test_close_flushes_on_error_and_reports_stats():
+    """Lines are flushed when the producer fails, and stats reflect the batches."""
+    writer = RecordingWriter()
+    try:
+        with BufferedLogSink("task-1", writer, max_lines=2, max_delay_ms=60000) as sink:
+            sink.write("a")
+            sink.write("b")
+            sink.write("c")
+            raise RuntimeError("script crashed")
+    except RuntimeError:
+        pass
+
+    assert [messages for _, messages in writer.batches] == [["a", "b"], ["c"]]
+    stats = sink.stats()
+    assert stats["flushes"] == 2
+    assert stats["lines"] == 3
+    assert stats["max_batch_size"] == 2
+    assert stats["avg_batch_size"] == 1.5
+
+
+def test_failed_write_is_counted():
+    """A failing writer does not break the producer."""
+    def broken_writer(task_id, messages):
+        raise IOError("database is locked")
+
+    sink = BufferedLogSink("task-1", broken_writer, max_lines=1, max_delay_ms=60000)
+    sink.write("a")
+    sink.close()
+    assert sink.stats()["failed_flushes"] == 1
+
+
+def test_async_sink_batches_on_the_event_loop():
+    """The asyncio sink batches like the threaded one and flushes partial batches on close."""
+    writer = RecordingWriter()
+
+    async def run():
+        sink = AsyncLogSink("task-1", writer, max_lines=3, max_delay_ms=60000)
+        for i in range(7):
+            sink.write(f"line {i}")
+        await asyncio.sleep(0.05)
+        assert [batch for _, batch in writer.batches] == [["line 0", "line 1", "line 2"],
+                                                         ["line 3", "line 4", "line 5"]]
+        await sink.close()
+        return sink.stats()
+
+    stats = asyncio.run(run())
+    assert writer.batches[-1] == ("task-1", ["line 6"])
+    assert stats["flushes"] == 3 and stats["lines"] == 7
@@ -0,0 +1,46 @@
+import json
+import logging
+
+from agent.logging_config import JsonFormatter, SamplingFilter, TaskContextFilter, parse_sampling, task_context
+
+
+def make_record(name="qa_agent_api.access", level=logging.INFO, message="GET /tasks 200", **extra):
+    record = logging.LogRecord(name, level, __file__, 1, message, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_parse_sampling_skips_malformed_entries():
+    assert parse_sampling("qa_agent_api.access=10, qa_agent_db=3,bad,zero=0,one=1") == {
+        "qa_agent_api.access": 10, "qa_agent_db": 3}
+
+
+def test_sampling_keeps_one_in_n_below_warning():
+    """Sampled loggers (and their children) keep every Nth INFO record but every warning."""
+    sampling = SamplingFilter({"qa_agent_api.access": 5})
+    kept = [sampling.filter(make_record()) for _ in range(20)]
+    assert sum(kept) == 4
+    assert sum(sampling.filter(make_record("qa_agent_api.access.slow")) for _ in range(10)) == 2
+    assert all(sampling.filter(make_record(level=logging.WARNING)) for _ in range(10))
+    assert all(sampling.filter(make_record("qa_agent_db")) for _ in range(10))
+
+
+def test_json_records_carry_task_id_and_step():
+    """The task id comes from the surrounding task_context unless a record names its own."""
+    context = TaskContextFilter()
+    formatter = JsonFormatter()
+    with task_context("task-1"):
+        record = make_record("qa_agent_db", message="Task task-1 log: Test completed successfully", step=7)
+        context.filter(record)
+        explicit = make_record("qa_agent_db", task_id="task-2")
+        context.filter(explicit)
+    outside = make_record("qa_agent_db")
+    context.filter(outside)
+
+    entry = json.loads(formatter.format(record))
+    assert entry["task_id"] == "task-1"
+    assert entry["step"] == 7
+    assert entry["level"] == "INFO" and entry["logger"] == "qa_agent_db"
+    assert entry["message"] == "Task task-1 log: Test completed successfully"
+    assert json.loads(formatter.format(explicit))["task_id"] == "task-2"
+    assert json.loads(formatter.format(outside))["task_id"] is None
@@ -0,0 +1,56 @@
+from metrics import Registry, instrument_methods
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets are cumulative and end with +Inf, _sum and _count."""
+    registry = Registry()
+    latency = registry.histogram("qa_test_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5):
+        latency.labels(route="/tasks/{task_id}").observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE qa_test_seconds histogram" in lines
+    assert 'qa_test_seconds_bucket{route="/tasks/{task_id}",le="0.1"} 1' in lines
+    assert 'qa_test_seconds_bucket{route="/tasks/{task_id}",le="1"} 3' in lines
+    assert 'qa_test_seconds_bucket{route="/tasks/{task_id}",le="+Inf"} 4' in lines
+    assert 'qa_test_seconds_sum{route="/tasks/{task_id}"} 6.05' in lines
+    assert 'qa_test_seconds_count{route="/tasks/{task_id}"} 4' in lines
+
+
+def test_gauges_and_counters():
+    """Gauges can be set directly or read from a function at scrape time."""
+    registry = Registry()
+    registry.counter("qa_test_total", "Test counter").inc(3)
+    browsers = registry.gauge("qa_test_browsers", "Test gauge", ("headless",))
+    browsers.labels(headless=True).inc()
+    browsers.labels(headless=True).inc()
+    browsers.labels(headless=True).dec()
+    registry.gauge("qa_test_tasks", "Task gauge", ("status",)).set_function(lambda: {"queued": 4, "running": 1})
+    registry.gauge("qa_test_broken", "Failing gauge").set_function(lambda: 1 / 0)
+
+    text = registry.render()
+    assert "qa_test_total 3" in text
+    assert 'qa_test_browsers{headless="True"} 1' in text
+    assert 'qa_test_tasks{status="queued"} 4' in text
+    assert 'qa_test_tasks{status="running"} 1' in text
+    assert "# qa_test_broken unavailable" in text
+
+
+def test_instrument_methods_times_public_methods():
+    """Every public method is observed under its own label; private ones are left alone."""
+    registry = Registry()
+    queries = registry.histogram("qa_test_query_seconds", "Query latency", ("method",))
+
+    @instrument_methods(queries)
+    class Store:
+        def get(self, key):
+            return self._lookup(key)
+
+        def _lookup(self, key):
+            return key.upper()
+
+    assert Store().get("a") == "A"
+    assert Store.get.__name__ == "get"
+    text = registry.render()
+    assert 'qa_test_query_seconds_count{method="get"} 1' in text
+    assert "_lookup" not in text
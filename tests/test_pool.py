@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+from db.pool import ConnectionPool, get_pool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    with pool.transaction() as conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+    yield pool
+    pool.close_all()
+
+
+def test_connection_uses_wal(pool):
+    """Connections are opened in WAL mode with synchronous=NORMAL."""
+    conn = pool.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+
+def test_connection_is_reused_per_thread(pool):
+    """A thread keeps its connection; other threads get their own."""
+    assert pool.connection() is pool.connection()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not pool.connection()
+
+
+def test_nested_transaction_commits_once(pool):
+    """Inner blocks join the outer transaction and a failure rolls back both."""
+    with pytest.raises(RuntimeError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO items VALUES ('outer')")
+            with pool.transaction() as inner:
+                inner.execute("INSERT INTO items VALUES ('inner')")
+            raise RuntimeError("boom")
+    assert pool.connection().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO items VALUES ('outer')")
+        with pool.transaction() as inner:
+            inner.execute("INSERT INTO items VALUES ('inner')")
+    assert pool.connection().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
+
+
+def test_get_pool_is_shared_per_file(tmp_path):
+    """Equivalent paths to one file share a pool."""
+    path = tmp_path / "shared.db"
+    assert get_pool(str(path)) is get_pool(str(tmp_path / "." / "shared.db"))
@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+
+import pytest
+from agent.process_pool import ProcessWorkerPool, WorkerCrashed
+
+
+def echo_job(job, log):
+    goal, url, headless, options = job
+    log(f"pid {os.getpid()}")
+    log(f"{goal} at {url}")
+    if goal == "crash":
+        os._exit(3)
+    if goal == "hang":
+        time.sleep(60)
+    return 0 if goal == "pass" else 1
+
+
+@pytest.fixture
+def pool():
+    pool = ProcessWorkerPool(size=1, handler=echo_job)
+    yield pool
+    pool.close()
+
+
+def test_jobs_reuse_the_same_worker_process(pool):
+    """Log lines stream back and consecutive jobs run in one long-lived worker."""
+    first, second = [], []
+    assert pool.run(("pass", "http://crm.test", True, None), first.append) == 0
+    assert pool.run(("fail", "http://crm.test", True, None), second.append) == 1
+    assert first[1] == "pass at http://crm.test"
+    assert first[0] == second[0] != f"pid {os.getpid()}"
+
+
+def test_crash_and_cancel_replace_the_worker(pool):
+    lines = []
+    with pytest.raises(WorkerCrashed, match="code 3"):
+        pool.run(("crash", "http://crm.test", True, None), lines.append)
+
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    started = time.monotonic()
+    assert pool.run(("hang", "http://crm.test", True, None), lines.append, should_cancel=cancel.is_set) is None
+    assert time.monotonic() - started < 10
+
+    after = []
+    assert pool.run(("pass", "http://crm.test", True, None), after.append) == 0
+    assert after[0] not in lines
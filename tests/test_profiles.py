@@ -0,0 +1,83 @@
+import pytest
+from agent.profiles import PROFILES, get_profile, profile_option
+
+
+class FakeContext:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.routes = []
+
+    def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+
+class FakeBrowser:
+    def new_context(self, **kwargs):
+        return FakeContext(**kwargs)
+
+
+class FakeChromium:
+    def launch(self, **kwargs):
+        return kwargs
+
+
+class FakePlaywright:
+    chromium = FakeChromium()
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = type("Request", (), {"resource_type": resource_type, "url": url})()
+        self.outcome = None
+
+    def abort(self):
+        self.outcome = "aborted"
+
+    def continue_(self):
+        self.outcome = "continued"
+
+
+def test_desktop_follows_the_task_and_keeps_the_window():
+    """The default profile keeps the original launch and honours the task's headless flag."""
+    desktop = get_profile("desktop")
+    assert desktop.launch(FakePlaywright(), headless=True) == {"headless": True, "args": ["--start-maximized"]}
+    assert desktop.launch(FakePlaywright(), headless=False)["headless"] is False
+
+    context = desktop.new_context(FakeBrowser())
+    assert context.kwargs == {"no_viewport": True}
+    assert context.routes == []
+
+
+def test_lean_is_headless_with_a_viewport_and_blocks_heavy_requests():
+    lean = get_profile("LEAN")
+    assert lean.launch(FakePlaywright(), headless=False)["headless"] is True
+
+    context = lean.new_context(FakeBrowser())
+    assert context.kwargs == {"viewport": {"width": 1280, "height": 720}}
+    [(pattern, handle)] = context.routes
+    assert pattern == "**/*"
+
+    outcomes = {}
+    for resource_type, url in [("image", "http://crm.test/logo.png"), ("font", "http://crm.test/f.woff2"),
+                               ("script", "https://www.googletagmanager.com/gtm.js"),
+                               ("script", "http://crm.test/app.js"), ("fetch", "http://crm.test/api/customers"),
+                               ("stylesheet", "http://crm.test/app.css")]:
+        route = FakeRoute(resource_type, url)
+        handle(route)
+        outcomes[url] = route.outcome
+    assert outcomes == {
+        "http://crm.test/logo.png": "aborted",
+        "http://crm.test/f.woff2": "aborted",
+        "https://www.googletagmanager.com/gtm.js": "aborted",
+        "http://crm.test/app.js": "continued",
+        "http://crm.test/api/customers": "continued",
+        "http://crm.test/app.css": "continued",
+    }
+
+
+def test_profile_lookup():
+    assert profile_option({"profile": "Lean"}) == "lean"
+    assert profile_option(None) == "desktop"
+    assert set(PROFILES) >= {"desktop", "lean"}
+    with pytest.raises(ValueError):
+        get_profile("turbo")
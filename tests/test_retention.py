@@ -0,0 +1,100 @@
+import os
+import sqlite3
+
+import pytest
+from db.database import Database
+from db.retention import RetentionWorker
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("QA_ARCHIVE_DIR", str(tmp_path / "archive"))
+    return Database(str(tmp_path / "qa_tasks.db"))
+
+
+def finish(db, task_id, lines, updated_at="2020-01-01 00:00:00"):
+    db.create_task(task_id, {"goal": "add customer"})
+    db.log_steps(task_id, [f"{task_id} line {i}" for i in range(lines)])
+    with db.pool.transaction() as conn:
+        conn.execute("UPDATE tasks SET status = 'completed', updated_at = ? WHERE id = ?", (updated_at, task_id))
+
+
+def live_rows(db, task_id):
+    conn = sqlite3.connect(db.db_path)
+    count = conn.execute("SELECT COUNT(*) FROM task_logs WHERE task_id = ?", (task_id,)).fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_old_tasks_are_archived_and_still_readable(db):
+    """Archived logs leave task_logs but read back the same, including since/tail ranges."""
+    finish(db, "old", 30)
+    before = db.get_task("old")["logs"]
+
+    assert db.archive_tasks(max_age_days=1) == 1
+    assert live_rows(db, "old") == 0
+    assert os.listdir(db.archive.directory) == ["segment-000001.gz"]
+
+    assert db.get_task("old")["logs"] == before
+    assert [entry["seq"] for entry in db.get_logs("old", since_seq=25)] == [26, 27, 28, 29, 30]
+    assert [entry["seq"] for entry in db.get_logs("old", tail=3)] == [28, 29, 30]
+    assert db.get_logs("old", tail=0) == []
+    assert db.get_task_summary("old")["last_seq"] == 30
+
+    # A late log line continues the sequence after the archived entries
+    db.log_step("old", "late line")
+    logs = db.get_logs("old")
+    assert len(logs) == 31 and logs[-1] == {**logs[-1], "seq": 31, "message": "late line"}
+    assert db.archive_tasks(max_age_days=1) == 0
+
+
+def test_count_policy_keeps_newest_finished_tasks(db):
+    """Only finished tasks beyond the newest ``keep_latest`` are archived; running ones never are."""
+    for n in range(4):
+        finish(db, f"task-{n}", 2, updated_at="2099-01-01 00:00:00")
+        with db.pool.transaction() as conn:
+            conn.execute("UPDATE tasks SET created_at = ? WHERE id = ?", (f"2024-01-0{n + 1}00:00:00", f"task-{n}"))
+    db.create_task("running", {"goal": "add customer"})
+    db.update_task("running", "running")
+    db.log_step("running", "still going")
+
+    assert db.archive_tasks(keep_latest=2) == 2
+    assert [live_rows(db, f"task-{n}") for n in range(4)] == [0, 0, 2, 2]
+    assert live_rows(db, "running") == 1
+    assert [entry["message"] for entry in db.get_task("task-0")["logs"]] == ["task-0 line 0", "task-0 line 1"]
+
+
+def test_retention_worker_archives_in_batches_and_vacuums(db):
+    """A pass archives everything past the policy and releases the freed pages."""
+    for n in range(7):
+        finish(db, f"task-{n}", 200)
+    worker = RetentionWorker(db, max_age_days=1, keep_latest=0, batch=3, vacuum_pages=10)
+
+    stats = worker.run_once()
+    assert stats["archived"] == 7
+    assert stats["vacuumed_pages"] > 0
+    conn = sqlite3.connect(db.db_path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    conn.close()
+    assert len(db.get_task("task-6")["logs"]) == 200
+
+
+def test_legacy_database_is_only_converted_when_asked(tmp_path, monkeypatch):
+    """A database without incremental auto_vacuum gets no full VACUUM unless conversion is enabled."""
+    monkeypatch.setenv("QA_ARCHIVE_DIR", str(tmp_path / "archive"))
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE older_data (x)")  # any existing content keeps the default auto_vacuum=NONE
+    conn.commit()
+    conn.close()
+    db = Database(db_path)
+    finish(db, "old", 50)
+
+    calls = []
+    monkeypatch.setattr(db, "enable_incremental_vacuum", lambda: calls.append(1) or False)
+    assert RetentionWorker(db, max_age_days=1, keep_latest=0).run_once() == {"archived": 1, "vacuumed_pages": 0}
+    assert calls == []
+
+    RetentionWorker(db, max_age_days=1, keep_latest=0, convert=True).run_once()
+    assert calls == [1]
@@ -0,0 +1,60 @@
+import json
+import os
+
+import pytest
+from agent.scenario_engine import ScenarioDefinitionError, compile_definition, load_plan, load_scenarios
+
+
+def test_shipped_scenarios_compile():
+    """Every file in scenarios/ compiles and the built-in goals are covered."""
+    plans = load_scenarios()
+    assert {"add customer", "verify total customers"} <= set(plans)
+    assert [kind for kind, _ in plans["verify total customers"].steps][-1] == "assert_count"
+
+
+@pytest.mark.parametrize("definition, error", [
+    ({"steps": [{"log": "hi"}]}, "'goal' is required"),
+    ({"goal": "g", "steps": [{"teleport": "/"}]}, "unknown type 'teleport'"),
+    ({"goal": "g", "steps": [{"navigate": "/{missing}"}]}, "undefined ['missing']"),
+    ({"goal": "g", "steps": [{"fill_form": {"selector": "form input"}}]}, "missing values"),
+    ({"goal": "g", "steps": [{"paginate_until": {"found": "x", "count": "n"}}]}, "exactly one"),
+])
+def test_invalid_definitions_are_rejected(definition, error):
+    with pytest.raises(ScenarioDefinitionError, match=error.replace("[", r"\[").replace("]", r"\]")):
+        compile_definition(definition)
+
+
+def test_saved_variables_are_in_scope_for_later_steps():
+    plan = compile_definition({
+        "goal": "count",
+        "variables": {"label": "run {timestamp}"},
+        "steps": [
+            {"read_number": {"selector": ".total", "save_as": "total"}},
+            {"log": "{label}: {total}"},
+        ],
+    })
+    assert [kind for kind, _ in plan.steps] == ["read_number", "log"]
+
+
+def test_plans_are_cached_until_the_file_changes(tmp_path):
+    path = tmp_path / "hello.json"
+    path.write_text(json.dumps({"goal": "say hello", "steps": [{"log": "hello"}]}))
+
+    first = load_plan(str(path))
+    assert load_plan(str(path)) is first
+
+    path.write_text(json.dumps({"goal": "say hello", "steps": [{"log": "hello"}, {"log": "again"}]}))
+    os.utime(path, (os.path.getmtime(path) + 5,) * 2)
+    second = load_plan(str(path))
+    assert second is not first and len(second.steps) == 2
+    assert set(load_scenarios(str(tmp_path))) == {"say hello"}
+
+
+def test_plan_runs_steps_and_logs_durations():
+    """A plan without browser steps runs end to end and reports each step."""
+    plan = compile_definition({"goal": "g", "variables": {"who": "QA"}, "steps": [{"log": "hello {who}"}]})
+    lines = []
+    assert plan(None, "http://crm.test", lines.append) == 0
+    assert lines[0] == "hello QA"
+    assert lines[1].startswith("[Step 1/1 log]")
+    assert lines[-1].startswith("[Timing profile] log=")
@@ -0,0 +1,147 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from agent import sharding
+from agent.customer_count import count_sharded
+from agent.sharding import NEXT_BUTTON, scan_sharded, shard_ranges
+
+
+def test_shard_ranges_cover_every_page_once():
+    """Ranges are contiguous, balanced and never more than the page count."""
+    assert shard_ranges(10, 3) == [(1, 4), (5, 7), (8, 10)]
+    assert shard_ranges(2, 4) == [(1, 1), (2, 2)]
+    assert shard_ranges(7, 1) == [(1, 7)]
+
+    for pages in range(1, 30):
+        for shards in range(1, 8):
+            ranges = shard_ranges(pages, shards)
+            covered = [n for start, end in ranges for n in range(start, end + 1)]
+            assert covered == list(range(1, pages + 1))
+            sizes = [end - start + 1 for start, end in ranges]
+            assert max(sizes) - min(sizes) <= 1
+
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+        self.first = self
+
+    def locator(self, selector):
+        return self  # "xpath=.." from the Next span to its button
+
+    def count(self):
+        return 1
+
+    def inner_text(self, timeout=None):
+        return self.page.site.bar(self.page.number)
+
+    def text_content(self):
+        return "\n".join(self.page.rows())
+
+    def all_inner_texts(self):
+        return self.page.rows()
+
+    def wait_for(self, timeout=None):
+        pass
+
+    def get_attribute(self, name):
+        return "true" if self.page.number >= len(self.page.site.pages) else None
+
+    def is_enabled(self):
+        return self.page.number < len(self.page.site.pages)
+
+    def click(self, timeout=None):
+        assert self.selector == NEXT_BUTTON and self.is_enabled()
+        self.page.number += 1
+        self.page.site.visits.append(self.page.number)
+
+
+class FakePage:
+    def __init__(self, site, number=1):
+        self.site = site
+        self.number = number
+        self.closed = False
+
+    def rows(self):
+        return self.site.pages[self.number - 1]
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+    def goto(self, url, wait_until=None):
+        self.number = int(parse_qs(urlparse(url).query).get("page", ["1"])[0])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSite:
+    """A paged customer table whose pagination bar lists at most three page numbers."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.opened = []
+        self.visits = []
+
+    def bar(self, number):
+        shown = range(max(1, number - 1), min(len(self.pages), number + 1) + 1)
+        return " ".join(map(str, ["Previous", *shown, "…", "Next"]))
+
+    def new_page(self):
+        page = FakePage(self)
+        self.opened.append(page)
+        return page
+
+
+@pytest.fixture(autouse=True)
+def instant_pages(monkeypatch):
+    # FakeLocator.click changes the page at once
+    monkeypatch.setattr(sharding, "wait_for_text_change", lambda locator, previous: None)
+
+
+def customers(pages, per_page=3):
+    return [[f"customer {page}-{n}" for n in range(per_page)] for page in range(1, pages + 1)]
+
+
+def test_scan_visits_pages_past_a_windowed_pagination_bar():
+    """The bar on page 1 lists pages 1-2, but the last shard walks on until Next is disabled."""
+    site = FakeSite(customers(7))
+    visited, logged = [], []
+
+    assert scan_sharded(site, FakePage(site), "http://crm.test", 2, logged.append,
+                        lambda number, page: visited.append((number, page.number))) is False
+    assert sorted(visited) == [(n, n) for n in range(1, 8)]
+    assert "[Pagination bar showed 2 pages, scanned 7]" in logged
+    assert all(page.closed for page in site.opened)
+
+
+def test_scan_stops_when_a_shard_finds_what_it_looks_for():
+    site = FakeSite(customers(12))
+    site.bar = lambda number: "Page 1 of 12"
+    visited = []
+
+    def visit(number, page):
+        visited.append(number)
+        return "customer 8-1" in page.rows()
+
+    assert scan_sharded(site, FakePage(site), "http://crm.test", 3, lambda line: None, visit) is True
+    # Shards 1-4, 5-8 and 9-12 advance together, so page 8 is found in the fourth round
+    assert sorted(visited) == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
+    assert max(site.visits) == 12 and len(site.visits) == 9
+    assert all(page.closed for page in site.opened)
+
+
+def test_sharded_count_sums_pages_and_gives_up_on_duplicate_rows():
+    site = FakeSite(customers(5) + [["customer 6-0"]])
+    site.bar = lambda number: "Page 1 of 6"
+    assert count_sharded(site, FakePage(site), "http://crm.test", 3, lambda line: None) == 16
+
+    # A customer added during the scan pushed "customer 3-2" onto page 4 as well
+    site = FakeSite(customers(6))
+    site.bar = lambda number: "Page 1 of 6"
+    site.pages[3] = ["customer 3-2"] + site.pages[3][:2]
+    first_page, logged = FakePage(site), []
+    assert count_sharded(site, first_page, "http://crm.test", 3, logged.append) is None
+    assert any("counting sequentially instead" in line for line in logged)
+    assert first_page.number == 1
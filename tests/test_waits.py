@@ -0,0 +1,24 @@
+from agent.waits import StepTimer
+
+
+def test_step_timer_aggregates_repeated_steps():
+    """Repeated steps are summed and the profile is logged as one line."""
+    lines = []
+    timer = StepTimer(lines.append)
+    with timer.step("open"):
+        pass
+    for _ in range(3):
+        with timer.step("next_page"):
+            pass
+    timer.record("submit", 0.25)
+
+    profile = timer.profile()
+    assert list(profile) == ["open", "next_page", "submit"]
+    assert profile["next_page"]["count"] == 3
+    assert profile["submit"]["total_ms"] == 250.0
+
+    timer.log_profile()
+    assert len(lines) == 1
+    assert lines[0].startswith("[Timing profile] open=")
+    assert "next_page=" in lines[0] and " x3 " in lines[0]
+    assert "submit=250ms" in lines[0]
@@ -0,0 +1,187 @@
+import socket
+import threading
+import time
+
+import pytest
+from agent.worker import Worker
+from db.database import Database
+from db.task_store import SQLiteTaskStore, TaskStore, connect_store, store_server
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "qa_tasks.db"))
+
+
+def expire_leases(db):
+    with db.pool.transaction() as conn:
+        conn.execute("UPDATE tasks SET lease_expires_at = '2000-01-01 00:00:00' WHERE lease_owner IS NOT NULL")
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_lease_is_held_by_one_owner_until_reclaimed(db):
+    """Only the lease holder can renew or finish; an expired lease goes back to the queue."""
+    db.enqueue_task("a", {"goal": "add customer"})
+    assert db.claim_next_task("w1", 30)["id"] == "a"
+    assert db.claim_next_task("w2", 30) is None
+    assert db.renew_lease("a", "w1", 30) is True
+    assert db.renew_lease("a", "w2", 30) is False
+
+    expire_leases(db)
+    assert db.reclaim_expired_leases() == 1
+    assert db.renew_lease("a", "w1", 30) is False
+    assert db.claim_next_task("w2", 30)["id"] == "a"
+    assert db.finish_leased_task("a", "w1", "completed", "stale") is False
+    assert db.finish_leased_task("a", "w2", "completed", "done") is True
+    assert db.get_task("a")["status"] == "completed"
+    assert db.get_task("a")["result"] == "done"
+
+
+def test_finish_needs_a_terminal_status_and_the_claimed_version(db):
+    """A stale outcome is dropped even when the same owner claimed the task again."""
+    db.enqueue_task("a", {})
+    first = db.claim_next_task("w1", 30)
+    assert db.finish_leased_task("a", "w1", "queued") is False
+    expire_leases(db)
+    db.reclaim_expired_leases()
+    second = db.claim_next_task("w1", 30)
+
+    assert db.finish_leased_task("a", "w1", "completed", "stale", first["version"]) is False
+    assert db.finish_leased_task("a", "w1", "completed", "done", second["version"]) is True
+    assert db.get_task("a")["result"] == "done"
+
+
+def test_lost_leases_fail_after_max_attempts_and_cancel_reaches_workers(db):
+    db.enqueue_task("flaky", {})
+    for _ in range(2):
+        db.claim_next_task("w1", 30)
+        expire_leases(db)
+        db.reclaim_expired_leases(max_attempts=2)
+    assert db.get_task("flaky")["status"] == "failed"
+
+    db.enqueue_task("long", {})
+    db.claim_next_task("w1", 30)
+    assert db.cancel_leased_task("long") is True
+    assert db.renew_lease("long", "w1", 30) is False
+    assert db.get_task("long")["status"] == "cancelled"
+
+
+def test_workers_share_the_queue_without_running_a_task_twice(db):
+    runs = []
+    lock = threading.Lock()
+
+    def run(task_id, parameters):
+        with lock:
+            runs.append(task_id)
+        time.sleep(0.02)
+        return 0
+
+    task_ids = [f"t{n}" for n in range(20)]
+    for task_id in task_ids:
+        db.enqueue_task(task_id, {"goal": "verify total customers"})
+    workers = [Worker(SQLiteTaskStore(db), run, concurrency=2, poll_interval=0.05) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    try:
+        wait_for(lambda: sum(worker.completed for worker in workers) == len(task_ids))
+    finally:
+        for worker in workers:
+            worker.stop()
+
+    assert sorted(runs) == sorted(task_ids)
+    assert all(worker.completed > 0 for worker in workers)
+    assert db.get_task("t0")["result"] == "Verify total customers test completed successfully"
+
+
+def test_run_detail_is_recorded_in_the_result(db):
+    db.enqueue_task("count", {"goal": "verify total customers"})
+    worker = Worker(SQLiteTaskStore(db), lambda task_id, parameters: 0, poll_interval=0.05,
+                    run_detail=lambda task_id: "counted 42 customers via network in 120 ms")
+    worker.start()
+    try:
+        wait_for(lambda: db.get_task("count")["status"] == "completed")
+    finally:
+        worker.stop()
+    assert db.get_task("count")["result"] == \
+        "Verify total customers test completed successfully (counted 42 customers via network in 120 ms)"
+
+
+def test_tasks_of_a_dead_worker_are_picked_up(db):
+    """A task whose worker stopped heartbeating is reclaimed and run by another worker."""
+    db.enqueue_task("orphan", {})
+    assert db.claim_next_task("dead-worker", 0.5)["id"] == "orphan"
+
+    worker = Worker(SQLiteTaskStore(db), lambda task_id, parameters: 0, lease_seconds=0.6, poll_interval=0.05)
+    worker.start()
+    try:
+        wait_for(lambda: db.get_task("orphan")["status"] == "completed")
+    finally:
+        worker.stop()
+
+
+def test_stop_keeps_heartbeat_pace_while_draining(db):
+    """stop() waits for running tasks without renewing their leases in a busy loop."""
+    class CountingStore(SQLiteTaskStore):
+        renewals = 0
+
+        def renew(self, task_id, owner, lease_seconds=30):
+            CountingStore.renewals += 1
+            return super().renew(task_id, owner, lease_seconds)
+
+    db.enqueue_task("slow", {})
+    worker = Worker(CountingStore(db), lambda task_id, parameters: time.sleep(1) or 0,
+                    lease_seconds=0.6, poll_interval=0.05)
+    worker.start()
+    wait_for(lambda: worker.running_count() == 1)
+    worker.stop()
+
+    assert db.get_task("slow")["status"] == "completed"
+    # One beat every 0.2 s over the ~1 s run
+    assert CountingStore.renewals <= 10
+
+
+def test_incomplete_store_fails_when_created():
+    class ClaimOnly(TaskStore):
+        def claim(self, owner, lease_seconds=30):
+            return None
+
+    with pytest.raises(TypeError):
+        ClaimOnly()
+
+
+def test_remote_store_serves_workers_over_tcp(db):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = store_server(SQLiteTaskStore(db), f"127.0.0.1:{port}", authkey=b"test")
+
+    def serve():
+        try:
+            server.serve_forever()
+        except SystemExit:  # how the server loop ends once stop_event is set
+            pass
+    threading.Thread(target=serve, daemon=True).start()
+    try:
+        store = connect_store(f"manager://127.0.0.1:{port}", authkey=b"test")
+        db.enqueue_task("remote", {"goal": "add customer"})
+        task = store.claim("remote-worker", 30)
+        assert task == {"id": "remote", "parameters": {"goal": "add customer"}, "version": 1}
+        store.log_steps("remote", ["hello"])
+        assert store.finish("remote", "remote-worker", "completed", "ok", task["version"]) is True
+        assert [entry["message"] for entry in db.get_logs("remote")] == ["hello"]
+    finally:
+        server.stop_event.set()
+
+
+def test_remote_store_needs_an_authkey(db):
+    """Without QA_STORE_AUTHKEY neither side of a manager:// store starts."""
+    with pytest.raises(ValueError, match="QA_STORE_AUTHKEY"):
+        store_server(SQLiteTaskStore(db), "127.0.0.1:0", authkey=None)
+    with pytest.raises(ValueError, match="QA_STORE_AUTHKEY"):
+        connect_store("manager://127.0.0.1:1", authkey=b"")